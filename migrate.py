@@ -2,11 +2,22 @@
 Entrypoiny for standalone executable version of migrate
 """
 
-from migrate.common.options import CONTEXT_SETTINGS
-from migrate.handlers.enterprise.enterprise import enterprise
-from migrate.handlers.org.org import org
-from migrate.handlers.repo.repo import repo
-from migrate.main import cli
+import multiprocessing
+import sys
+
+from migrate.common.daemon import forward_if_serving
 
 if __name__ == "__main__":
+    # Worker processes of a frozen executable start by re-running this script
+    multiprocessing.freeze_support()
+
+    # Forward to a running server before importing the command handlers
+    exit_code = forward_if_serving(sys.argv[1:])
+    if exit_code is not None:
+        sys.exit(exit_code)
+
+    # The handlers are imported on demand, so they are listed as hidden
+    # imports in migrate.spec
+    from migrate.main import cli
+
     cli()
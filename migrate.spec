@@ -1,4 +1,5 @@
 # -*- mode: python ; coding: utf-8 -*-
+from PyInstaller.utils.hooks import collect_submodules
 
 
 block_cipher = None
@@ -9,7 +10,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=['cffi', 'charset_normalizer'],
+    hiddenimports=['cffi', 'charset_normalizer'] + collect_submodules('migrate.handlers'),
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
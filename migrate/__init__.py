@@ -1,3 +1,7 @@
-from importlib.metadata import version
+def __getattr__(name):
+    # Resolved on first use, since reading the package metadata slows startup
+    if name == "__version__":
+        from importlib.metadata import version
 
-__version__ = version("migrate")
+        return version("migrate")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
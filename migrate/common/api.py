@@ -1,28 +1,34 @@
 """
-Supports accessing and using the GitHub API
+Supports accessing and using the GitHub API. The HTTP, GhApi and encryption
+dependencies are imported on first use to keep the command line responsive.
 """
 
+from __future__ import annotations
+
+import contextvars
 import functools
-import gzip
+import hashlib
 import json
 import os
 import re
 import sys
+import threading
 import time
-import zipfile
 from base64 import b64encode
 from collections import namedtuple
+from contextlib import contextmanager
 from dataclasses import dataclass
 from enum import auto, unique
-from io import BytesIO
-
-import requests
-from fastcore.net import HTTP4xxClientError
-from ghapi.all import GhApi, print_summary
-from nacl import encoding, public
+from typing import TYPE_CHECKING, Callable
 
+from .trace import span
 from .types import DictData, SerializedEnum
 
+if TYPE_CHECKING:
+    import requests
+    from fastcore.net import HTTP4xxClientError
+    from ghapi.all import GhApi
+
 FileData = namedtuple("FileData", ["name", "content"])
 
 
@@ -34,6 +40,15 @@ class SortDirection(SerializedEnum):
     DESC = auto()
 
 
+@unique
+class DownloadStatus(SerializedEnum):
+    """Indicates the outcome of downloading a file"""
+
+    DOWNLOADED = auto()
+    SKIPPED = auto()
+    FAILED = auto()
+
+
 @dataclass
 class GhPublicKey(DictData):
     """Represents a public key"""
@@ -42,27 +57,126 @@ class GhPublicKey(DictData):
     id: str  # pylint: disable=invalid-name
 
 
+SUCCESS_STATUS = "2xx"
+"""The status reported for a successful REST request. The GhApi transport
+returns the response body and headers, but not the exact status code."""
+
+
+@dataclass(frozen=True)
+class RequestEvent:
+    """Describes a completed API request
+
+    Arguments:
+    method: The HTTP method
+    template: The path template (such as `/repos/{owner}/{repo}`) or URL
+    status: The HTTP status code, `SUCCESS_STATUS` for a successful REST request
+        (the GhApi transport does not report the exact code), or None if no
+        response was received
+    start: The `time.perf_counter()` value when the request was sent
+    duration: The number of seconds until the response was received
+    size: The size of the response body in bytes, if known
+    headers: The response headers
+    thread: The identifier of the thread which sent the request
+    url: The requested URL, if it differs from the template
+    """
+
+    method: str
+    template: str
+    status: int | str
+    start: float
+    duration: float
+    size: int
+    headers: dict
+    thread: int
+    url: str = None
+
+
+_request_listeners = ()
+_listeners_lock = threading.Lock()
+
+
+def add_request_listener(listener: Callable[[RequestEvent], None]):
+    """Registers a function which is called after every API request. Listeners
+    are called on the requesting thread, so they must be fast and thread-safe."""
+    global _request_listeners  # pylint: disable=global-statement
+    with _listeners_lock:
+        _request_listeners = (*_request_listeners, listener)
+
+
+def remove_request_listener(listener: Callable[[RequestEvent], None]):
+    """Unregisters a request listener"""
+    global _request_listeners  # pylint: disable=global-statement
+    with _listeners_lock:
+        _request_listeners = tuple(
+            registered for registered in _request_listeners if registered is not listener
+        )
+
+
+def _notify_request(
+    method: str, template: str, start: float, status, headers, size=None, url=None
+):
+    """Reports a completed request to the listeners"""
+    headers = headers or {}
+    if size is None and headers.get("Content-Length"):
+        size = int(headers["Content-Length"])
+    event = RequestEvent(
+        method=method.upper(),
+        template=template,
+        status=status,
+        start=start,
+        duration=time.perf_counter() - start,
+        size=size,
+        headers=headers,
+        thread=threading.get_ident(),
+        url=url,
+    )
+    for listener in _request_listeners:
+        listener(event)
+
+
+_throttled = 0.0
+_throttled_lock = threading.Lock()
+
+
+def record_throttle(seconds: float):
+    """Records time spent waiting for a throttle rather than the network"""
+    global _throttled  # pylint: disable=global-statement
+    if seconds > 0:
+        with _throttled_lock:
+            _throttled += seconds
+
+
+def throttled_seconds() -> float:
+    """Returns the total time threads have spent waiting for throttles"""
+    return _throttled
+
+
 # pylint: disable-next=two-few_public-methods
 class rate_limited:  # pylint: disable=invalid-name
     """Decorator to implement a throttle for API write calls
-    to limit them to one call per second.
+    to limit them to one call per second. The throttle is shared
+    by all threads.
     """
 
     _last_called = 0.0
     _interval = 1.0
+    _lock = threading.Lock()
 
     def __init__(self, func):
         functools.update_wrapper(self, func)
         self.func = func
 
     def __call__(self, *args, **kwargs):
-        clock_time = rate_limited._get_time()
-        if rate_limited._last_called > 0:
-            elapsed = clock_time - rate_limited._last_called
-            wait_time = rate_limited._interval - elapsed
-            if not wait_time <= 0:
-                time.sleep(wait_time)
-        rate_limited._last_called = rate_limited._get_time()
+        waiting_since = rate_limited._get_time()
+        with rate_limited._lock:
+            clock_time = rate_limited._get_time()
+            if rate_limited._last_called > 0:
+                elapsed = clock_time - rate_limited._last_called
+                wait_time = rate_limited._interval - elapsed
+                if not wait_time <= 0:
+                    time.sleep(wait_time)
+            started = rate_limited._last_called = rate_limited._get_time()
+        record_throttle(started - waiting_since)
         return self.func(*args, **kwargs)
 
     @staticmethod
@@ -128,10 +242,15 @@ def is_ghes(host_or_uri: str):
 
 def encrypt_secret(public_key: str, secret_value: str) -> str:
     """Encrypt a Unicode string using the public key"""
-    public_key = public.PublicKey(public_key.encode("utf-8"), encoding.Base64Encoder())
-    sealed_box = public.SealedBox(public_key)
-    encrypted = sealed_box.encrypt(secret_value.encode("utf-8"))
-    return b64encode(encrypted).decode("utf-8")
+    from nacl import encoding, public
+
+    with span("encrypt secret", "crypto"):
+        public_key = public.PublicKey(
+            public_key.encode("utf-8"), encoding.Base64Encoder()
+        )
+        sealed_box = public.SealedBox(public_key)
+        encrypted = sealed_box.encrypt(secret_value.encode("utf-8"))
+        return b64encode(encrypted).decode("utf-8")
 
 
 def resolve_rest_endpoint(hostname=None):
@@ -144,79 +263,458 @@ def resolve_graphql_endpoint(hostname=None):
     return _resolve_api_service_endpoint(hostname, "/graphql", "/api/graphql")
 
 
+class ApiError(Exception):
+    """A client error (4xx) returned by the GitHub API"""
+
+    def __init__(self, code: int, status: str, context: str, details=None):
+        super().__init__(f"{code} {status}: {context}")
+        self.code = code
+        self.status = status
+        self.context = context
+        self.details = details
+
+    def to_dict(self):
+        return dict(
+            code=self.code, status=self.status, context=self.context, details=self.details
+        )
+
+
+class ErrorCollector:
+    """Records API errors instead of exiting, so the remaining operations of a
+    bulk run continue. The collector can be shared between threads."""
+
+    def __init__(self):
+        self._errors = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._errors)
+
+    def add(self, error: ApiError):
+        """Records an error"""
+        with self._lock:
+            self._errors.append(error)
+
+    @property
+    def errors(self) -> list[ApiError]:
+        """The errors, in the order they were recorded"""
+        with self._lock:
+            return list(self._errors)
+
+    def report(self) -> dict:
+        """Summarizes the errors for serialization"""
+        errors = [error.to_dict() for error in self.errors]
+        return {"count": len(errors), "errors": errors}
+
+
+_error_collector: contextvars.ContextVar[ErrorCollector] = contextvars.ContextVar(
+    "error_collector", default=None
+)
+"""The collector of the running command. Each command (including each command
+of a parallel batch) runs in its own context, so collectors are not shared."""
+
+
+def get_error_collector() -> ErrorCollector:
+    """Returns the active error collector, or None if errors exit the process"""
+    return _error_collector.get()
+
+
+@contextmanager
+def collect_errors(collector: ErrorCollector):
+    """Records API errors using the collector (rather than exiting) until the
+    context exits. The collector is active in the current context and in any
+    work started with `with_current_context`. An active collector is kept if
+    one is already in use."""
+    active = _error_collector.get()
+    if active is not None:
+        yield active
+        return
+    token = _error_collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _error_collector.reset(token)
+
+
+def with_current_context(func: Callable) -> Callable:
+    """Wraps a function so it runs in a copy of the caller's context (such as
+    its error collector) when it is called from a worker thread"""
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+
+    return run
+
+
 def call_with_exception_handler(context, func, *args, **kwargs):
-    """Calls the provided function and handles any exceptions"""
+    """Calls the provided function and handles any exceptions. Client errors
+    exit the process, or raise ApiError while an error collector is active."""
+    from fastcore.net import HTTP4xxClientError
 
     def get_message(error: HTTP4xxClientError):
         return re.sub("^.+\r?\n====Error Body====\r?\n", "", error.msg)
 
-    def write_error(status: str, context: str, error: HTTP4xxClientError):
-        msg = json.loads(get_message(error))
-        print(
-            json.dumps(
-                dict(code=error.code, status=status, context=context, details=msg),
-                indent=2,
-            ),
-            file=sys.stderr,
-        )
+    def handle_error(status: str, context: str, error: HTTP4xxClientError):
+        api_error = ApiError(error.code, status, context, json.loads(get_message(error)))
+        collector = get_error_collector()
+        if collector is not None:
+            collector.add(api_error)
+            raise api_error from error
+        print(json.dumps(api_error.to_dict(), indent=2), file=sys.stderr)
+        sys.exit(1)
 
     try:
         return func(*args, **kwargs)
     except HTTP4xxClientError as ex:
         match ex.code:
             case 401:
-                write_error(status="Bad credentials", context=context, error=ex)
+                handle_error(status="Bad credentials", context=context, error=ex)
             case 403:
-                write_error(status="Forbidden", context=context, error=ex)
+                handle_error(status="Forbidden", context=context, error=ex)
             case 404:  # Not found or no permissions
-                write_error(status="Not Found", context=ex.url, error=ex)
+                handle_error(status="Not Found", context=ex.url, error=ex)
             case 409:  # Validation or state conflict
-                write_error(status="Conflict", context=context, error=ex)
+                handle_error(status="Conflict", context=context, error=ex)
             case 422:  # Validation failed
-                write_error(status="Unprocessable Entity", context=context, error=ex)
+                handle_error(status="Unprocessable Entity", context=context, error=ex)
             case _:
                 raise
-        sys.exit(1)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls which share a key. The first caller executes
+    the function while later callers wait for it, then every caller receives
+    the same result (or exception). Results are not kept once the call ends."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func: Callable, *args, **kwargs):
+        """Calls the function unless a call with the same key is in flight, in
+        which case the result of that call is returned"""
+        from concurrent.futures import Future
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+        if not leader:
+            return call.result()
+        try:
+            call.set_result(func(*args, **kwargs))
+        except BaseException as ex:  # pylint: disable=broad-except
+            call.set_exception(ex)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return call.result()
+
+
+_operations = None
+_operations_lock = threading.Lock()
+
+
+def _operation_table():
+    """Indexes the GhApi endpoint metadata by group and operation name. The
+    table is built once per process and shared by every client."""
+    global _operations  # pylint: disable=global-statement
+    with _operations_lock:
+        if _operations is None:
+            from ghapi.metadata import funcs
+
+            groups = {}
+            routes = {}
+            for func in funcs:
+                path, verb, oper = func[0], func[1], func[2]
+                tag, *name = oper.split("/")
+                group = tag.replace("-", "_")
+                name = "__".join(name).replace("-", "_")
+                groups.setdefault(group, {})[name] = func
+                routes[f"{path}:{verb.upper()}"] = (group, name)
+            _operations = (groups, routes)
+    return _operations
+
+
+class _LazyVerbGroup:
+    """A group of endpoint operations (such as `repos`), created on first use"""
+
+    def __init__(self, client: SlimGhApi, name: str, operations: dict):
+        self._client = client
+        self._name = name
+        self._operations = operations
+
+    def __getattr__(self, name: str):
+        func = self._operations.get(name) if not name.startswith("_") else None
+        if func is None:
+            raise AttributeError(f"'{self._name}' has no operation '{name}'")
+        from ghapi.core import _GhVerb
+
+        verb = _GhVerb(*func, client=self._client, kwargs={})
+        setattr(self, name, verb)
+        return verb
+
+    def __dir__(self):
+        return list(self._operations)
+
+
+def _format_route(path: str, route: dict):
+    """Substitutes the (quoted) route parameters into a path template"""
+    try:
+        return path.format(**route) if route else path
+    except (KeyError, IndexError, ValueError):
+        return path
+
+
+class SlimGhApi:
+    """A GhApi-compatible client which only creates the endpoint operations
+    that are used. GhApi builds an operation object for every REST endpoint
+    when it is created; this client resolves each group and operation from a
+    shared table on first access, then reuses it.
+    """
+
+    def __init__(self, token: str = None, gh_host: str = None, debug=None, limit_cb=None):
+        from ghapi.core import GH_HOST
+
+        self.headers = {"Accept": "application/vnd.github.v3+json"}
+        token = token or os.getenv("GITHUB_TOKEN", None)
+        if token:
+            self.headers["Authorization"] = "token " + token
+        self.debug, self.limit_cb, self.limit_rem = debug, limit_cb, 5000
+        self.gh_host = gh_host or GH_HOST
+        self._received = threading.local()
+        self._flight = SingleFlight()
+
+    @property
+    def recv_hdrs(self) -> dict:
+        """The response headers of the last request sent by the calling thread.
+        The client is shared between threads, so each thread keeps its own."""
+        return getattr(self._received, "headers", {})
+
+    @recv_hdrs.setter
+    def recv_hdrs(self, headers: dict):
+        self._received.headers = headers
+
+    def __call__(
+        self,
+        path: str,
+        verb: str = None,
+        headers: dict = None,
+        route: dict = None,
+        query: dict = None,
+        data=None,
+    ):
+        """Calls a fully specified `path` using HTTP `verb`. Identical GET requests
+        made concurrently share a single request and its (read-only) result."""
+        verb = verb or ("POST" if data else "GET")
+        if verb.upper() != "GET":
+            return self._send(path, verb, headers, route, query, data)
+        key = json.dumps([path, headers, route, query], sort_keys=True, default=str)
+        return self._flight.do(key, self._send, path, "GET", headers, route, query, data)
+
+    def _send(self, path: str, verb: str, headers, route, query, data):
+        """Sends a request, reporting it to any request listeners"""
+        from ghapi.core import GhApi
+
+        if not _request_listeners:
+            return GhApi.__call__(self, path, verb, headers, route, query, data)
+        start = time.perf_counter()
+        status, received = None, None
+        try:
+            result = GhApi.__call__(self, path, verb, headers, route, query, data)
+            status, received = SUCCESS_STATUS, self.recv_hdrs
+            return result
+        except Exception as ex:  # pylint: disable=broad-except
+            status, received = getattr(ex, "code", None), getattr(ex, "hdrs", None)
+            raise
+        finally:
+            _notify_request(
+                verb,
+                path,
+                start,
+                status,
+                dict(received or {}),
+                url=_format_route(path, route),
+            )
+
+    def __getattr__(self, name: str):
+        groups, _ = _operation_table()
+        if name.startswith("_") or name not in groups:
+            raise AttributeError(name)
+        group = _LazyVerbGroup(self, name, groups[name])
+        setattr(self, name, group)
+        return group
+
+    def __getitem__(self, key):
+        """Lookup an endpoint by path and verb (which defaults to 'GET')"""
+        path, verb = key if isinstance(key, tuple) else (key, "GET")
+        _, routes = _operation_table()
+        group, name = routes[f"{path}:{verb.upper()}"]
+        return getattr(getattr(self, group), name)
+
+    def __dir__(self):
+        return [*super().__dir__(), *_operation_table()[0]]
+
+
+_clients = {}
+_clients_lock = threading.Lock()
 
 
 def create_client(
     token: str, hostname: str = "api.github.com", enable_debug: bool = False
 ):
-    """Creates a client for API calls to a GitHub system"""
+    """Creates a client for API calls to a GitHub system. Clients are cached
+    for the life of the process, so repeated calls with the same host and
+    token return the same (warm) instance."""
+    from ghapi.core import print_summary
 
     host = resolve_rest_endpoint(hostname)
-    api = GhApi(token=token, gh_host=host)
-    if enable_debug or os.getenv("GITHUB_DEBUG"):
-        api.debug = print_summary
+    debug = bool(enable_debug or os.getenv("GITHUB_DEBUG"))
+    key = (host, token, debug)
+    with span("create client", "client", host=host), _clients_lock:
+        api = _clients.get(key)
+        if api is None:
+            api = SlimGhApi(token=token, gh_host=host)
+            if debug:
+                api.debug = print_summary
+            _clients[key] = api
     return api
 
 
+def clear_clients():
+    """Discards any cached clients"""
+    with _clients_lock:
+        _clients.clear()
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Returns the shared HTTP session, reusing pooled connections between calls"""
+    import requests
+
+    global _session  # pylint: disable=global-statement
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+    return _session
+
+
+class ConditionalCache:
+    """Caches GET responses by URL and revalidates them using their ETag.
+    A 304 (Not Modified) response does not count against the primary rate
+    limit, so repeatedly requesting an unchanged resource is nearly free.
+    The cache can be shared between threads."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str, token: str, params: dict = None):
+        """Requests a URL, sending the cached ETag if the URL was requested before
+
+        Returns:
+        tuple: the JSON response and whether it changed since the previous request
+        """
+        key = (url, token, tuple(sorted((params or {}).items())))
+        headers = {
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+            "Authorization": f"Bearer {token}",
+        }
+        with self._lock:
+            cached = self._entries.get(key)
+        if cached:
+            headers["If-None-Match"] = cached[0]
+        start = time.perf_counter()
+        response = get_session().get(url, headers=headers, params=params)
+        if _request_listeners:
+            _notify_request(
+                "GET",
+                url,
+                start,
+                response.status_code,
+                response.headers,
+                len(response.content),
+            )
+        if response.status_code == 304 and cached:
+            return cached[1], False
+        if response.status_code != 200:
+            raise SystemExit(
+                {"status": response.status_code, "message": _error_message(response)}
+            )
+        data = response.json() if response.content else None
+        etag = response.headers.get("ETag")
+        if etag:
+            with self._lock:
+                self._entries[key] = (etag, data)
+        return data, True
+
+
 def graphql_query(
     query: str,
     token: str,
     endpoint: str = "https://api.github.com",
     variables: dict = None,
 ):
-    """Executes a GraphQL query"""
+    """Executes a GraphQL query. Identical queries made concurrently share a
+    single request; mutations are always sent."""
+    endpoint_uri = resolve_graphql_endpoint(endpoint)
+    if query.lstrip().startswith("mutation"):
+        return _post_graphql(endpoint_uri, query, token, variables)
+    key = json.dumps([endpoint_uri, token, query, variables], sort_keys=True, default=str)
+    return _graphql_flight.do(key, _post_graphql, endpoint_uri, query, token, variables)
+
+
+_graphql_flight = SingleFlight()
+
+
+def _post_graphql(endpoint_uri: str, query: str, token: str, variables: dict):
+    import requests
 
     headers = {"Authorization": f"Bearer {token}"}
-    endpoint_uri = resolve_graphql_endpoint(endpoint)
+    start = time.perf_counter()
     response = requests.post(
         endpoint_uri,
         json={"query": query, "variables": variables},
         headers=headers,
     )
+    if _request_listeners:
+        _notify_request(
+            "POST",
+            endpoint_uri,
+            start,
+            response.status_code,
+            response.headers,
+            len(response.content),
+        )
     if response.status_code == 200:
         return response.json()
     else:
-        data = response.json()
         error = {
             "status": response.status_code,
-            "message": data.get("message", "Unknown error"),
+            "message": _error_message(response),
         }
         raise SystemExit(error)
 
 
+def _error_message(response: requests.Response) -> str:
+    """Reads the message from an error response. Errors from a proxy or load
+    balancer (such as a 502 page) are not JSON, so the reason is used instead."""
+    try:
+        data = response.json()
+    except ValueError:
+        data = None
+    if isinstance(data, dict) and "message" in data:
+        return data["message"]
+    return response.reason or "Unknown error"
+
+
 def paginated(operation, per_page=100, page=1, **kwargs):
     """Pagination helper method to workaround improper behaviors
     in GhApi.
@@ -230,8 +728,10 @@ def paginated(operation, per_page=100, page=1, **kwargs):
     AttrDict: results of the query
     """
     is_incomplete = True
+    name = _operation_name(operation)
     while is_incomplete:
-        result = operation(**kwargs, per_page=per_page, page=page)
+        with span(name, "pagination", page=page):
+            result = operation(**kwargs, per_page=per_page, page=page)
         is_incomplete = (
             False
             if not result
@@ -243,34 +743,295 @@ def paginated(operation, per_page=100, page=1, **kwargs):
         page += 1
 
 
-def download_file(url: str, token: str, allow_redirects: bool = True):
-    """Downloads a file from a URL and returns a FileData object or None"""
-    headers = {
+def paginated_items(operation, key: str = None, per_page=100, page=1, **kwargs):
+    """Pagination helper which yields the individual items from each page,
+    requesting pages until a partial or empty page is returned.
+
+     Parameters:
+     operation: The GhApi function to execute
+     key: The name of the list of items, for endpoints which return an object
+     per_page: The size of the page
+     page: The starting page number
+
+    Returns:
+    Iterator[AttrDict]: the items, in the order returned by the API
+    """
+    from .progress import progress
+
+    name = _operation_name(operation)
+    with progress(name) as counter:
+        while True:
+            with span(name, "pagination", page=page):
+                result = operation(**kwargs, per_page=per_page, page=page)
+            if key is not None:
+                items = result[key] if result and key in result else []
+                if counter.total is None and result and "total_count" in result:
+                    counter.total = result["total_count"]
+            else:
+                items = result or []
+            yield from items
+            counter.advance(len(items))
+            if len(items) < per_page:
+                return
+            page += 1
+
+
+def _operation_name(operation) -> str:
+    """Names the endpoint operation wrapped by a (possibly partial) function"""
+    while isinstance(operation, functools.partial):
+        operation = operation.args[-1] if operation.args else operation.func
+    return getattr(operation, "name", None) or getattr(operation, "__name__", "items")
+
+
+def _download_headers(token: str):
+    return {
         "X-GitHub-Api-Version": "2022-11-28",
         "Authorization": f"Bearer {token}",
     }
-    response = requests.get(url, headers=headers, allow_redirects=allow_redirects)
+
+
+def _content_filename(headers):
+    header = headers["Content-Disposition"] if "Content-Disposition" in headers else ""
+    return re.findall("filename=([^;]+)|$", header)[0].strip()
+
+
+def download_file(url: str, token: str, allow_redirects: bool = True):
+    """Downloads a file from a URL and returns a FileData object or None. The
+    content is held in memory; use `stream_download` for large files."""
+    response = get_session().get(
+        url, headers=_download_headers(token), allow_redirects=allow_redirects
+    )
     if response.status_code != 200:
         return None
 
-    header = (
-        response.headers["Content-Disposition"]
-        if "Content-Disposition" in response.headers
-        else ""
-    )
-    filename = re.findall("filename=([^;]+)|$", header)[0].strip()
+    return FileData(name=_content_filename(response.headers), content=response.content)
 
-    return FileData(name=filename, content=response.content)
+
+@dataclass(frozen=True)
+class DownloadProgress(DictData):
+    """Reports the progress of a streaming download"""
+
+    received: int
+    total: int
+    bytes_per_second: float
+
+
+@dataclass(frozen=True)
+class StreamedFile(DictData):
+    """Describes the content written by a streaming download"""
+
+    name: str
+    size: int
+    digest: str
+    resumed: bool
+    bytes_per_second: float
+
+    def matches(self, size: int = None, digest: str = None):
+        """Indicates whether the content has the expected size and digest"""
+        return (size is None or self.size == size) and (
+            digest is None or self.digest == digest
+        )
+
+
+def _expected_total(response, offset: int):
+    """Determines the complete size of the file from the response headers"""
+    content_range = response.headers.get("Content-Range", "")
+    if "/" in content_range and not content_range.endswith("/*"):
+        return int(content_range.rsplit("/", 1)[1])
+    length = response.headers.get("Content-Length")
+    return int(length) + offset if length is not None else None
+
+
+def stream_download(
+    url: str,
+    token: str,
+    sink,
+    offset: int = 0,
+    hasher=None,
+    chunk_size: int = 1 << 20,
+    on_progress: Callable[[DownloadProgress], None] = None,
+    progress_interval: float = 0.5,
+):
+    """Downloads a file in chunks, so memory use is constant regardless of the
+    size of the file.
+
+    Arguments:
+    url: The URL to download
+    token: The access token
+    sink: A path or a binary file-like object to write the content to
+    offset: The number of bytes already received. The remaining content is
+        requested using a Range request and appended to the sink. If the server
+        sends the whole file instead, the sink is truncated and rewritten.
+    hasher: A hashlib object which has been updated with the bytes already
+        received. Defaults to a new sha256 hash when there is no offset.
+    chunk_size: The number of bytes to read at a time
+    on_progress: Called periodically (and on completion) with the progress
+    progress_interval: The minimum number of seconds between progress reports
+
+    Returns:
+    StreamedFile: the size and digest of the complete file, or None if the
+    request failed
+    """
+    if hasher is None:
+        if offset:
+            raise ValueError(
+                "A hasher including the received bytes is required to resume"
+            )
+        hasher = hashlib.sha256()
+    headers = _download_headers(token)
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+    started = time.monotonic()
+    with get_session().get(url, headers=headers, stream=True) as response:
+        if response.status_code == 416 and offset:
+            # The range starts at the end of the file, so it was already complete
+            chunks, resumed, total = (), True, offset
+        elif response.status_code in (200, 206):
+            chunks = response.iter_content(chunk_size)
+            resumed = response.status_code == 206
+            total = _expected_total(response, offset if resumed else 0)
+        else:
+            return None
+        if offset and not resumed:
+            # The server ignored the Range request and is sending the whole file
+            hasher = hashlib.new(hasher.name)
+        first_byte = offset if resumed else 0
+        received = first_byte
+
+        def progress():
+            elapsed = max(time.monotonic() - started, 1e-6)
+            return DownloadProgress(received, total, (received - first_byte) / elapsed)
+
+        file = open(sink, "ab" if resumed else "wb") if isinstance(sink, str) else sink
+        if offset and not resumed and file is sink:
+            # Replace the partial content rather than appending the whole file to it
+            sink.seek(0)
+            sink.truncate()
+        try:
+            last_report = started
+            for chunk in chunks:
+                file.write(chunk)
+                hasher.update(chunk)
+                received += len(chunk)
+                if on_progress and time.monotonic() - last_report >= progress_interval:
+                    last_report = time.monotonic()
+                    on_progress(progress())
+        finally:
+            if isinstance(sink, str):
+                file.close()
+        final = progress()
+        if on_progress:
+            on_progress(final)
+        return StreamedFile(
+            name=_content_filename(response.headers),
+            size=received,
+            digest=f"{hasher.name}:{hasher.hexdigest()}",
+            resumed=resumed,
+            bytes_per_second=final.bytes_per_second,
+        )
+
+
+def _hash_file(path: str, algorithm: str = "sha256", chunk_size: int = 1 << 20):
+    """Creates a hashlib object updated with the content of a file"""
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+    return digest
+
+
+def file_digest(path: str, algorithm: str = "sha256", chunk_size: int = 1 << 20):
+    """Computes the digest of a file, formatted as `<algorithm>:<hex>`"""
+    return f"{algorithm}:{_hash_file(path, algorithm, chunk_size).hexdigest()}"
+
+
+def _read_download_record(path: str):
+    """Reads the digest and size recorded after a previous download"""
+    try:
+        with open(f"{path}.sha256", encoding="utf-8") as file:
+            digest, size = file.read().split()
+        return digest, int(size)
+    except (OSError, ValueError):
+        return None, None
+
+
+def _is_downloaded(path: str, size: int = None, digest: str = None):
+    """Indicates whether a file is present with the expected size and digest. If
+    neither is known, the values recorded by a previous download are used."""
+    if not os.path.exists(path):
+        return False
+    if size is None and digest is None:
+        digest, size = _read_download_record(path)
+        if digest is None:
+            return False
+    if size is not None and os.path.getsize(path) != size:
+        return False
+    return digest is None or file_digest(path, digest.split(":", 1)[0]) == digest
+
+
+def download_to_path(
+    url: str,
+    token: str,
+    path: str,
+    size: int = None,
+    digest: str = None,
+    chunk_size: int = 1 << 20,
+    on_progress: Callable[[DownloadProgress], None] = None,
+) -> DownloadStatus:
+    """Downloads a file to disk, skipping it if it is already present with the
+    expected size and digest. The content is streamed to `<path>.part` and an
+    interrupted download is resumed using a Range request.
+
+    Arguments:
+    url: The URL to download
+    token: The access token
+    path: The destination file
+    size: The expected size in bytes, if known
+    digest: The expected digest (such as `sha256:<hex>`), if known
+    chunk_size: The number of bytes to read at a time
+    on_progress: Called periodically with the progress of the download
+    """
+    if _is_downloaded(path, size, digest):
+        return DownloadStatus.SKIPPED
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    partial_path = f"{path}.part"
+    algorithm = digest.split(":", 1)[0] if digest else "sha256"
+    offset = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+    hasher = _hash_file(partial_path, algorithm) if offset else hashlib.new(algorithm)
+    result = stream_download(
+        url,
+        token,
+        partial_path,
+        offset=offset,
+        hasher=hasher,
+        chunk_size=chunk_size,
+        on_progress=on_progress,
+    )
+    if result is None:
+        return DownloadStatus.FAILED
+    if not result.matches(size, digest):
+        os.remove(partial_path)
+        return DownloadStatus.FAILED
+    os.replace(partial_path, path)
+    with open(f"{path}.sha256", "w", encoding="utf-8") as file:
+        file.write(f"{result.digest} {result.size}\n")
+    return DownloadStatus.DOWNLOADED
 
 
 def gunzip_text_file(content: bytes):
-    """Decompresses a gzip file and returns the text content"""
-    return gzip.decompress(content).decode("utf-8")
+    """Decompresses a gzip file and returns the text content. Use
+    `archives.iter_gzip_lines` to read large files incrementally."""
+    from .archives import iter_gzip_bytes
+
+    return b"".join(iter_gzip_bytes(content)).decode("utf-8")
 
 
 def unzip_file(content: bytes):
-    """Unzips a file and returns a list of FileData objects"""
-    bytes = BytesIO(content)
-    zip = zipfile.ZipFile(bytes)
-    for name in zip.namelist():
-        yield FileData(name=name, content=zip.read(name).decode("utf-8"))
+    """Unzips a file and yields a FileData object for each member. Members are
+    only decompressed as they are reached; use `archives.ZipArchive` to list
+    the members or to stream a selected member."""
+    from .archives import ZipArchive
+
+    with ZipArchive(content) as archive:
+        for name in archive.names():
+            yield FileData(name=name, content=archive.read_text(name))
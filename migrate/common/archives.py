@@ -0,0 +1,205 @@
+"""
+Lazy access to zip and gzip archives. Archives are read from a path (using a
+memory map), a file-like object such as a spooled temporary file, or a bytes
+buffer without copying it. Members are listed without being read, and their
+content is decompressed incrementally as bytes or lines are consumed.
+"""
+
+import gzip
+import io
+import mmap
+import os
+import tempfile
+import zipfile
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, Union
+
+from .types import DictData
+
+ArchiveSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+"""A path, an in-memory buffer or a seekable binary file-like object"""
+
+DEFAULT_SPOOL_SIZE = 64 << 20
+"""The number of bytes a spooled file holds in memory before spilling to disk"""
+
+
+@dataclass(frozen=True)
+class ArchiveMember(DictData):
+    """Describes a file in an archive without reading its content"""
+
+    name: str
+    size: int
+    compressed_size: int
+
+
+def spooled_file(max_size: int = DEFAULT_SPOOL_SIZE):
+    """Creates a temporary file which is kept in memory until it exceeds
+    `max_size` bytes, then written to disk. Downloads can be streamed into
+    the file and then opened as an archive."""
+    return tempfile.SpooledTemporaryFile(max_size=max_size, mode="w+b")
+
+
+class _MappedFile(io.RawIOBase):
+    """A read-only, seekable stream over a memory-mapped file. Reads are served
+    from the page cache, so members can be read without loading the archive."""
+
+    def __init__(self, mapped: mmap.mmap):
+        super().__init__()
+        self._map = mapped
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._map)}
+        self._position = max(0, base[whence] + offset)
+        return self._position
+
+    def read(self, size: int = -1):
+        end = len(self._map) if size is None or size < 0 else self._position + size
+        data = self._map[self._position : end]
+        self._position += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self._map.close()
+        super().close()
+
+
+class _BufferFile(_MappedFile):
+    """A read-only, seekable stream over a bytearray or memoryview. The buffer
+    is not copied; only the bytes which are read are."""
+
+    def __init__(self, buffer: Union[bytearray, memoryview]):
+        super().__init__(memoryview(buffer).cast("B"))
+
+    def read(self, size: int = -1):
+        return bytes(super().read(size))
+
+    def close(self):
+        if not self.closed:
+            self._map.release()
+        io.RawIOBase.close(self)
+
+
+def _open_source(source: ArchiveSource):
+    """Returns a seekable binary stream over the source, and whether the
+    stream was opened here (and must be closed with the archive)"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return io.BytesIO(), True
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            return _MappedFile(mapped), True
+    if isinstance(source, bytes):
+        # BytesIO shares an immutable bytes buffer until it is written to
+        return io.BytesIO(source), True
+    if isinstance(source, (bytearray, memoryview)):
+        return _BufferFile(source), True
+    source.seek(0)
+    return source, False
+
+
+def _iter_chunks(stream: BinaryIO, chunk_size: int) -> Iterator[bytes]:
+    while chunk := stream.read(chunk_size):
+        yield chunk
+
+
+def _iter_text_lines(stream: BinaryIO, encoding: str, errors: str) -> Iterator[str]:
+    """Decodes a binary stream incrementally, yielding lines without line endings"""
+    with io.TextIOWrapper(stream, encoding=encoding, errors=errors, newline="") as text:
+        for line in text:
+            yield line.rstrip("\r\n")
+
+
+class ZipArchive:
+    """Provides lazy access to the members of a zip archive"""
+
+    def __init__(self, source: ArchiveSource):
+        self._stream, self._owns_stream = _open_source(source)
+        self._zip = zipfile.ZipFile(self._stream)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Closes the archive and any stream opened for it"""
+        self._zip.close()
+        if self._owns_stream:
+            self._stream.close()
+
+    def members(self) -> list[ArchiveMember]:
+        """Lists the files in the archive using the central directory"""
+        return [
+            ArchiveMember(
+                name=info.filename,
+                size=info.file_size,
+                compressed_size=info.compress_size,
+            )
+            for info in self._zip.infolist()
+            if not info.is_dir()
+        ]
+
+    def names(self) -> list[str]:
+        """Lists the names of the files in the archive"""
+        return [member.name for member in self.members()]
+
+    def open(self, name: str) -> BinaryIO:
+        """Opens a member as a stream which is decompressed as it is read"""
+        return self._zip.open(name)
+
+    def iter_bytes(self, name: str, chunk_size: int = 1 << 16) -> Iterator[bytes]:
+        """Yields the decompressed content of a member in chunks"""
+        with self.open(name) as stream:
+            yield from _iter_chunks(stream, chunk_size)
+
+    def iter_lines(
+        self, name: str, encoding: str = "utf-8", errors: str = "replace"
+    ) -> Iterator[str]:
+        """Yields the lines of a text member as they are decompressed"""
+        yield from _iter_text_lines(self.open(name), encoding, errors)
+
+    def read_text(self, name: str, encoding: str = "utf-8") -> str:
+        """Reads and decodes a complete member"""
+        return self._zip.read(name).decode(encoding)
+
+
+def iter_gzip_bytes(source: ArchiveSource, chunk_size: int = 1 << 16) -> Iterator[bytes]:
+    """Yields the decompressed content of a gzip file in chunks"""
+    stream, owns_stream = _open_source(source)
+    try:
+        with gzip.GzipFile(fileobj=stream, mode="rb") as content:
+            yield from _iter_chunks(content, chunk_size)
+    finally:
+        if owns_stream:
+            stream.close()
+
+
+def iter_gzip_lines(
+    source: ArchiveSource, encoding: str = "utf-8", errors: str = "replace"
+) -> Iterator[str]:
+    """Yields the lines of a gzip text file as they are decompressed"""
+    stream, owns_stream = _open_source(source)
+    try:
+        yield from _iter_text_lines(
+            gzip.GzipFile(fileobj=stream, mode="rb"), encoding, errors
+        )
+    finally:
+        if owns_stream:
+            stream.close()
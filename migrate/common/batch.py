@@ -0,0 +1,137 @@
+"""
+Supports executing many commands within a single process, sharing the
+imported modules, cached clients and parsed configuration between them
+"""
+
+import shlex
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from .types import DictData
+
+NESTED_COMMANDS = ("batch", "serve")
+"""Commands which cannot be executed from a batch"""
+
+
+@dataclass(frozen=True)
+class BatchCommand(DictData):
+    """A command line read from a batch manifest"""
+
+    line: int
+    argv: list[str]
+
+    def __str__(self):
+        return shlex.join(self.argv)
+
+
+@dataclass(frozen=True)
+class BatchResult(DictData):
+    """The outcome of a command in a batch"""
+
+    line: int
+    command: str
+    exit_code: int
+
+
+def exit_code_from(code) -> int:
+    """Converts the value provided to sys.exit to a process exit code"""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def run_command(command, argv: list[str]) -> int:
+    """Invokes a Click command with the provided arguments and returns the exit
+    code. An unhandled exception is logged and reported as exit code 1, so it
+    does not stop the remaining commands of a batch."""
+    try:
+        command.main(args=list(argv), prog_name="migrate")
+        return 0
+    except SystemExit as ex:
+        return exit_code_from(ex.code)
+    except Exception:  # pylint: disable=broad-except
+        traceback.print_exc()
+        return 1
+
+
+def parse_text_manifest(content: str) -> list[BatchCommand]:
+    """Reads one command per line. Blank lines and lines starting with # are ignored."""
+    commands = []
+    for number, line in enumerate(content.splitlines(), start=1):
+        argv = shlex.split(line, comments=True)
+        if argv:
+            commands.append(BatchCommand(line=number, argv=argv))
+    return commands
+
+
+def parse_yaml_manifest(content: str) -> list[BatchCommand]:
+    """Reads a YAML list where each entry is a command string or a list of arguments"""
+    from yaml import safe_load  # pylint: disable=import-outside-toplevel
+
+    commands = []
+    for number, entry in enumerate(safe_load(content) or [], start=1):
+        argv = shlex.split(entry) if isinstance(entry, str) else [str(v) for v in entry]
+        if argv:
+            commands.append(BatchCommand(line=number, argv=argv))
+    return commands
+
+
+def parse_manifest(filename: str, content: str) -> list[BatchCommand]:
+    """Reads a batch manifest, selecting the format from the file extension"""
+    if filename.lower().endswith((".yml", ".yaml")):
+        return parse_yaml_manifest(content)
+    return parse_text_manifest(content)
+
+
+def format_retry_manifest(results: list[BatchResult]) -> str:
+    """Creates a text manifest which runs the commands again, noting the
+    manifest line and exit code of each command"""
+    lines = []
+    for result in results:
+        lines.append(f"# line {result.line}, exit code {result.exit_code}")
+        lines.append(result.command)
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def _run_batch_command(command, batch_command: BatchCommand) -> BatchResult:
+    if batch_command.argv[0] in NESTED_COMMANDS:
+        print(
+            f"Line {batch_command.line}: '{batch_command.argv[0]}' cannot run in a batch",
+            file=sys.stderr,
+        )
+        exit_code = 2
+    else:
+        exit_code = run_command(command, batch_command.argv)
+    return BatchResult(
+        line=batch_command.line, command=str(batch_command), exit_code=exit_code
+    )
+
+
+def run_batch(command, commands: list[BatchCommand], max_workers: int = 1):
+    """Executes the commands, optionally in parallel. The commands form a single
+    run, so repository snapshots are shared between them.
+
+    Arguments:
+    command: The root Click command used to invoke each command line
+    commands: The command lines to execute
+    max_workers: The maximum number of commands to run concurrently
+
+    Returns:
+    list[BatchResult]: the results, in manifest order
+    """
+    from .api import with_current_context
+    from .repos import clear_repo_snapshots
+
+    clear_repo_snapshots()
+    if max_workers <= 1:
+        return [_run_batch_command(command, item) for item in commands]
+    # Each command runs in its own copy of the context, so the error collector
+    # of one --keep-going command is not seen by the others
+    run = with_current_context(lambda item: _run_batch_command(command, item))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(run, commands))
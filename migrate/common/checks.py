@@ -1,16 +1,30 @@
 """Methods for using the GitHub API for check runs"""
 
+from __future__ import annotations
+
+import time
+from collections import Counter
 from copy import copy
 from dataclasses import dataclass, fields
+from datetime import datetime, timezone
 from enum import Enum, unique, auto
-from ghapi.all import GhApi
+from functools import partial
+from statistics import median
+from typing import TYPE_CHECKING, Callable, Iterable
 from .api import (
+    ConditionalCache,
     paginated,
+    paginated_items,
     rate_limited,
     call_with_exception_handler,
+    resolve_rest_endpoint,
 )
+from .tasks import bounded_map
 from .types import SerializedEnum, DictData, alternative_name
 
+if TYPE_CHECKING:
+    from ghapi.all import GhApi
+
 
 def list_check_suites_for_commit(
     client: GhApi, org: str, repo: str, commit: str, state: str = "open"
@@ -98,3 +112,243 @@ def list_check_runs_for_commit(
         for run in resp["check_runs"]
         if "check_runs" in resp
     ]
+
+
+def iter_check_suites_for_ref(client: GhApi, org: str, repo: str, ref: str):
+    """Streams the check suites for the provided branch name or SHA"""
+    return paginated_items(
+        partial(
+            call_with_exception_handler,
+            f"{org}/{repo}",
+            client.checks.list_suites_for_ref,
+        ),
+        key="check_suites",
+        owner=org,
+        repo=repo,
+        ref=ref,
+    )
+
+
+def iter_check_runs_for_suite(
+    client: GhApi, org: str, repo: str, suite: int, filter: str = "latest"
+):
+    """Streams the check runs in the provided check suite"""
+    return paginated_items(
+        partial(
+            call_with_exception_handler, f"{org}/{repo}", client.checks.list_for_suite
+        ),
+        key="check_runs",
+        owner=org,
+        repo=repo,
+        check_suite_id=suite,
+        filter=filter,
+    )
+
+
+def list_check_run_annotations(client: GhApi, org: str, repo: str, run):
+    """Retrieves every annotation for a check run. The request is skipped when the
+    run reports that it has no annotations."""
+    if not (run.get("output") or {}).get("annotations_count"):
+        return []
+    return list(
+        paginated_items(
+            partial(
+                call_with_exception_handler,
+                f"{org}/{repo}",
+                client.checks.list_annotations,
+            ),
+            owner=org,
+            repo=repo,
+            check_run_id=run["id"],
+        )
+    )
+
+
+def _list_check_runs_for_target(client: GhApi, org: str, target, filter: str):
+    """Walks the suites for a (repo, ref) pair, returning each run with its context"""
+    repo, ref = target
+    return [
+        {"repository": f"{org}/{repo}", "ref": ref, **run, "check_suite": suite}
+        for suite in iter_check_suites_for_ref(client, org, repo, ref)
+        for run in iter_check_runs_for_suite(client, org, repo, suite["id"], filter)
+    ]
+
+
+def export_check_runs(
+    client: GhApi,
+    org: str,
+    targets: Iterable[tuple[str, str]],
+    filter: str = "latest",
+    max_workers: int = 8,
+):
+    """Streams the check runs, with their suite and annotations, for each
+    (repo, ref) pair. The suites and runs for up to `max_workers` targets are
+    walked concurrently, and the annotations for up to `max_workers` runs are
+    retrieved concurrently. Results are yielded in target order.
+
+    Arguments:
+    client: The GhApi client
+    org: The owner of the repositories
+    targets: The (repo, ref) pairs to export
+    filter: Whether to include only the latest runs of each check (latest, all)
+    max_workers: The maximum number of concurrent requests at each level
+    """
+    runs = (
+        run
+        for target_runs in bounded_map(
+            lambda target: _list_check_runs_for_target(client, org, target, filter),
+            targets,
+            max_workers=max_workers,
+        )
+        for run in target_runs
+    )
+    return bounded_map(
+        lambda run: {
+            **run,
+            "annotations": list_check_run_annotations(
+                client, org, run["repository"].split("/", 1)[1], run
+            ),
+        },
+        runs,
+        max_workers=max_workers,
+    )
+
+
+SUCCESSFUL_CONCLUSIONS = ("success", "neutral", "skipped")
+"""Check run conclusions which do not indicate a failure"""
+
+
+@unique
+class WaitOutcome(SerializedEnum):
+    """Indicates the result of waiting for check runs to complete"""
+
+    SUCCEEDED = auto()
+    FAILED = auto()
+    TIMED_OUT = auto()
+
+
+def poll_check_runs_for_commit(
+    cache: ConditionalCache,
+    hostname: str,
+    token: str,
+    org: str,
+    repo: str,
+    ref: str,
+    filter: str = "latest",
+):
+    """Retrieves the check runs for the provided commit using conditional
+    requests, so polling unchanged results does not consume the rate limit.
+
+    Returns:
+    tuple: the check runs and whether any page changed since the previous poll
+    """
+    url = f"{resolve_rest_endpoint(hostname)}/repos/{org}/{repo}/commits/{ref}/check-runs"
+    runs, changed, page = [], False, 1
+    while True:
+        result, page_changed = cache.get(
+            url, token, params={"filter": filter, "per_page": 100, "page": page}
+        )
+        changed = changed or page_changed
+        runs.extend(result["check_runs"])
+        if len(result["check_runs"]) < 100:
+            return runs, changed
+        page += 1
+
+
+def _parse_timestamp(value: str):
+    return datetime.fromisoformat(value.replace("Z", "+00:00")) if value else None
+
+
+def _estimate_remaining_seconds(runs, now: datetime):
+    """Estimates when the pending runs will complete, using the typical
+    duration of the completed runs. Returns None if there is no estimate."""
+    durations = [
+        (_parse_timestamp(run["completed_at"]) - _parse_timestamp(run["started_at"]))
+        for run in runs
+        if run["status"] == "completed"
+        and run.get("started_at")
+        and run.get("completed_at")
+    ]
+    started = [
+        _parse_timestamp(run["started_at"])
+        for run in runs
+        if run["status"] != "completed" and run.get("started_at")
+    ]
+    if not durations:
+        return None
+    typical = median(duration.total_seconds() for duration in durations)
+    if not started:
+        return typical
+    return max(typical - (now - start).total_seconds() for start in started)
+
+
+def next_poll_interval(
+    runs, unchanged_polls: int, min_interval: float, max_interval: float, now=None
+):
+    """Determines how long to wait before polling again. Polls are scheduled
+    around half of the expected remaining time, and back off while the
+    results are unchanged."""
+    remaining = _estimate_remaining_seconds(runs, now or datetime.now(timezone.utc))
+    interval = remaining / 2 if remaining and remaining > 0 else min_interval
+    interval *= 1.5**unchanged_polls
+    return max(min_interval, min(max_interval, interval))
+
+
+def summarize_check_runs(runs) -> dict[str, int]:
+    """Counts the check runs by conclusion, or by status for incomplete runs"""
+    return dict(
+        Counter(
+            run["conclusion"] if run["status"] == "completed" else run["status"]
+            for run in runs
+        )
+    )
+
+
+def _evaluate_check_runs(runs, fail_fast: bool):
+    """Returns the outcome of the check runs, or None if they are still pending"""
+    failed = any(
+        run["status"] == "completed" and run["conclusion"] not in SUCCESSFUL_CONCLUSIONS
+        for run in runs
+    )
+    if failed and fail_fast:
+        return WaitOutcome.FAILED
+    if not runs or any(run["status"] != "completed" for run in runs):
+        return None
+    return WaitOutcome.FAILED if failed else WaitOutcome.SUCCEEDED
+
+
+def wait_for_check_runs(
+    poll: Callable[[], tuple[list, bool]],
+    timeout: float,
+    min_interval: float = 5,
+    max_interval: float = 60,
+    fail_fast: bool = False,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+):
+    """Polls until every check run has completed (and at least one exists),
+    a run fails when `fail_fast` is set, or the timeout elapses.
+
+    Arguments:
+    poll: Returns the current check runs and whether they changed since the last poll
+    timeout: The maximum number of seconds to wait
+    min_interval: The minimum number of seconds between polls
+    max_interval: The maximum number of seconds between polls
+    fail_fast: Stops waiting as soon as any run fails
+
+    Returns:
+    tuple: the WaitOutcome and the most recent check runs
+    """
+    deadline = clock() + timeout
+    unchanged_polls = 0
+    while True:
+        runs, changed = poll()
+        outcome = _evaluate_check_runs(runs, fail_fast)
+        if outcome:
+            return outcome, runs
+        unchanged_polls = 0 if changed else unchanged_polls + 1
+        remaining = deadline - clock()
+        if remaining <= 0:
+            return WaitOutcome.TIMED_OUT, runs
+        interval = next_poll_interval(runs, unchanged_polls, min_interval, max_interval)
+        sleep(min(interval, remaining))
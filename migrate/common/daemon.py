@@ -0,0 +1,191 @@
+"""
+Supports running the tool as a long-lived server. Commands are forwarded
+by a thin client over a local Unix socket and executed in the server process,
+reusing the imported modules, cached clients and parsed configuration.
+
+The client passes its standard streams to the server with the request, so
+output is written directly to the caller's terminal, files or pipes.
+"""
+
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+
+SERVER_ENVVAR = "MIGRATE_SERVER"
+"""Environment variable containing the socket path of a running server"""
+
+_HEADER_SIZE = 8
+_STANDARD_STREAMS = (0, 1, 2)
+
+
+def is_supported():
+    """Indicates whether the platform supports passing streams over Unix sockets"""
+    return hasattr(socket, "AF_UNIX") and hasattr(socket, "send_fds")
+
+
+def default_socket_path():
+    """Returns the default socket path for the current user"""
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f"migrate-{os.getuid()}.sock")
+
+
+def _receive_exactly(sock: socket.socket, size: int):
+    """Reads the specified number of bytes from the socket"""
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            raise ConnectionError("Connection closed before the request was received")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _flush_standard_streams():
+    for stream in (sys.stdout, sys.stderr):
+        if stream is not None:
+            stream.flush()
+
+
+def _connect(socket_path: str):
+    """Connects to a server, returning None if no server is listening"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        return sock
+    except OSError:
+        sock.close()
+        return None
+
+
+def _send_request(sock: socket.socket, argv: list[str]) -> int:
+    """Sends the command line and standard streams, then waits for the exit code"""
+    payload = json.dumps(
+        {"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)}
+    ).encode("utf-8")
+    _flush_standard_streams()
+    socket.send_fds(
+        sock, [len(payload).to_bytes(_HEADER_SIZE, "big")], list(_STANDARD_STREAMS)
+    )
+    sock.sendall(payload)
+    with sock.makefile("r", encoding="utf-8") as response:
+        exit_code = response.readline().strip()
+    return int(exit_code) if exit_code else 1
+
+
+def forward(socket_path: str, argv: list[str]) -> int:
+    """Forwards a command line to a running server and returns the exit code"""
+    sock = _connect(socket_path)
+    if sock is None:
+        raise ConnectionError(f"No server is listening on {socket_path}")
+    with sock:
+        return _send_request(sock, argv)
+
+
+def forward_if_serving(argv: list[str]):
+    """Forwards the command line if a server is configured using MIGRATE_SERVER.
+
+    Returns:
+    int: the exit code of the command, or None if the command was not forwarded
+    """
+    socket_path = os.getenv(SERVER_ENVVAR)
+    if not socket_path or not is_supported() or argv[:1] == ["serve"]:
+        return None
+    sock = _connect(socket_path)
+    if sock is None:
+        return None
+    with sock:
+        return _send_request(sock, argv)
+
+
+def _invoke(command, request: dict, fds: list[int]) -> int:
+    """Runs a command using the streams, working directory and environment
+    of the client. The server state is restored afterwards, and repository
+    snapshots are discarded so each command observes the current state."""
+    from .batch import run_command
+    from .repos import clear_repo_snapshots
+
+    saved_fds = [os.dup(fd) for fd in _STANDARD_STREAMS]
+    saved_env = dict(os.environ)
+    saved_cwd = os.getcwd()
+    _flush_standard_streams()
+    try:
+        for target, fd in zip(_STANDARD_STREAMS, fds):
+            os.dup2(fd, target)
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        clear_repo_snapshots()
+        return run_command(command, request["argv"])
+    finally:
+        _flush_standard_streams()
+        os.environ.clear()
+        os.environ.update(saved_env)
+        os.chdir(saved_cwd)
+        for target, fd in zip(_STANDARD_STREAMS, saved_fds):
+            os.dup2(fd, target)
+            os.close(fd)
+
+
+class _CommandHandler(socketserver.BaseRequestHandler):
+    """Executes a single forwarded command"""
+
+    def handle(self):
+        header, fds, _, _ = socket.recv_fds(
+            self.request, _HEADER_SIZE, len(_STANDARD_STREAMS)
+        )
+        try:
+            if len(fds) != len(_STANDARD_STREAMS):
+                raise ConnectionError("The client did not provide its standard streams")
+            size = int.from_bytes(header, "big")
+            request = json.loads(_receive_exactly(self.request, size))
+            exit_code = _invoke(self.server.command, request, fds)
+        finally:
+            for fd in fds:
+                os.close(fd)
+        self.request.sendall(f"{exit_code}\n".encode("utf-8"))
+
+
+class CommandServer(socketserver.UnixStreamServer):
+    """Unix socket server which executes forwarded commands one at a time.
+    Commands are serialized because the standard streams, working directory
+    and environment are process-wide."""
+
+    def __init__(self, command, socket_path: str):
+        self.command = command
+        _remove_stale_socket(socket_path)
+        previous_umask = os.umask(0o077)
+        try:
+            super().__init__(socket_path, _CommandHandler)
+        finally:
+            os.umask(previous_umask)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def _remove_stale_socket(socket_path: str):
+    """Removes a socket left behind by a server which is no longer running"""
+    if not os.path.exists(socket_path):
+        return
+    sock = _connect(socket_path)
+    if sock is not None:
+        sock.close()
+        raise OSError(f"A server is already listening on {socket_path}")
+    os.unlink(socket_path)
+
+
+def serve_commands(command, socket_path: str):
+    """Executes forwarded commands until interrupted or terminated"""
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    with CommandServer(command, socket_path) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,163 @@
+"""
+Searches the log archives of workflow runs. Archives are downloaded by a pool
+of threads and scanned by a pool of processes, so decompression and pattern
+matching scale across the available cores.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import re
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+from .api import stream_download
+from .archives import ZipArchive
+from .tasks import bounded_map
+from .types import DictData
+
+if TYPE_CHECKING:
+    from ghapi.all import GhApi
+
+
+@dataclass(frozen=True)
+class LogMatch(DictData):
+    """A line in a workflow run log which matched the search pattern"""
+
+    run_id: int
+    job: str
+    step: str
+    line_number: int
+    line: str
+    before: list[str] = field(default_factory=list)
+    after: list[str] = field(default_factory=list)
+
+
+@lru_cache(maxsize=16)
+def _compile(pattern: str, flags: int):
+    return re.compile(pattern, flags)
+
+
+def _describe_member(name: str):
+    """Determines the job and step from the name of a log file. Step logs are
+    stored as `<job>/<n>_<step>.txt`, and complete job logs as `<n>_<job>.txt`."""
+    folder, _, filename = name.rpartition("/")
+    title = re.sub(r"^\d+_", "", filename.removesuffix(".txt"))
+    return (folder, title) if folder else (title, None)
+
+
+def _log_members(archive: ZipArchive):
+    """Selects the step logs in an archive, or the job logs if there are no steps"""
+    names = archive.names()
+    steps = [name for name in names if "/" in name]
+    return steps or names
+
+
+def scan_log_archive(
+    run_id: int, path: str, pattern: str, flags: int = 0, context: int = 0
+) -> list[LogMatch]:
+    """Scans the logs in a workflow run log archive, decompressing each log as it
+    is read. This is executed in a worker process.
+
+    Arguments:
+    run_id: The id of the workflow run
+    path: The path to the log archive
+    pattern: The regular expression to search for
+    flags: The regular expression flags
+    context: The number of lines to include before and after each match
+    """
+    expression = _compile(pattern, flags)
+    matches = []
+    with ZipArchive(path) as archive:
+        for name in _log_members(archive):
+            job, step = _describe_member(name)
+            before = deque(maxlen=context)
+            pending = []
+            for number, line in enumerate(archive.iter_lines(name), start=1):
+                for match in pending:
+                    match.after.append(line)
+                pending = [match for match in pending if len(match.after) < context]
+                if expression.search(line):
+                    match = LogMatch(run_id, job, step, number, line, list(before))
+                    matches.append(match)
+                    if context:
+                        pending.append(match)
+                before.append(line)
+    return matches
+
+
+def _download_log_archive(client: GhApi, token: str, org: str, repo: str, run_id, folder):
+    """Downloads the log archive for a run, returning None if it is unavailable"""
+    path = os.path.join(folder, f"{run_id}.zip")
+    url = f"{client.gh_host}/repos/{org}/{repo}/actions/runs/{run_id}/logs"
+    return path if stream_download(url, token, path) else None
+
+
+def search_workflow_run_logs(
+    client: GhApi,
+    token: str,
+    org: str,
+    repo: str,
+    run_ids: Iterable[int],
+    pattern: str,
+    flags: int = 0,
+    context: int = 0,
+    download_workers: int = 8,
+    scan_workers: int = None,
+) -> Iterator[LogMatch]:
+    """Searches the logs of the workflow runs, yielding the matches in run order.
+    Runs without logs (such as expired logs) are ignored. Each archive is removed
+    as soon as it has been scanned.
+
+    Arguments:
+    client: The GhApi client
+    token: The access token
+    org: The owner of the repository
+    repo: The name of the repository
+    run_ids: The ids of the workflow runs to search
+    pattern: The regular expression to search for
+    flags: The regular expression flags
+    context: The number of lines to include before and after each match
+    download_workers: The number of archives to download concurrently
+    scan_workers: The number of processes scanning archives (default: CPU count)
+    """
+    _compile(pattern, flags)  # Reports an invalid pattern before downloading
+    scan_workers = scan_workers or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory(prefix="migrate-logs-") as folder:
+        downloads = bounded_map(
+            lambda run_id: (
+                run_id,
+                _download_log_archive(client, token, org, repo, run_id, folder),
+            ),
+            run_ids,
+            max_workers=download_workers,
+        )
+        # Worker processes are spawned, since forking a threaded process is unsafe
+        with ProcessPoolExecutor(
+            max_workers=scan_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            scans = deque()
+
+            def complete_scan():
+                future, path = scans.popleft()
+                try:
+                    return future.result()
+                finally:
+                    os.remove(path)
+
+            for run_id, path in downloads:
+                if path is None:
+                    continue
+                future = pool.submit(
+                    scan_log_archive, run_id, path, pattern, flags, context
+                )
+                scans.append((future, path))
+                if len(scans) >= scan_workers * 2:
+                    yield from complete_scan()
+            while scans:
+                yield from complete_scan()
@@ -0,0 +1,213 @@
+"""
+Collects per-endpoint metrics for the API requests made by a command: the
+number of requests, a latency histogram, the bytes received, the status codes,
+the retries and the rate-limit cost. Endpoints are identified by their method
+and path template (such as `GET /repos/{owner}/{repo}`), so repeated calls to
+the same endpoint are aggregated. The metrics are written as JSON or in the
+Prometheus text exposition format.
+
+Successful REST requests are counted with the status `2xx`, since the GhApi
+transport does not report the exact code (such as 201 or 204). Errors and
+the requests made without GhApi report the actual status code.
+"""
+
+import json
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+from .api import RequestEvent, add_request_listener, remove_request_listener
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+"""The upper bounds (in seconds) of the latency histogram buckets"""
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+_SERVER_PREFIX = re.compile(r"^/api(?:/v3)?(?=/)")
+"""The prefix of the REST (/api/v3) and GraphQL (/api/graphql) paths on a server"""
+
+
+def endpoint_template(template: str) -> str:
+    """Normalizes a path template or URL to a path, replacing numeric ids with
+    `{id}`, so URLs built outside the operation table are still aggregated"""
+    if template.startswith(("http://", "https://")):
+        template = _SERVER_PREFIX.sub("", urlparse(template).path)
+    return _ID_SEGMENT.sub("/{id}", template) or "/"
+
+
+@dataclass
+class EndpointMetrics:
+    """The metrics for the requests to one endpoint"""
+
+    count: int = 0
+    statuses: Counter = field(default_factory=Counter)
+    duration: float = 0.0
+    max_duration: float = 0.0
+    buckets: list[int] = field(default_factory=lambda: [0] * len(LATENCY_BUCKETS))
+    bytes: int = 0
+    retries: int = 0
+    rate_limit_cost: int = 0
+
+    def record(self, event: RequestEvent, cost: int, retry: bool):
+        self.count += 1
+        self.statuses[str(event.status or "error")] += 1
+        self.duration += event.duration
+        self.max_duration = max(self.max_duration, event.duration)
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if event.duration <= bound:
+                self.buckets[index] += 1
+                break
+        self.bytes += event.size or 0
+        self.retries += retry
+        self.rate_limit_cost += cost
+
+
+class ApiMetrics:
+    """Aggregates request events by endpoint. Register the instance as a
+    request listener using `start`, and `stop` it before exporting."""
+
+    def __init__(self):
+        self._endpoints: dict[tuple[str, str], EndpointMetrics] = {}
+        self._used: dict[str, tuple[int, int]] = {}
+        self._failed: set[tuple[str, str]] = set()
+        self._lock = threading.Lock()
+
+    def start(self):
+        add_request_listener(self)
+        return self
+
+    def stop(self):
+        remove_request_listener(self)
+
+    def __call__(self, event: RequestEvent):
+        key = (event.method, endpoint_template(event.template))
+        request = (event.method, event.url or event.template)
+        failed = event.status is None or (
+            isinstance(event.status, int) and event.status >= 400
+        )
+        with self._lock:
+            retry = request in self._failed
+            if failed:
+                self._failed.add(request)
+            else:
+                self._failed.discard(request)
+            metrics = self._endpoints.get(key)
+            if metrics is None:
+                metrics = self._endpoints[key] = EndpointMetrics()
+            metrics.record(event, self._rate_limit_cost(event.headers), retry)
+
+    def _rate_limit_cost(self, headers: dict) -> int:
+        """Determines the cost of a request from the increase in the rate-limit
+        points used for its resource (such as `core` or `graphql`). Concurrent
+        requests can be reported out of order, so only the highest value seen
+        in each rate-limit window (identified by X-RateLimit-Reset) is used."""
+        if "X-RateLimit-Used" not in headers:
+            return 0
+        resource = headers.get("X-RateLimit-Resource", "core")
+        used = int(headers["X-RateLimit-Used"])
+        reset = int(headers.get("X-RateLimit-Reset") or 0)
+        previous = self._used.get(resource)
+        if previous is None:
+            self._used[resource] = (reset, used)
+            return 1 if used else 0
+        previous_reset, previous_used = previous
+        if reset > previous_reset:
+            self._used[resource] = (reset, used)
+            return used
+        if reset < previous_reset or used <= previous_used:
+            return 0
+        self._used[resource] = (reset, used)
+        return used - previous_used
+
+    def to_dict(self) -> dict:
+        """Summarizes the endpoints, ordered by the total time spent on each"""
+        with self._lock:
+            items = sorted(self._endpoints.items(), key=lambda item: -item[1].duration)
+            return {
+                "endpoints": [
+                    {
+                        "method": method,
+                        "endpoint": endpoint,
+                        "count": metrics.count,
+                        "statuses": dict(metrics.statuses),
+                        "duration": {
+                            "total": round(metrics.duration, 6),
+                            "mean": round(metrics.duration / metrics.count, 6),
+                            "max": round(metrics.max_duration, 6),
+                        },
+                        "latency_buckets": {
+                            _format_bound(bound): count
+                            for bound, count in zip(LATENCY_BUCKETS, metrics.buckets)
+                        },
+                        "bytes": metrics.bytes,
+                        "retries": metrics.retries,
+                        "rate_limit_cost": metrics.rate_limit_cost,
+                    }
+                    for (method, endpoint), metrics in items
+                ]
+            }
+
+    def to_prometheus(self) -> str:
+        """Formats the metrics using the Prometheus text exposition format"""
+        lines = []
+
+        def family(name: str, kind: str, description: str):
+            lines.append(f"# HELP migrate_api_{name} {description}")
+            lines.append(f"# TYPE migrate_api_{name} {kind}")
+
+        with self._lock:
+            items = sorted(self._endpoints.items())
+            family("requests_total", "counter", "API requests by endpoint and status")
+            for (method, endpoint), metrics in items:
+                for status, count in sorted(metrics.statuses.items()):
+                    labels = _labels(method=method, endpoint=endpoint, status=status)
+                    lines.append(f"migrate_api_requests_total{{{labels}}} {count}")
+            family("request_duration_seconds", "histogram", "API request latency")
+            for (method, endpoint), metrics in items:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, metrics.buckets):
+                    cumulative += count
+                    labels = _labels(
+                        method=method, endpoint=endpoint, le=_format_bound(bound)
+                    )
+                    lines.append(
+                        f"migrate_api_request_duration_seconds_bucket{{{labels}}} {cumulative}"
+                    )
+                labels = _labels(method=method, endpoint=endpoint)
+                lines.append(
+                    f"migrate_api_request_duration_seconds_sum{{{labels}}} {metrics.duration}"
+                )
+                lines.append(
+                    f"migrate_api_request_duration_seconds_count{{{labels}}} {metrics.count}"
+                )
+            for name, attribute, description in (
+                ("response_bytes_total", "bytes", "Bytes received from the API"),
+                ("retries_total", "retries", "Requests repeating a failed request"),
+                ("rate_limit_cost_total", "rate_limit_cost", "Rate-limit points used"),
+            ):
+                family(name, "counter", description)
+                for (method, endpoint), metrics in items:
+                    labels = _labels(method=method, endpoint=endpoint)
+                    value = getattr(metrics, attribute)
+                    lines.append(f"migrate_api_{name}{{{labels}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, format: str = "json"):  # pylint: disable=redefined-builtin
+        """Writes the metrics to a file as JSON or Prometheus text"""
+        with open(path, "w", encoding="utf-8") as file:
+            if format == "prometheus":
+                file.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), file, indent=2)
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else str(bound)
+
+
+def _labels(**labels) -> str:
+    def escape(value: str):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return ",".join(f'{name}="{escape(value)}"' for name, value in labels.items())
@@ -2,14 +2,31 @@
 Common command line settings and options
 """
 
+import importlib
 import os
 import click
-from yaml import load, dump
 
-try:
-    from yaml import CLoader as Loader
-except ImportError:
-    from yaml import Loader
+from .trace import span
+
+_config_cache = {}
+
+
+def _load_config_file(filename):
+    """Parses a configuration file, reusing the parsed content while the file is unchanged"""
+    from yaml import load
+
+    try:
+        from yaml import CLoader as Loader
+    except ImportError:
+        from yaml import Loader
+
+    path = os.path.abspath(filename)
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key not in _config_cache:
+        with open(path, "r", encoding="utf-8") as file:
+            _config_cache[key] = load(file.read(), Loader=Loader)
+    return _config_cache[key]
 
 
 class BaseState:
@@ -22,10 +39,10 @@ class BaseState:
         """
         key_prefix = None if not hasattr(self, "prefix") else self.prefix
         if filename and os.path.exists(filename):
-            with open(filename, "r", encoding="utf-8") as file:
-                config = load(file.read(), Loader=Loader)
+            with span("load config", "config", file=filename):
+                config = _load_config_file(filename)
             if key_prefix is None:
-                ctx.default_map = config
+                ctx.default_map = dict(config)
             else:
                 ctx.default_map = {}
                 for key in (key for key in config if key.startswith(f"{key_prefix}_")):
@@ -34,6 +51,8 @@ class BaseState:
 
     def write_config(self, filename):
         """Writes the state to a config file"""
+        from yaml import dump
+
         with open(filename, "w", encoding="utf-8") as file:
             dump(self, file)
 
@@ -60,6 +79,60 @@ class MigrationState(BaseState):
         self.dest_org = None
 
 
+class LazyGroup(click.Group):
+    """Click group which imports its subcommands when they are first used.
+
+    Subcommands are registered with the import path of the command and its
+    help text, allowing the group help to be displayed without importing them.
+    """
+
+    def __init__(self, *args, lazy_subcommands: dict = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def list_commands(self, ctx):
+        return sorted({*super().list_commands(ctx), *self.lazy_subcommands})
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.commands and cmd_name in self.lazy_subcommands:
+            self.add_command(self._load_command(cmd_name), cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def _load_command(self, cmd_name):
+        import_path, _ = self.lazy_subcommands[cmd_name]
+        module_name, attr_name = import_path.split(":")
+        command = getattr(importlib.import_module(module_name), attr_name)
+        if not isinstance(command, click.Command):
+            raise ValueError(f"Lazy loading of {import_path} did not return a command")
+        return command
+
+    def format_commands(self, ctx, formatter):
+        """Writes the subcommands, using the registered help for unloaded commands"""
+        commands = []
+        for name in self.list_commands(ctx):
+            if name in self.commands:
+                command = self.commands[name]
+                if not command.hidden:
+                    commands.append((name, command.get_short_help_str))
+            else:
+                help_text = self.lazy_subcommands[name][1]
+                commands.append(
+                    (
+                        name,
+                        lambda limit, text=help_text: click.utils.make_default_short_help(
+                            text, limit
+                        ),
+                    )
+                )
+
+        if commands:
+            limit = formatter.width - 6 - max(len(name) for name, _ in commands)
+            with formatter.section("Commands"):
+                formatter.write_dl(
+                    [(name, short_help(limit)) for name, short_help in commands]
+                )
+
+
 CONTEXT_SETTINGS = dict(
     token_normalize_func=lambda x: x.lower(),
     auto_envvar_prefix=None,
@@ -296,3 +369,39 @@ def target_options(fxn):
     fxn = _option_target_config_prefix(fxn)
     fxn = _option_target_config(fxn)
     return fxn
+
+
+def pipeline_options(fxn):
+    """Decorator to configure the reader/writer pipeline options for bulk copy commands"""
+    fxn = click.option(
+        "--retry-manifest",
+        type=click.File("w"),
+        default=None,
+        help="Writes the failed copies to a YAML mapping which can be retried "
+        "using --mapping",
+    )(fxn)
+    fxn = click.option(
+        "--write-interval",
+        type=click.FloatRange(min=0),
+        default=0.0,
+        help="The minimum number of seconds between destination writes (default: 0)",
+    )(fxn)
+    fxn = click.option(
+        "--read-interval",
+        type=click.FloatRange(min=0),
+        default=0.0,
+        help="The minimum number of seconds between source reads (default: 0)",
+    )(fxn)
+    fxn = click.option(
+        "--writers",
+        type=click.IntRange(min=1),
+        default=2,
+        help="The number of concurrent destination writers (default: 2)",
+    )(fxn)
+    fxn = click.option(
+        "--readers",
+        type=click.IntRange(min=1),
+        default=8,
+        help="The number of concurrent source readers (default: 8)",
+    )(fxn)
+    return fxn
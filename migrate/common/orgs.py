@@ -1,9 +1,12 @@
 """Methods for using the GitHub API for organizations"""
 
+from __future__ import annotations
+
 import sys
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from enum import Enum, unique, auto
-from ghapi.all import GhApi
+from functools import partial
+from typing import TYPE_CHECKING, Iterable, Iterator
 from .api import (
     GhPublicKey,
     is_ghec,
@@ -14,11 +17,16 @@ from .api import (
     call_with_exception_handler,
     get_paged_data,
     paginated,
+    paginated_items,
     graphql_query,
 )
-from .repos import Repo
+from .repos import Repo, RepoIndex
+from .tasks import run_copy_pipeline
 from .types import SerializedEnum, DictData, alternative_name
 
+if TYPE_CHECKING:
+    from ghapi.all import GhApi
+
 
 @unique
 class OrgRepoSort(SerializedEnum):
@@ -238,15 +246,70 @@ def get_org_settings(client: GhApi, org: str):
     return OrgSettings.from_dict(result)
 
 
+def _org_settings_values(settings: OrgSettings, include_ghas: bool = True) -> dict:
+    """Converts the settings to the values sent to the API, optionally
+    excluding the GitHub Advanced Security settings"""
+    values = settings.to_dict()
+    if not include_ghas:
+        for setting in fields(OrgGhasSettings):
+            values.pop(setting.name, None)
+    return values
+
+
 @rate_limited
-def set_org_settings(client: GhApi, org: str, settings: OrgSettings):
-    """Updates the organization configuration"""
+def set_org_settings(
+    client: GhApi, org: str, settings: OrgSettings, include_ghas: bool = True
+):
+    """Updates the organization configuration. The GitHub Advanced Security
+    settings are only updated if `include_ghas` is set."""
     result = call_with_exception_handler(
-        org, client.orgs.update, org=org, **settings.to_dict()
+        org, client.orgs.update, org=org, **_org_settings_values(settings, include_ghas)
     )
     return OrgSettings.from_dict(result)
 
 
+def copy_org_settings_bulk(
+    src_client: GhApi,
+    dest_client: GhApi,
+    pairs: Iterable[tuple[str, str]],
+    readers: int = 4,
+    writers: int = 2,
+    read_interval: float = 0.0,
+    write_interval: float = 0.0,
+    include_ghas: bool = True,
+):
+    """Copies the settings for each (source, destination) pair of organizations
+    using a reader/writer pipeline. Destinations which already match the source
+    are skipped. The GitHub Advanced Security settings are only compared and
+    copied if `include_ghas` is set.
+
+    Returns:
+    Iterator[CopyResult]: the outcome for each pair, in the order they complete
+    """
+
+    def read(src, dest):
+        settings = get_org_settings(src_client, src)
+        current = get_org_settings(dest_client, dest)
+        if _org_settings_values(current, include_ghas) == _org_settings_values(
+            settings, include_ghas
+        ):
+            return None
+        return settings
+
+    def write(src, dest, settings):
+        set_org_settings(dest_client, dest, settings, include_ghas)
+
+    return run_copy_pipeline(
+        pairs,
+        read,
+        write,
+        readers=readers,
+        writers=writers,
+        read_interval=read_interval,
+        write_interval=write_interval,
+    )
+
+
 def get_org_id(endpoint: str, token: str, org: str):
     """Retrieves the organization ID for the specified organization"""
     query = """
@@ -470,14 +533,29 @@ def list_organization_repositories(
     type: OrgRepoType = OrgRepoType.ALL,
 ) -> list[Repo]:
     """Lists the repositories in a specified organization"""
+    return list(iter_organization_repositories(client, org, sort, type))
 
-    def convert(repo):
-        return Repo.deserialize(repo)
 
-    result = call_with_exception_handler(
-        paginated, client.repos.list_for_org, org=org, sort=str(sort), type=str(type)
+def iter_organization_repositories(
+    client: GhApi,
+    org: str,
+    sort: OrgRepoSort = OrgRepoSort.FULL_NAME,
+    type: OrgRepoType = OrgRepoType.ALL,
+) -> Iterator[Repo]:
+    """Streams the repositories in a specified organization, one page at a time"""
+    result = paginated_items(
+        partial(call_with_exception_handler, org, client.repos.list_for_org),
+        org=org,
+        sort=str(sort),
+        type=str(type),
     )
-    return list(map(convert, result))
+    return map(Repo.deserialize, result)
+
+
+def index_organization_repositories(client: GhApi, org: str) -> RepoIndex:
+    """Indexes the repositories in an organization from a single listing, so the
+    existence of many repositories can be checked without requesting each one"""
+    return RepoIndex(iter_organization_repositories(client, org))
 
 
 def get_organizations_in_enterprise(hostname: str, token: str, enterprise: str):
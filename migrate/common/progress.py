@@ -0,0 +1,211 @@
+"""
+Reports the progress of long-running commands on stderr: the items completed
+and remaining, the request rate, the rate-limit headroom, the time spent
+waiting for throttles and the estimated time remaining. On a terminal a status
+line is redrawn in place; otherwise a line is written periodically.
+
+Reporting is enabled by the root `--progress` option. Work is counted with
+`track` or `progress`, which cost a lock and an addition per item whether or
+not reporting is enabled. Output is rendered by a background thread.
+"""
+
+import sys
+import threading
+import time
+from typing import Iterable, Iterator, TextIO
+
+from .api import (
+    RequestEvent,
+    add_request_listener,
+    remove_request_listener,
+    throttled_seconds,
+)
+
+TERMINAL_INTERVAL = 0.5
+"""The number of seconds between updates of the status line on a terminal"""
+
+LOG_INTERVAL = 10.0
+"""The number of seconds between progress lines when stderr is not a terminal"""
+
+
+class Progress:
+    """Counts the items completed for a unit of work"""
+
+    def __init__(self, label: str, total: int = None):
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def advance(self, count: int = 1):
+        """Records completed items"""
+        with self._lock:
+            self.done += count
+
+    def close(self):
+        """Stops reporting the progress"""
+        if _reporter is not None:
+            _reporter.remove(self)
+
+    def describe(self, now: float) -> str:
+        """Summarizes the items completed, remaining and the estimated time remaining"""
+        with self._lock:
+            done, total = self.done, self.total
+        if not total:
+            return f"{self.label}: {done}"
+        text = f"{self.label}: {done}/{total} ({done * 100 // total}%)"
+        elapsed = now - self.started
+        if 0 < done < total and elapsed > 0:
+            text += f", ETA {_format_duration((total - done) * elapsed / done)}"
+        return text
+
+
+class _RequestStats:
+    """Counts the API requests and tracks the most recent rate-limit headers"""
+
+    def __init__(self):
+        self.requests = 0
+        self.remaining = None
+        self.limit = None
+        self.reset = None
+        self._lock = threading.Lock()
+
+    def __call__(self, event: RequestEvent):
+        headers = event.headers
+        with self._lock:
+            self.requests += 1
+            if "X-RateLimit-Remaining" in headers:
+                self.remaining = int(headers["X-RateLimit-Remaining"])
+                self.limit = int(headers.get("X-RateLimit-Limit") or 0) or self.limit
+                self.reset = int(headers.get("X-RateLimit-Reset") or 0) or self.reset
+
+
+class ProgressReporter:
+    """Renders the active progress and request statistics on a background thread"""
+
+    def __init__(self, stream: TextIO = None, interval: float = None):
+        self.stream = stream or sys.stderr
+        self.is_terminal = bool(getattr(self.stream, "isatty", lambda: False)())
+        self.interval = interval or (
+            TERMINAL_INTERVAL if self.is_terminal else LOG_INTERVAL
+        )
+        self.stats = _RequestStats()
+        self._active: list[Progress] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._started = time.monotonic()
+        self._throttled = throttled_seconds()
+        self._previous = (self._started, 0)
+        self._width = 0
+
+    def start(self):
+        add_request_listener(self.stats)
+        self._thread.start()
+
+    def stop(self):
+        """Stops rendering and writes a final summary"""
+        self._stopped.set()
+        self._thread.join()
+        remove_request_listener(self.stats)
+        self._write(self.describe(time.monotonic(), overall=True), final=True)
+
+    def add(self, progress: Progress):
+        with self._lock:
+            self._active.append(progress)
+
+    def remove(self, progress: Progress):
+        with self._lock:
+            if progress in self._active:
+                self._active.remove(progress)
+
+    def describe(self, now: float, overall: bool = False) -> str:
+        """Summarizes the active work, the request rate (recent, or overall for
+        the summary), the rate-limit headroom and the time spent throttled"""
+        with self._lock:
+            parts = [progress.describe(now) for progress in self._active]
+        requests = self.stats.requests
+        since, previous = (self._started, 0) if overall else self._previous
+        self._previous = (now, requests)
+        if now > since:
+            parts.append(f"{(requests - previous) / (now - since):.1f} req/s")
+        parts.append(f"{requests} requests")
+        if self.stats.remaining is not None:
+            headroom = f"rate limit {self.stats.remaining}/{self.stats.limit or '?'}"
+            if self.stats.reset:
+                headroom += (
+                    f" (resets in {_format_duration(self.stats.reset - time.time())})"
+                )
+            parts.append(headroom)
+        throttled = throttled_seconds() - self._throttled
+        if throttled > 0:
+            parts.append(f"throttled {_format_duration(throttled)}")
+        return " | ".join(parts)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._write(self.describe(time.monotonic()))
+
+    def _write(self, line: str, final: bool = False):
+        if self.is_terminal:
+            padding = " " * max(0, self._width - len(line))
+            self._width = len(line)
+            self.stream.write(f"\r{line}{padding}" + ("\n" if final else ""))
+        else:
+            self.stream.write(f"{line}\n")
+        self.stream.flush()
+
+
+_reporter: ProgressReporter = None
+
+
+def start_progress(stream: TextIO = None, interval: float = None) -> bool:
+    """Starts reporting progress, returning False if it is already being reported"""
+    global _reporter  # pylint: disable=global-statement
+    if _reporter is not None:
+        return False
+    _reporter = ProgressReporter(stream, interval)
+    _reporter.start()
+    return True
+
+
+def stop_progress():
+    """Stops reporting progress, writing a final summary"""
+    global _reporter  # pylint: disable=global-statement
+    reporter, _reporter = _reporter, None
+    if reporter is not None:
+        reporter.stop()
+
+
+def progress(label: str, total: int = None) -> Progress:
+    """Creates a progress counter, which is reported if reporting is enabled"""
+    counter = Progress(label, total)
+    if _reporter is not None:
+        _reporter.add(counter)
+    return counter
+
+
+def track(items: Iterable, label: str, total: int = None) -> Iterator:
+    """Yields the items, counting each one as it is consumed"""
+    if total is None and hasattr(items, "__len__"):
+        total = len(items)
+    with progress(label, total) as counter:
+        for item in items:
+            yield item
+            counter.advance()
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = max(0, int(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
@@ -1,20 +1,34 @@
 """Methods for using the GitHub API for pull requests"""
 
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import time
 from copy import copy
 from dataclasses import dataclass, fields
 from enum import Enum, unique, auto
-from ghapi.all import GhApi
+from functools import partial
+from typing import TYPE_CHECKING
 from .api import (
     GhPublicKey,
     encrypt_secret,
     paginated,
+    paginated_items,
     rate_limited,
     call_with_exception_handler,
+    graphql_query,
 )
-from .types import SerializedEnum, DictData, alternative_name
+from .tasks import bounded_map
+from .types import SerializedEnum, DictData, FastcoreJsonEncoder, alternative_name
 
+if TYPE_CHECKING:
+    from ghapi.all import GhApi
 
-def list_pull_requests(
+
+def iter_pull_requests(
     client: GhApi,
     org: str,
     repo: str,
@@ -22,17 +36,27 @@ def list_pull_requests(
     sort="created",
     direction="desc",
 ):
-    """Retrieves the pull requests for the provided repo"""
-    result = call_with_exception_handler(
-        f"{org}/{repo}",
-        client.pulls.list,
+    """Streams the pull requests for the provided repo, requesting each page as needed"""
+    return paginated_items(
+        partial(call_with_exception_handler, f"{org}/{repo}", client.pulls.list),
         owner=org,
         repo=repo,
         state=state,
         sort=sort,
         direction=direction,
     )
-    return result
+
+
+def list_pull_requests(
+    client: GhApi,
+    org: str,
+    repo: str,
+    state: str = "open",
+    sort="created",
+    direction="desc",
+):
+    """Retrieves all of the pull requests for the provided repo"""
+    return list(iter_pull_requests(client, org, repo, state, sort, direction))
 
 
 def get_pull_request(client: GhApi, org: str, repo: str, pr: int):
@@ -43,17 +67,406 @@ def get_pull_request(client: GhApi, org: str, repo: str, pr: int):
     return result
 
 
-def list_commits_on_pull_request(
-    client: GhApi, org: str, repo: str, pr: int, state: str = "open"
+def list_commits_on_pull_request(client: GhApi, org: str, repo: str, pr: int):
+    """Retrieves the commits for the provided pull request. The API returns
+    at most 250 commits."""
+    return list(
+        paginated_items(
+            partial(
+                call_with_exception_handler, f"{org}/{repo}", client.pulls.list_commits
+            ),
+            owner=org,
+            repo=repo,
+            pull_number=pr,
+        )
+    )
+
+
+def list_reviews_on_pull_request(client: GhApi, org: str, repo: str, pr: int):
+    """Retrieves the reviews for the provided pull request"""
+    return list(
+        paginated_items(
+            partial(
+                call_with_exception_handler, f"{org}/{repo}", client.pulls.list_reviews
+            ),
+            owner=org,
+            repo=repo,
+            pull_number=pr,
+        )
+    )
+
+
+def list_review_comments_on_pull_request(client: GhApi, org: str, repo: str, pr: int):
+    """Retrieves the review comments for the provided pull request"""
+    return list(
+        paginated_items(
+            partial(
+                call_with_exception_handler,
+                f"{org}/{repo}",
+                client.pulls.list_review_comments,
+            ),
+            owner=org,
+            repo=repo,
+            pull_number=pr,
+        )
+    )
+
+
+def get_pull_request_details(client: GhApi, org: str, repo: str, pull):
+    """Combines a pull request with its commits, reviews and review comments"""
+    return {
+        **pull,
+        "commits": list_commits_on_pull_request(client, org, repo, pull["number"]),
+        "reviews": list_reviews_on_pull_request(client, org, repo, pull["number"]),
+        "review_comments": list_review_comments_on_pull_request(
+            client, org, repo, pull["number"]
+        ),
+    }
+
+
+def export_pull_requests(
+    client: GhApi, org: str, repo: str, state: str = "all", max_workers: int = 8
 ):
-    """Retrieves the first 250 commits for the provided pull request"""
-    result = call_with_exception_handler(
-        f"{org}/{repo}",
-        paginated,
-        client.pulls.list_commits,
-        owner=org,
-        repo=repo,
-        pull_number=pr,
-        state=state,
+    """Streams every pull request in the repo with its commits, reviews and review
+    comments. The details are retrieved concurrently for up to `max_workers` pull
+    requests, and the results are yielded in listing order as they complete."""
+    pulls = iter_pull_requests(
+        client, org, repo, state=state, sort="created", direction="asc"
     )
-    return result
+    return bounded_map(
+        lambda pull: get_pull_request_details(client, org, repo, pull),
+        pulls,
+        max_workers=max_workers,
+    )
+
+
+def iter_updated_pull_requests(
+    client: GhApi, org: str, repo: str, since: str = None, state: str = "all"
+):
+    """Streams the pull requests updated at or after `since`, most recently updated
+    first. Paging stops at the first pull request older than the watermark, so
+    only the pages containing changes are requested.
+
+    Arguments:
+    since: An ISO 8601 `updated_at` timestamp. If None, every pull request is returned.
+    """
+    pulls = iter_pull_requests(
+        client, org, repo, state=state, sort="updated", direction="desc"
+    )
+    for pull in pulls:
+        # Timestamps at the watermark are included since other pull requests
+        # may have been updated within the same second after the last sync
+        if since and pull["updated_at"] < since:
+            return
+        yield pull
+
+
+def sync_pull_requests(
+    client: GhApi,
+    org: str,
+    repo: str,
+    watermarks: dict[str, str],
+    state: str = "all",
+    max_workers: int = 8,
+):
+    """Streams the details of the pull requests changed since the watermark
+    recorded for the repo. The watermark is advanced to the most recent
+    `updated_at` once every change has been yielded, so an interrupted sync
+    is repeated rather than skipped.
+
+    Arguments:
+    watermarks: Maps "org/repo" to the last synchronized `updated_at` timestamp
+    """
+    key = f"{org}/{repo}"
+    since = watermarks.get(key)
+    latest = since
+
+    def track(pulls):
+        nonlocal latest
+        for pull in pulls:
+            if latest is None or pull["updated_at"] > latest:
+                latest = pull["updated_at"]
+            yield pull
+
+    pulls = track(iter_updated_pull_requests(client, org, repo, since, state))
+    yield from bounded_map(
+        lambda pull: get_pull_request_details(client, org, repo, pull),
+        pulls,
+        max_workers=max_workers,
+    )
+    if latest:
+        watermarks[key] = latest
+
+
+def _write_json_atomic(filename: str, data):
+    """Writes a JSON file by replacing it, so readers never see a partial file"""
+    directory = os.path.dirname(os.path.abspath(filename))
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "w", dir=directory, suffix=".tmp", delete=False, encoding="utf-8"
+    ) as file:
+        json.dump(data, file, cls=FastcoreJsonEncoder)
+    os.replace(file.name, filename)
+
+
+def load_watermarks(filename: str) -> dict[str, str]:
+    """Reads the sync watermarks, returning an empty mapping if the file does not exist"""
+    if not os.path.exists(filename):
+        return {}
+    with open(filename, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_watermarks(filename: str, watermarks: dict[str, str]):
+    """Writes the sync watermarks"""
+    _write_json_atomic(filename, watermarks)
+
+
+def store_pull_request(store: str, org: str, repo: str, pull):
+    """Merges a pull request into a local store containing one JSON file per
+    pull request (`<store>/<org>/<repo>/<number>.json`)"""
+    _write_json_atomic(os.path.join(store, org, repo, f"{pull['number']}.json"), pull)
+
+
+_PULL_REQUEST_CONNECTIONS = {
+    "labels": "name color",
+    "commits": """
+        commit {
+            oid
+            message
+            authoredDate
+            committedDate
+            author { name email user { login } }
+        }
+    """,
+    "reviews": "id state body submittedAt author { login }",
+}
+"""The nested connections retrieved for each pull request, with the fields of each node"""
+
+_PULL_REQUESTS_QUERY = """
+query(
+    $owner: String!
+    $repo: String!
+    $pageSize: Int!
+    $innerSize: Int!
+    $cursor: String
+    $states: [PullRequestState!]
+) {
+    rateLimit { cost remaining }
+    repository(owner: $owner, name: $repo) {
+        pullRequests(
+            first: $pageSize
+            after: $cursor
+            states: $states
+            orderBy: { field: CREATED_AT, direction: ASC }
+        ) {
+            pageInfo { hasNextPage endCursor }
+            nodes {
+                id
+                number
+                title
+                body
+                state
+                url
+                createdAt
+                updatedAt
+                closedAt
+                mergedAt
+                baseRefName
+                headRefName
+                author { login }
+                %s
+            }
+        }
+    }
+}
+""" % "\n".join(
+    f"{name}(first: $innerSize) {{ totalCount pageInfo {{ hasNextPage endCursor }} "
+    f"nodes {{ {fields} }} }}"
+    for name, fields in _PULL_REQUEST_CONNECTIONS.items()
+)
+
+_PULL_REQUEST_CONNECTION_QUERY = """
+query($id: ID!, $cursor: String) {
+    rateLimit { cost remaining }
+    node(id: $id) {
+        ... on PullRequest {
+            %s(first: 100, after: $cursor) {
+                pageInfo { hasNextPage endCursor }
+                nodes { %s }
+            }
+        }
+    }
+}
+"""
+
+_GRAPHQL_PULL_REQUEST_STATES = {
+    "open": ["OPEN"],
+    "closed": ["CLOSED", "MERGED"],
+    "all": None,
+}
+
+_RETRYABLE_GRAPHQL_ERRORS = ("MAX_NODE_LIMIT_EXCEEDED", "RESOURCE_LIMITS_EXCEEDED")
+_RETRYABLE_HTTP_STATUSES = (502, 504)
+
+
+class AdaptivePageSize:
+    """Adjusts a GraphQL page size based on the cost and duration of each query.
+    The size is halved when a query is expensive, slow or fails because of its
+    size, and doubled when queries are comfortably within the targets."""
+
+    def __init__(
+        self,
+        size: int = 50,
+        minimum: int = 1,
+        maximum: int = 100,
+        target_cost: int = 5,
+        target_seconds: float = 5.0,
+    ):
+        self.size = max(minimum, min(maximum, size))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_cost = target_cost
+        self.target_seconds = target_seconds
+
+    def record(self, cost: int, seconds: float):
+        """Adjusts the size using the observed query cost and duration"""
+        if cost > self.target_cost or seconds > self.target_seconds:
+            self.size = max(self.minimum, self.size // 2)
+        elif cost * 2 <= self.target_cost and seconds * 2 <= self.target_seconds:
+            self.size = min(self.maximum, self.size * 2)
+
+    def shrink(self) -> bool:
+        """Halves the size after a failure. Returns False if it cannot shrink."""
+        if self.size <= self.minimum:
+            return False
+        self.size = max(self.minimum, self.size // 2)
+        return True
+
+
+def _is_retryable_graphql_failure(result) -> bool:
+    """Indicates whether a query failed because of its size or duration"""
+    errors = result.get("errors") or []
+    return any(
+        error.get("type") in _RETRYABLE_GRAPHQL_ERRORS
+        or "timeout" in error.get("message", "").lower()
+        for error in errors
+    )
+
+
+def _exit_on_graphql_errors(result, context: str):
+    if result.get("errors") or not result.get("data"):
+        print(
+            f"Error retrieving pull requests from '{context}': {result.get('errors')}",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+def _query_pull_request_page(
+    endpoint: str, token: str, variables: dict, page_size: AdaptivePageSize, context: str
+):
+    """Retrieves a page of pull requests, shrinking the page size and retrying
+    when the query is too large or times out"""
+    while True:
+        started = time.monotonic()
+        try:
+            result = graphql_query(
+                _PULL_REQUESTS_QUERY,
+                token,
+                endpoint=endpoint,
+                variables={**variables, "pageSize": page_size.size},
+            )
+        except SystemExit as ex:
+            # graphql_query exits with the HTTP status for non-200 responses
+            status = ex.code.get("status") if isinstance(ex.code, dict) else None
+            if status in _RETRYABLE_HTTP_STATUSES and page_size.shrink():
+                continue
+            raise
+        if _is_retryable_graphql_failure(result) and page_size.shrink():
+            continue
+        _exit_on_graphql_errors(result, context)
+        page_size.record(result["data"]["rateLimit"]["cost"], time.monotonic() - started)
+        return result["data"]["repository"]["pullRequests"]
+
+
+def _read_remaining_connection(
+    endpoint: str, token: str, node_id: str, name: str, cursor: str, context: str
+):
+    """Retrieves the remaining nodes of a nested pull request connection"""
+    query = _PULL_REQUEST_CONNECTION_QUERY % (name, _PULL_REQUEST_CONNECTIONS[name])
+    has_next_page = True
+    while has_next_page:
+        result = graphql_query(
+            query, token, endpoint=endpoint, variables={"id": node_id, "cursor": cursor}
+        )
+        _exit_on_graphql_errors(result, context)
+        connection = result["data"]["node"][name]
+        yield from connection["nodes"]
+        has_next_page = connection["pageInfo"]["hasNextPage"]
+        cursor = connection["pageInfo"]["endCursor"]
+
+
+def _complete_pull_request(endpoint: str, token: str, node: dict, context: str):
+    """Flattens the nested connections of a pull request, paging any
+    connection which has more nodes than the initial query returned"""
+    pull = dict(node)
+    for name in _PULL_REQUEST_CONNECTIONS:
+        connection = node[name]
+        nodes = list(connection["nodes"])
+        if connection["pageInfo"]["hasNextPage"]:
+            nodes.extend(
+                _read_remaining_connection(
+                    endpoint,
+                    token,
+                    node["id"],
+                    name,
+                    connection["pageInfo"]["endCursor"],
+                    context,
+                )
+            )
+        pull[name] = nodes
+    return pull
+
+
+def iter_pull_requests_graphql(
+    endpoint: str,
+    token: str,
+    org: str,
+    repo: str,
+    state: str = "all",
+    page_size: AdaptivePageSize = None,
+    inner_size: int = 25,
+):
+    """Streams the pull requests in a repo using GraphQL, retrieving the labels,
+    commits and reviews of each page of pull requests in a single query. Nested
+    connections are only paged when a pull request has more than `inner_size`
+    items. The page size adapts to the cost and duration of the queries.
+
+    Arguments:
+    endpoint: The GitHub hostname or GraphQL endpoint
+    token: The access token
+    org: The owner of the repository
+    repo: The name of the repository
+    state: The pull request state to return (open, closed, all)
+    page_size: Controls the number of pull requests in each query
+    inner_size: The number of labels, commits and reviews in the initial query
+    """
+    page_size = page_size or AdaptivePageSize()
+    context = f"{org}/{repo}"
+    variables = {
+        "owner": org,
+        "repo": repo,
+        "innerSize": inner_size,
+        "states": _GRAPHQL_PULL_REQUEST_STATES[state],
+        "cursor": None,
+    }
+    has_next_page = True
+    while has_next_page:
+        connection = _query_pull_request_page(
+            endpoint, token, variables, page_size, context
+        )
+        for node in connection["nodes"]:
+            yield _complete_pull_request(endpoint, token, node, context)
+        has_next_page = connection["pageInfo"]["hasNextPage"]
+        variables["cursor"] = connection["pageInfo"]["endCursor"]
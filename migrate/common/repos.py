@@ -1,18 +1,44 @@
 """Methods for using the GitHub API for repositories"""
 
+from __future__ import annotations
+
+import fnmatch
+import math
+import os
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from copy import copy
-from dataclasses import dataclass, fields
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timezone
 from enum import Enum, unique, auto
-from ghapi.all import GhApi
+from functools import partial
+from typing import TYPE_CHECKING, Iterable
 from .api import (
+    DownloadStatus,
     GhPublicKey,
+    SingleFlight,
+    download_to_path,
     encrypt_secret,
     paginated,
+    paginated_items,
     rate_limited,
     call_with_exception_handler,
+    with_current_context,
+)
+from .tasks import (
+    CopyResult,
+    RateGovernor,
+    TaskStatus,
+    bounded_map,
+    describe_error,
+    run_copy_pipeline,
 )
 from .types import SerializedEnum, DictData, alternative_name
 
+if TYPE_CHECKING:
+    from ghapi.all import GhApi
+
 
 @unique
 class RepoVisibility(SerializedEnum):
@@ -36,6 +62,7 @@ class Repo(DictData):
     is_private: bool
     default_branch: str
     visibility: RepoVisibility
+    topics: list[str] = field(default_factory=list)
 
     @staticmethod
     def deserialize(repo):
@@ -49,6 +76,7 @@ class Repo(DictData):
             is_private=repo.private,
             default_branch=repo.default_branch,
             visibility=repo.visibility,
+            topics=list(repo.get("topics") or []),
         )
 
 
@@ -144,10 +172,100 @@ class RepoSettings(DictData):
         return RepoSettings(ghas=ghas).update(settings)
 
 
+@dataclass(frozen=True)
+class RepoSnapshot(DictData):
+    """The state of a repository from a single `repos.get` response"""
+
+    id: int  # pylint: disable=invalid-name
+    full_name: str
+    default_branch: str
+    visibility: RepoVisibility
+    created_at: str
+    settings: RepoSettings
+
+    @staticmethod
+    def deserialize(repo):
+        visibility = repo.get("visibility")
+        return RepoSnapshot(
+            id=repo.get("id"),
+            full_name=repo.get("full_name"),
+            default_branch=repo.get("default_branch"),
+            visibility=RepoVisibility.from_str(visibility) if visibility else None,
+            created_at=repo.get("created_at"),
+            settings=RepoSettings.deserialize(repo),
+        )
+
+
+class RepoSnapshotCache:
+    """Caches repository snapshots by host and `owner/repo`, so the id, settings,
+    visibility and default branch of a repository are read with one request.
+    Concurrent lookups of the same repository share a single request, and a
+    snapshot is discarded when the repository is updated. A lookup which
+    started before the snapshot was invalidated is not cached."""
+
+    def __init__(self):
+        self._snapshots = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    @staticmethod
+    def _key(client: GhApi, org: str, repo: str):
+        return (getattr(client, "gh_host", None), f"{org}/{repo}".lower())
+
+    def get(self, client: GhApi, org: str, repo: str) -> RepoSnapshot:
+        """Returns the snapshot for a repository, requesting it if it is not cached"""
+        key = self._key(client, org, repo)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            generation = self._generations.get(key, 0)
+        if snapshot is not None:
+            return snapshot
+        return self._flight.do(
+            (key, generation), self._load, client, org, repo, key, generation
+        )
+
+    def _load(self, client: GhApi, org: str, repo: str, key, generation: int):
+        result = call_with_exception_handler(
+            f"{org}/{repo}", client.repos.get, owner=org, repo=repo
+        )
+        snapshot = RepoSnapshot.deserialize(result)
+        with self._lock:
+            if self._generations.get(key, 0) == generation:
+                self._snapshots[key] = snapshot
+        return snapshot
+
+    def invalidate(self, client: GhApi, org: str, repo: str):
+        """Discards the snapshot for a repository after it has been updated"""
+        key = self._key(client, org, repo)
+        with self._lock:
+            self._snapshots.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self):
+        """Discards every snapshot"""
+        with self._lock:
+            for key in set(self._snapshots) | set(self._generations):
+                self._generations[key] = self._generations.get(key, 0) + 1
+            self._snapshots.clear()
+
+
+_repo_snapshots = RepoSnapshotCache()
+
+
+def get_repo_snapshot(client: GhApi, org: str, repo: str) -> RepoSnapshot:
+    """Gets the cached snapshot of a repository"""
+    return _repo_snapshots.get(client, org, repo)
+
+
+def clear_repo_snapshots():
+    """Discards the cached repository snapshots, such as at the start of a run"""
+    _repo_snapshots.clear()
+
+
 def get_repository_id(client: GhApi, org: str, repo: str):
     """Retrieves the repository id for the provided repo"""
-    result = call_with_exception_handler(org, client.repos.get, owner=org, repo=repo)
-    return result.id
+    return get_repo_snapshot(client, org, repo).id
 
 
 def get_repo_public_key(client: GhApi, org: str, repo: str):
@@ -177,15 +295,11 @@ def set_repo_secret(client: GhApi, org: str, repo: str, name: str, value: str):
 
 def get_repo_settings(client: GhApi, org: str, repo: str) -> RepoSettings:
     """Gets the repository settings"""
-    result = call_with_exception_handler(
-        f"{org}/{repo}", client.repos.get, owner=org, repo=repo
-    )
-    return RepoSettings.deserialize(result)
+    return get_repo_snapshot(client, org, repo).settings
 
 
-@rate_limited
-def set_repo_visibility(client: GhApi, org: str, repo: str, visibility: RepoVisibility):
-    """Sets the repository visibility"""
+def _update_repo_visibility(client: GhApi, org: str, repo: str, visibility):
+    """Sets the repository visibility without the shared write throttle"""
     result = call_with_exception_handler(
         f"{org}/{repo}",
         client.repos.update,
@@ -193,20 +307,94 @@ def set_repo_visibility(client: GhApi, org: str, repo: str, visibility: RepoVisi
         repo=repo,
         visibility=str(visibility),
     )
+    _repo_snapshots.invalidate(client, org, repo)
     return result
 
 
+@rate_limited
+def set_repo_visibility(client: GhApi, org: str, repo: str, visibility: RepoVisibility):
+    """Sets the repository visibility"""
+    return _update_repo_visibility(client, org, repo, visibility)
+
+
+@dataclass(frozen=True)
+class VisibilityChange(DictData):
+    """The outcome of changing the visibility of a repository"""
+
+    repo: str
+    before: str
+    after: str
+    status: TaskStatus
+    error: str = None
+
+    def to_dict(self):
+        result = super().to_dict()
+        result["status"] = str(self.status)
+        return result
+
+
+def select_repositories(
+    repos: Iterable[Repo],
+    patterns: Iterable[str] = (),
+    visibility: RepoVisibility = None,
+    topics: Iterable[str] = (),
+) -> list[Repo]:
+    """Filters repositories by name (shell-style patterns), visibility and topics.
+    A repository must match any of the patterns and have all of the topics."""
+    patterns, topics = list(patterns), set(topics)
+    return [
+        repo
+        for repo in repos
+        if (not patterns or any(fnmatch.fnmatchcase(repo.name, p) for p in patterns))
+        and (visibility is None or str(repo.visibility) == str(visibility))
+        and topics.issubset(repo.topics or [])
+    ]
+
+
+def set_repo_visibility_bulk(
+    client: GhApi,
+    org: str,
+    repos: Iterable[Repo],
+    visibility: RepoVisibility,
+    max_workers: int = 2,
+    write_interval: float = 1.0,
+):
+    """Sets the visibility of each repository, using the visibility from the
+    repository listing to skip repositories which are already at the target.
+    Up to `max_workers` updates run concurrently, and their starts are spaced
+    by `write_interval` instead of the shared one-write-per-second throttle.
+
+    Returns:
+    Iterator[VisibilityChange]: the before and after state of each repository
+    """
+    governor = RateGovernor(write_interval)
+    target = str(visibility)
+
+    def change(repo: Repo):
+        before = str(repo.visibility)
+        if before == target:
+            return VisibilityChange(repo.name, before, before, TaskStatus.SKIPPED)
+        try:
+            governor.wait()
+            _update_repo_visibility(client, org, repo.name, target)
+            return VisibilityChange(repo.name, before, target, TaskStatus.SUCCEEDED)
+        except (Exception, SystemExit) as ex:  # pylint: disable=broad-except
+            return VisibilityChange(
+                repo.name, before, before, TaskStatus.FAILED, describe_error(ex)
+            )
+
+    return bounded_map(change, repos, max_workers=max_workers)
+
+
 def get_repo_visibility(client: GhApi, org: str, repo: str) -> RepoVisibility:
     """Gets the repository visibility"""
-    result = call_with_exception_handler(
-        f"{org}/{repo}", client.repos.get, owner=org, repo=repo
-    )
-    return RepoVisibility.from_str(result.visibility)
+    return get_repo_snapshot(client, org, repo).visibility
 
 
 @rate_limited
 def set_repo_settings(client: GhApi, org: str, repo: str, settings: RepoSettings):
-    """Configures the repository using the provided settings"""
+    """Configures the repository using the provided settings. The GHAS
+    settings are only updated if they are provided."""
 
     result = call_with_exception_handler(
         f"{org}/{repo}",
@@ -221,16 +409,169 @@ def set_repo_settings(client: GhApi, org: str, repo: str, settings: RepoSettings
         default_branch=settings.default_branch,
         allow_update_branch=settings.allow_update_branch,
         visibility=settings.visibility,
-        security_and_analysis=settings.ghas.serialize(),
+        security_and_analysis=settings.ghas.serialize() if settings.ghas else None,
         has_issues=settings.has_issues,
         has_projects=settings.has_projects,
         has_wiki=settings.has_wiki,
         has_pages=settings.has_pages,
     )
-
+    _repo_snapshots.invalidate(client, org, repo)
     return RepoSettings.deserialize(result)
 
 
+class RepoIndex:
+    """The repositories in an organization, indexed by name and id from a single
+    listing. Names are matched without regard to case, as they are by GitHub."""
+
+    def __init__(self, repos: Iterable[Repo]):
+        self._repos = {repo.name.lower(): repo for repo in repos}
+        self._ids = {repo.id for repo in self._repos.values()}
+
+    def __contains__(self, name_or_id):
+        if isinstance(name_or_id, int):
+            return name_or_id in self._ids
+        return name_or_id.lower() in self._repos
+
+    def __len__(self):
+        return len(self._repos)
+
+    def get(self, name: str) -> Repo:
+        """Gets the listing for a repository, or None if it does not exist"""
+        return self._repos.get(name.lower())
+
+
+@unique
+class CopyAction(SerializedEnum):
+    """Indicates the work required to copy a repository to its destination"""
+
+    CREATE = auto()
+    UPDATE = auto()
+
+
+def partition_copy_pairs(
+    pairs: Iterable[tuple[str, str]], dest_index: RepoIndex
+) -> dict[CopyAction, list[tuple[str, str]]]:
+    """Partitions (source, destination) pairs using an index of the destination.
+    Pairs are created if the destination does not exist, and updated otherwise."""
+    plan = {action: [] for action in CopyAction}
+    for src, dest in pairs:
+        action = CopyAction.CREATE if dest_index.get(dest) is None else CopyAction.UPDATE
+        plan[action].append((src, dest))
+    return plan
+
+
+def _plan_copies(pairs, dest_index: RepoIndex = None):
+    """Determines the pairs which must be copied using the destination index.
+
+    Returns:
+    tuple: the pairs to copy, and the results for the pairs which need no requests
+    """
+    if dest_index is None:
+        return pairs, []
+    plan = partition_copy_pairs(pairs, dest_index)
+    results = [
+        CopyResult(
+            source=src,
+            destination=dest,
+            status=TaskStatus.FAILED,
+            error="Destination repository does not exist",
+        )
+        for src, dest in plan[CopyAction.CREATE]
+    ]
+    return plan[CopyAction.UPDATE], results
+
+
+def copy_repo_settings_bulk(
+    src_client: GhApi,
+    src_org: str,
+    dest_client: GhApi,
+    dest_org: str,
+    pairs: Iterable[tuple[str, str]],
+    readers: int = 8,
+    writers: int = 2,
+    read_interval: float = 0.0,
+    write_interval: float = 0.0,
+    dest_index: RepoIndex = None,
+):
+    """Copies the settings for each (source, destination) pair of repositories
+    using a reader/writer pipeline. Destinations which already match the source
+    are skipped, and updates are also throttled by `set_repo_settings`. A
+    failure is reported in the results without stopping the remaining copies.
+    If an index of the destination is provided, missing destinations fail
+    without any requests.
+
+    Returns:
+    Iterator[CopyResult]: the outcome for each pair, in the order they complete
+    """
+
+    def read(src, dest):
+        settings = get_repo_settings(src_client, src_org, src)
+        if get_repo_settings(dest_client, dest_org, dest) == settings:
+            return None
+        return settings
+
+    def write(src, dest, settings):
+        set_repo_settings(dest_client, dest_org, dest, settings)
+
+    pairs, results = _plan_copies(pairs, dest_index)
+    yield from results
+    yield from run_copy_pipeline(
+        pairs,
+        read,
+        write,
+        readers=readers,
+        writers=writers,
+        read_interval=read_interval,
+        write_interval=write_interval,
+    )
+
+
+def copy_repo_visibility_bulk(
+    src_client: GhApi,
+    src_org: str,
+    dest_client: GhApi,
+    dest_org: str,
+    pairs: Iterable[tuple[str, str]],
+    readers: int = 8,
+    writers: int = 2,
+    read_interval: float = 0.0,
+    write_interval: float = 0.0,
+    dest_index: RepoIndex = None,
+):
+    """Copies the visibility for each (source, destination) pair of repositories
+    using a reader/writer pipeline. Destinations which already match the source
+    are skipped. If an index of the destination is provided, missing
+    destinations fail without any requests and the destination visibility is
+    read from the index.
+
+    Returns:
+    Iterator[CopyResult]: the outcome for each pair, in the order they complete
+    """
+
+    def dest_visibility(dest):
+        if dest_index is not None:
+            return RepoVisibility.from_str(str(dest_index.get(dest).visibility))
+        return get_repo_visibility(dest_client, dest_org, dest)
+
+    def read(src, dest):
+        visibility = get_repo_visibility(src_client, src_org, src)
+        if dest_visibility(dest) == visibility:
+            return None
+        return visibility
+
+    pairs, results = _plan_copies(pairs, dest_index)
+    yield from results
+    yield from run_copy_pipeline(
+        pairs,
+        read,
+        lambda src, dest, value: set_repo_visibility(dest_client, dest_org, dest, value),
+        readers=readers,
+        writers=writers,
+        read_interval=read_interval,
+        write_interval=write_interval,
+    )
+
+
 @rate_limited
 def set_repo_ghas_settings(client: GhApi, org: str, repo: str, settings: GhasSettings):
     """Configures the repository GHAS settings using the provided settings"""
@@ -241,7 +582,8 @@ def set_repo_ghas_settings(client: GhApi, org: str, repo: str, settings: GhasSet
         repo=repo,
         security_and_analysis=settings.serialize(),
     )
-    return RepoSettings.deserialize(result, include_ghas=True)
+    _repo_snapshots.invalidate(client, org, repo)
+    return RepoSettings.deserialize(result)
 
 
 def list_workflow_runs(client: GhApi, org: str, repo: str):
@@ -260,3 +602,235 @@ def list_workflow_runs(client: GhApi, org: str, repo: str):
         for run in resp["workflow_runs"]
         if "workflow_runs" in resp
     ]
+
+
+WORKFLOW_RUN_RESULT_CAP = 1000
+"""The maximum number of results GitHub returns for a filtered workflow run listing"""
+
+
+def _format_run_timestamp(seconds: int):
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _split_window(start: int, end: int, count: int):
+    """Splits an inclusive range of epoch seconds into up to `count` windows"""
+    size = max(1, math.ceil((end - start + 1) / count))
+    return [(first, min(end, first + size - 1)) for first in range(start, end + 1, size)]
+
+
+def _plan_workflow_run_requests(window, page: int, total: int):
+    """Determines the follow-up requests after a page of workflow runs is received.
+    A window exceeding the result cap is subdivided (and its runs discarded), and
+    the remaining pages of any other window are requested.
+
+    Returns:
+    tuple: the (window, page) requests to make and whether to keep the runs
+    """
+    if page != 1:
+        return [], True
+    if total > WORKFLOW_RUN_RESULT_CAP and window[0] < window[1]:
+        pieces = max(2, min(16, math.ceil(total / (WORKFLOW_RUN_RESULT_CAP * 0.9))))
+        return [(child, 1) for child in _split_window(*window, pieces)], False
+    pages = math.ceil(min(total, WORKFLOW_RUN_RESULT_CAP) / 100)
+    return [(window, number) for number in range(2, pages + 1)], True
+
+
+def iter_workflow_runs(
+    client: GhApi,
+    org: str,
+    repo: str,
+    since: datetime = None,
+    until: datetime = None,
+    slices: int = 8,
+    max_workers: int = 8,
+    **filters,
+):
+    """Streams every workflow run created in a date range, working around the
+    cap on the number of results GitHub returns for a filtered listing.
+
+    The range is split into `created` windows which are requested in parallel.
+    A window reporting more results than the cap is subdivided, and the pages
+    of the remaining windows are requested concurrently. Runs are yielded as
+    pages complete (not in date order) and are de-duplicated by id. A warning
+    is written to stderr if a single second has more runs than the cap, since
+    the runs beyond the cap cannot be listed.
+
+    Arguments:
+    client: The GhApi client
+    org: The owner of the repository
+    repo: The name of the repository
+    since: The earliest creation time. Defaults to the creation of the repository.
+    until: The latest creation time. Defaults to the current time.
+    slices: The number of windows the range is initially split into
+    max_workers: The maximum number of concurrent requests
+    filters: Additional filters for the listing (actor, branch, event, status)
+    """
+    if since is None:
+        created_at = get_repo_snapshot(client, org, repo).created_at
+        since = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+    until = until or datetime.now(timezone.utc)
+
+    def fetch(window, page):
+        first, last = map(_format_run_timestamp, window)
+        result = call_with_exception_handler(
+            f"{org}/{repo}",
+            client.actions.list_workflow_runs_for_repo,
+            owner=org,
+            repo=repo,
+            created=f"{first}..{last}",
+            per_page=100,
+            page=page,
+            **filters,
+        )
+        return window, page, result
+
+    fetch = with_current_context(fetch)
+    seen = set()
+    windows = _split_window(
+        math.floor(since.timestamp()), math.floor(until.timestamp()), max(1, slices)
+    )
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        running = {executor.submit(fetch, window, 1) for window in windows}
+        try:
+            while running:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    window, page, result = future.result()
+                    total = result["total_count"]
+                    requests, keep = _plan_workflow_run_requests(window, page, total)
+                    if page == 1 and total > WORKFLOW_RUN_RESULT_CAP and keep:
+                        print(
+                            f"Warning: {org}/{repo} has {total} workflow runs created "
+                            f"at {_format_run_timestamp(window[0])}. Only the first "
+                            f"{WORKFLOW_RUN_RESULT_CAP} can be listed.",
+                            file=sys.stderr,
+                        )
+                    running |= {executor.submit(fetch, *request) for request in requests}
+                    if not keep:
+                        continue
+                    for run in result["workflow_runs"]:
+                        if run["id"] not in seen:
+                            seen.add(run["id"])
+                            yield run
+        finally:
+            for future in running:
+                future.cancel()
+
+
+@dataclass(frozen=True)
+class WorkflowRunDownload(DictData):
+    """A log archive or artifact belonging to a workflow run"""
+
+    run_id: int
+    kind: str
+    url: str
+    path: str
+    digest: str = None
+
+
+@dataclass(frozen=True)
+class DownloadResult(DictData):
+    """The outcome of downloading a workflow run log archive or artifact"""
+
+    run_id: int
+    kind: str
+    path: str
+    status: DownloadStatus
+
+    def to_dict(self):
+        result = super().to_dict()
+        result["status"] = str(self.status)
+        return result
+
+
+def list_workflow_run_artifacts(client: GhApi, org: str, repo: str, run_id: int):
+    """Lists the artifacts for the provided workflow run"""
+    return list(
+        paginated_items(
+            partial(
+                call_with_exception_handler,
+                f"{org}/{repo}",
+                client.actions.list_workflow_run_artifacts,
+            ),
+            key="artifacts",
+            owner=org,
+            repo=repo,
+            run_id=run_id,
+        )
+    )
+
+
+def _plan_workflow_run_downloads(
+    client: GhApi, org: str, repo: str, run, dest: str, logs: bool, artifacts: bool
+):
+    """Identifies the files to download for a workflow run. Expired artifacts
+    are excluded since their content is no longer available."""
+    folder = os.path.join(dest, str(run["id"]))
+    downloads = []
+    if logs:
+        downloads.append(
+            WorkflowRunDownload(
+                run_id=run["id"],
+                kind="logs",
+                url=f"{client.gh_host}/repos/{org}/{repo}/actions/runs/{run['id']}/logs",
+                path=os.path.join(folder, "logs.zip"),
+            )
+        )
+    if artifacts:
+        downloads.extend(
+            WorkflowRunDownload(
+                run_id=run["id"],
+                kind="artifact",
+                url=artifact["archive_download_url"],
+                path=os.path.join(folder, "artifacts", f"{artifact['name']}.zip"),
+                digest=artifact.get("digest"),
+            )
+            for artifact in list_workflow_run_artifacts(client, org, repo, run["id"])
+            if not artifact.get("expired")
+        )
+    return downloads
+
+
+def download_workflow_run_files(
+    client: GhApi,
+    token: str,
+    org: str,
+    repo: str,
+    runs: Iterable,
+    dest: str,
+    logs: bool = True,
+    artifacts: bool = True,
+    max_workers: int = 8,
+):
+    """Downloads the log archives and artifacts for the workflow runs, using up to
+    `max_workers` concurrent requests. Files are written to
+    `<dest>/<run id>/logs.zip` and `<dest>/<run id>/artifacts/<name>.zip`. Files
+    already present with the expected size and digest are skipped, and partial
+    downloads are resumed.
+
+    Returns:
+    Iterator[DownloadResult]: the outcome of each download
+    """
+    downloads = (
+        download
+        for run_downloads in bounded_map(
+            lambda run: _plan_workflow_run_downloads(
+                client, org, repo, run, dest, logs, artifacts
+            ),
+            runs,
+            max_workers=max_workers,
+        )
+        for download in run_downloads
+    )
+    return bounded_map(
+        lambda download: DownloadResult(
+            run_id=download.run_id,
+            kind=download.kind,
+            path=download.path,
+            status=download_to_path(
+                download.url, token, download.path, digest=download.digest
+            ),
+        ),
+        downloads,
+        max_workers=max_workers,
+    )
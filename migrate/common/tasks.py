@@ -0,0 +1,395 @@
+"""Helpers for executing units of work concurrently"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from enum import auto, unique
+from typing import Any, Callable, Iterable, Iterator
+
+from .api import record_throttle, with_current_context
+from .trace import span
+from .types import DictData, SerializedEnum
+
+
+@unique
+class TaskStatus(SerializedEnum):
+    """Indicates the outcome of a task"""
+
+    SUCCEEDED = auto()
+    FAILED = auto()
+    SKIPPED = auto()
+
+
+@dataclass
+class Task:
+    """A unit of work in a task graph
+
+    Arguments:
+    name: The unique name of the task
+    func: The callable which performs the work
+    depends_on: The names of the tasks which must succeed before this task runs
+    group: The logical group (such as a repository) the task belongs to
+    """
+
+    name: str
+    func: Callable[[], Any]
+    depends_on: list[str] = field(default_factory=list)
+    group: str = None
+
+
+@dataclass(frozen=True)
+class TaskResult(DictData):
+    """The outcome of executing a task"""
+
+    name: str
+    group: str
+    status: TaskStatus
+    error: str = None
+
+    def to_dict(self):
+        result = super().to_dict()
+        result["status"] = str(self.status)
+        return result
+
+
+@dataclass(frozen=True)
+class CopyResult(DictData):
+    """The outcome of copying a resource from a source to a destination. A
+    copy is SKIPPED when the destination already matches the source."""
+
+    source: str
+    destination: str
+    status: TaskStatus
+    error: str = None
+
+    def to_dict(self):
+        result = super().to_dict()
+        result["status"] = str(self.status)
+        return result
+
+
+class TaskGraphError(ValueError):
+    """Raised when a task graph is not a valid directed acyclic graph"""
+
+
+def _validate_task_graph(tasks: dict[str, Task]):
+    """Ensures every dependency exists and the graph contains no cycles"""
+    for task in tasks.values():
+        for dependency in task.depends_on:
+            if dependency not in tasks:
+                raise TaskGraphError(
+                    f"Task '{task.name}' depends on unknown task '{dependency}'"
+                )
+
+    remaining = {name: len(task.depends_on) for name, task in tasks.items()}
+    ready = [name for name, count in remaining.items() if count == 0]
+    dependents = _find_dependents(tasks)
+    visited = 0
+    while ready:
+        name = ready.pop()
+        visited += 1
+        for dependent in dependents[name]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                ready.append(dependent)
+    if visited != len(tasks):
+        cycle = sorted(name for name, count in remaining.items() if count > 0)
+        raise TaskGraphError(f"Task graph contains a cycle: {', '.join(cycle)}")
+
+
+def _find_dependents(tasks: dict[str, Task]):
+    """Maps each task name to the names of the tasks that depend on it"""
+    dependents = {name: [] for name in tasks}
+    for task in tasks.values():
+        for dependency in task.depends_on:
+            dependents[dependency].append(task.name)
+    return dependents
+
+
+def describe_error(ex: BaseException):
+    """Creates a readable description of a task failure"""
+    if isinstance(ex, SystemExit):
+        return f"Exited with code {ex.code}"
+    return f"{type(ex).__name__}: {ex}"
+
+
+def _execute(task: Task):
+    """Runs a task, capturing failures (including sys.exit) as a result"""
+    try:
+        with span(task.name, "task", group=task.group):
+            task.func()
+        return TaskResult(name=task.name, group=task.group, status=TaskStatus.SUCCEEDED)
+    except (Exception, SystemExit) as ex:  # pylint: disable=broad-except
+        return TaskResult(
+            name=task.name,
+            group=task.group,
+            status=TaskStatus.FAILED,
+            error=describe_error(ex),
+        )
+
+
+def run_task_graph(tasks: list[Task], max_workers: int = 4) -> list[TaskResult]:
+    """Executes a graph of tasks, running independent tasks in parallel
+
+    A task is started once all of its dependencies have succeeded. If a
+    dependency fails or is skipped, the dependent task is skipped.
+
+    Arguments:
+    tasks: The tasks to execute
+    max_workers: The maximum number of tasks to run concurrently
+
+    Returns:
+    list[TaskResult]: the results, in the order the tasks were provided
+    """
+    graph = {}
+    for task in tasks:
+        if task.name in graph:
+            raise TaskGraphError(f"Duplicate task name '{task.name}'")
+        graph[task.name] = task
+    _validate_task_graph(graph)
+
+    dependents = _find_dependents(graph)
+    remaining = {name: len(task.depends_on) for name, task in graph.items()}
+    results: dict[str, TaskResult] = {}
+
+    def skip(name: str, reason: str):
+        """Marks a task and everything depending on it as skipped"""
+        pending = [name]
+        while pending:
+            current = pending.pop()
+            if current in results:
+                continue
+            task = graph[current]
+            results[current] = TaskResult(
+                name=task.name, group=task.group, status=TaskStatus.SKIPPED, error=reason
+            )
+            pending.extend(dependents[current])
+
+    execute = with_current_context(_execute)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        running = {
+            executor.submit(execute, graph[name]): name
+            for name, count in remaining.items()
+            if count == 0
+        }
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                result = future.result()
+                results[name] = result
+                if result.status != TaskStatus.SUCCEEDED:
+                    for dependent in dependents[name]:
+                        skip(dependent, f"Dependency '{name}' did not succeed")
+                    continue
+                for dependent in dependents[name]:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0 and dependent not in results:
+                        running[executor.submit(execute, graph[dependent])] = dependent
+
+    return [results[task.name] for task in tasks]
+
+
+def bounded_map(func: Callable, items: Iterable, max_workers: int = 4) -> Iterator:
+    """Applies a function to each item using a thread pool, yielding the results
+    in the order of the items. Only a bounded number of items are read ahead,
+    so the items can be a lazily produced stream and each result can be
+    written as soon as it (and everything before it) has completed.
+
+    Arguments:
+    func: The function to apply to each item
+    items: The items to process
+    max_workers: The maximum number of items to process concurrently
+    """
+    max_workers = max(1, max_workers)
+    func = with_current_context(func)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            for item in items:
+                pending.append(executor.submit(func, item))
+                if len(pending) >= max_workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+class RateGovernor:
+    """Spaces the start of calls by a minimum interval. The interval is shared by
+    every thread using the governor."""
+
+    def __init__(self, interval: float = 0.0):
+        self.interval = interval
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Blocks until the next call is allowed to start"""
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            record_throttle(start - now)
+            time.sleep(start - now)
+
+
+_DONE = object()
+
+
+def run_pipeline(
+    items: Iterable,
+    read: Callable[[Any], Any],
+    write: Callable[[Any, Any], Any],
+    on_error: Callable[[Any, BaseException], Any],
+    readers: int = 4,
+    writers: int = 4,
+    queue_size: int = None,
+) -> Iterator:
+    """Runs a two-stage producer/consumer pipeline. Reader threads call `read`
+    for each item and add the values to a bounded queue, which is drained by
+    writer threads calling `write`. Reads and writes overlap, and readers pause
+    when the queue is full.
+
+    Arguments:
+    items: The items to process
+    read: Retrieves the value for an item
+    write: Processes an item and its value, returning a result
+    on_error: Converts a failure (including sys.exit) for an item into a result
+    readers: The number of reader threads
+    writers: The number of writer threads
+    queue_size: The maximum number of values waiting to be written
+
+    Returns:
+    Iterator: the results, in the order they complete
+    """
+    readers, writers = max(1, readers), max(1, writers)
+    work = queue.Queue(maxsize=queue_size or (readers + writers) * 2)
+    results = queue.Queue()
+    stopped = threading.Event()
+    source = iter(items)
+    source_lock = threading.Lock()
+
+    def next_item():
+        with source_lock:
+            return next(source, _DONE)
+
+    def enqueue(entry):
+        """Adds an entry to the work queue, giving up if the pipeline is stopped"""
+        while not stopped.is_set():
+            try:
+                work.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        while not stopped.is_set() and (item := next_item()) is not _DONE:
+            try:
+                value = read(item)
+            except (Exception, SystemExit) as ex:  # pylint: disable=broad-except
+                results.put(on_error(item, ex))
+                continue
+            if not enqueue((item, value)):
+                return
+
+    def consume():
+        while (entry := work.get()) is not _DONE:
+            if stopped.is_set():
+                continue
+            item, value = entry
+            try:
+                results.put(write(item, value))
+            except (Exception, SystemExit) as ex:  # pylint: disable=broad-except
+                results.put(on_error(item, ex))
+
+    def supervise(producers, consumers):
+        for thread in producers:
+            thread.join()
+        for _ in consumers:
+            work.put(_DONE)
+        for thread in consumers:
+            thread.join()
+        results.put(_DONE)
+
+    produce, consume = with_current_context(produce), with_current_context(consume)
+    producers = [threading.Thread(target=produce, daemon=True) for _ in range(readers)]
+    consumers = [threading.Thread(target=consume, daemon=True) for _ in range(writers)]
+    for thread in producers + consumers:
+        thread.start()
+    threading.Thread(target=supervise, args=(producers, consumers), daemon=True).start()
+    try:
+        while (result := results.get()) is not _DONE:
+            yield result
+    finally:
+        stopped.set()
+
+
+def run_copy_pipeline(
+    pairs: Iterable[tuple[str, str]],
+    read: Callable[[str, str], Any],
+    write: Callable[[str, str, Any], Any],
+    readers: int = 4,
+    writers: int = 2,
+    queue_size: int = None,
+    read_interval: float = 0.0,
+    write_interval: float = 0.0,
+) -> Iterator[CopyResult]:
+    """Copies resources between a source and a destination using `run_pipeline`.
+    Each side has its own concurrency and rate governor, so slow source reads
+    and throttled destination writes overlap instead of adding up.
+
+    Arguments:
+    pairs: The (source, destination) names to copy
+    read: Returns the value to write to the destination, or None if the
+        destination is already up to date
+    write: Writes the value to the destination
+    readers: The number of concurrent reads
+    writers: The number of concurrent writes
+    queue_size: The maximum number of values waiting to be written
+    read_interval: The minimum number of seconds between the start of reads
+    write_interval: The minimum number of seconds between the start of writes
+
+    Returns:
+    Iterator[CopyResult]: the outcome for each pair, in the order they complete
+    """
+    read_governor = RateGovernor(read_interval)
+    write_governor = RateGovernor(write_interval)
+
+    def read_pair(pair):
+        read_governor.wait()
+        with span("read", "copy", source=pair[0], destination=pair[1]):
+            return read(*pair)
+
+    def write_pair(pair, value):
+        if value is None:
+            return CopyResult(
+                source=pair[0], destination=pair[1], status=TaskStatus.SKIPPED
+            )
+        write_governor.wait()
+        with span("write", "copy", source=pair[0], destination=pair[1]):
+            write(*pair, value)
+        return CopyResult(
+            source=pair[0], destination=pair[1], status=TaskStatus.SUCCEEDED
+        )
+
+    def failed(pair, ex):
+        return CopyResult(
+            source=pair[0],
+            destination=pair[1],
+            status=TaskStatus.FAILED,
+            error=describe_error(ex),
+        )
+
+    return run_pipeline(
+        pairs, read_pair, write_pair, failed, readers, writers, queue_size
+    )
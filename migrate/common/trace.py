@@ -0,0 +1,154 @@
+"""
+Records a timeline of a command as Chrome trace events, which can be opened
+in `chrome://tracing` or Perfetto. Spans are recorded for the phases of a
+command (loading configuration, creating clients, pagination, encryption and
+writing output), for each API request and for each task of a concurrent
+operation. Each span is recorded against the thread which performed the work,
+so concurrent work is shown as parallel lanes.
+
+Tracing is enabled by the root `--trace` option. While it is disabled, `span`
+returns a shared no-op context manager.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .api import RequestEvent
+
+_NO_SPAN = nullcontext()
+
+
+class Tracer:
+    """Collects trace events. Timestamps are measured using `time.perf_counter()`,
+    the clock used for the API request events."""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.origin = time.perf_counter()
+        self._events: list[dict] = []
+        self._threads: set[int] = set()
+        self._lock = threading.Lock()
+
+    def start(self):
+        from .api import add_request_listener
+
+        add_request_listener(self)
+        return self
+
+    def stop(self):
+        from .api import remove_request_listener
+
+        remove_request_listener(self)
+
+    def record(
+        self, name: str, category: str, start: float, duration: float, tid=None, **args
+    ):
+        """Records a completed span
+
+        Arguments:
+        name: The name of the span
+        category: The category of the span (such as `http` or `config`)
+        start: The `time.perf_counter()` value when the span started
+        duration: The length of the span in seconds
+        tid: The identifier of the thread which performed the work (default: current)
+        args: Details to show for the span
+        """
+        current = threading.current_thread()
+        tid = current.ident if tid is None else tid
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round((start - self.origin) * 1_000_000, 3),
+            "dur": round(duration * 1_000_000, 3),
+            "pid": self.pid,
+            "tid": tid,
+        }
+        if args:
+            event["args"] = {
+                key: value for key, value in args.items() if value is not None
+            }
+        with self._lock:
+            if tid not in self._threads:
+                self._threads.add(tid)
+                thread_name = current.name if tid == current.ident else str(tid)
+                self._events.append(_metadata("thread_name", self.pid, tid, thread_name))
+            self._events.append(event)
+
+    def __call__(self, event: RequestEvent):
+        """Records an API request reported by the client"""
+        self.record(
+            f"{event.method} {event.template}",
+            "http",
+            event.start,
+            event.duration,
+            tid=event.thread,
+            url=event.url,
+            status=event.status,
+            size=event.size,
+        )
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            events = list(self._events)
+        process = _metadata("process_name", self.pid, 0, "migrate")
+        return {"traceEvents": [process, *events], "displayTimeUnit": "ms"}
+
+    def write(self, path: str):
+        """Writes the events to a file in the Chrome trace event format"""
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, default=str)
+
+
+def _metadata(name: str, pid: int, tid: int, value: str) -> dict:
+    return {"name": name, "ph": "M", "pid": pid, "tid": tid, "args": {"name": value}}
+
+
+_tracer: Tracer = None
+
+
+def start_trace() -> bool:
+    """Starts tracing, returning False if a trace is already being recorded"""
+    global _tracer  # pylint: disable=global-statement
+    if _tracer is not None:
+        return False
+    _tracer = Tracer().start()
+    return True
+
+
+def stop_trace(path: str):
+    """Stops tracing and writes the recorded events to a file"""
+    global _tracer  # pylint: disable=global-statement
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.stop()
+        tracer.write(path)
+
+
+def span(name: str, category: str, **args):
+    """Creates a context manager which records a span while tracing is enabled
+
+    Arguments:
+    name: The name of the span
+    category: The category of the span
+    args: Details to show for the span
+    """
+    if _tracer is None:
+        return _NO_SPAN
+    return _record_span(_tracer, name, category, args)
+
+
+@contextmanager
+def _record_span(tracer: Tracer, name: str, category: str, args: dict):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        tracer.record(name, category, start, time.perf_counter() - start, **args)
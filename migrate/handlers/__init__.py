@@ -1,5 +1,14 @@
-from .repo import repo
-from .org import org
-from .enterprise import enterprise
-from .pull import pull
-from .check import check
+"""
+Command handlers. Each handler package is imported the first time it is
+accessed, so loading one command does not import the others.
+"""
+
+import importlib
+
+__all__ = ["repo", "org", "enterprise", "pull", "check", "logs", "run", "serve", "batch"]
+
+
+def __getattr__(name):
+    if name in __all__:
+        return getattr(importlib.import_module(f".{name}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,79 @@
+"""
+Batch command implementation
+"""
+
+import json
+import sys
+
+import click
+from yaml import dump
+from ...common.batch import format_retry_manifest, parse_manifest, run_batch
+from ...common.options import CONTEXT_SETTINGS
+
+
+@click.command("batch", context_settings=CONTEXT_SETTINGS, no_args_is_help=True)
+@click.argument("manifest", type=click.File("r"))
+@click.option(
+    "--parallel",
+    "-n",
+    type=click.IntRange(min=1),
+    default=1,
+    help="The maximum number of commands to run concurrently (default: 1)",
+)
+@click.option(
+    "--report",
+    "-f",
+    type=click.File("w"),
+    default=None,
+    help="Writes the exit code of each command to the specified file",
+)
+@click.option(
+    "--retry-manifest",
+    type=click.File("w"),
+    default=None,
+    help="Writes the failed commands to a manifest which can be run as a batch",
+)
+@click.option(
+    "--json/--yaml",
+    "-j/-y",
+    "is_json",
+    help="Determines the report format (default: yaml)",
+    is_flag=True,
+    flag_value=True,
+    default=False,
+    required=False,
+)
+@click.pass_context
+def batch(
+    ctx: click.Context,
+    manifest: click.File,
+    parallel: int,
+    report: click.File,
+    retry_manifest: click.File,
+    is_json,
+):
+    """Runs the commands listed in a manifest within a single process
+
+    MANIFEST: A text file with one command per line, or a YAML (.yml, .yaml) list
+    of commands. Commands omit the program name, for example:
+    repo settings copy -c config.yml --src repo-a --dest repo-a
+    """
+    commands = parse_manifest(manifest.name, manifest.read())
+    results = run_batch(ctx.find_root().command, commands, max_workers=parallel)
+
+    failed = [result for result in results if result.exit_code != 0]
+    if report:
+        data = [result.to_dict() for result in results]
+        if is_json:
+            json.dump(data, report, indent=2)
+        else:
+            dump(data, report)
+    if retry_manifest:
+        retry_manifest.write(format_retry_manifest(failed))
+    for result in failed:
+        click.echo(
+            f"Line {result.line} failed ({result.exit_code}): {result.command}", err=True
+        )
+    click.echo(f"{len(results)} commands, {len(failed)} failed", err=True)
+    if failed:
+        sys.exit(1)
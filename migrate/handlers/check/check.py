@@ -11,18 +11,23 @@ from ...common.options import (
     target_options,
     TargetState,
 )
-from ...common.api import create_client
+from ...common.api import ConditionalCache, create_client
 from ...common.checks import (
     list_check_runs_for_commit,
     list_check_suites_for_commit,
     list_check_runs_for_suite,
     get_check_run,
+    export_check_runs,
+    poll_check_runs_for_commit,
+    summarize_check_runs,
+    wait_for_check_runs,
+    WaitOutcome,
 )
 
 
 @click.group(context_settings=CONTEXT_SETTINGS)
 def check():
-    """Provides commands for extracting pull request resources"""
+    """Provides commands for extracting check resources"""
 
 
 @check.command("runs", no_args_is_help=True)
@@ -96,3 +101,146 @@ def list_runs(
         )
     else:
         dump(list(response), output)
+
+
+def _read_repositories(repos: tuple[str], repo_list: click.File):
+    """Combines the repositories provided as options and in a file (one per line)"""
+    names = list(repos)
+    if repo_list:
+        names.extend(line.strip() for line in repo_list if line.strip())
+    return names
+
+
+@check.command("export", no_args_is_help=True)
+@click.option(
+    "--repo",
+    "-r",
+    "repos",
+    multiple=True,
+    help="A repository containing the checks. Can be provided multiple times.",
+)
+@click.option(
+    "--repo-list",
+    "-l",
+    type=click.File("r"),
+    default=None,
+    help="A file containing the repositories to export, one per line",
+)
+@click.option(
+    "--ref",
+    "refs",
+    multiple=True,
+    required=True,
+    help="The branch name or SHA. Can be provided multiple times.",
+)
+@click.option(
+    "--filter",
+    type=click.Choice(["latest", "all"]),
+    default="latest",
+    help="Filters results to the latest runs of each check or all runs (default: latest)",
+)
+@click.option(
+    "--workers",
+    "-w",
+    type=click.IntRange(min=1),
+    default=8,
+    help="The number of concurrent requests (default: 8)",
+)
+@click.option(
+    "--output",
+    "-f",
+    type=click.File("w"),
+    default=sys.stdout,
+    help="Output file. If not provided, stdout is used.",
+)
+@target_options
+@pass_targetstate
+def export_runs(
+    ctx: TargetState,
+    repos: tuple[str],
+    repo_list: click.File,
+    refs: tuple[str],
+    filter: str,
+    workers: int,
+    output: click.File,
+):
+    """Exports the check suites, runs and annotations for each ref in each
+    repository. Each check run is written as a line of JSON (NDJSON)."""
+    names = _read_repositories(repos, repo_list)
+    if not names:
+        raise click.UsageError("At least one repository must be provided")
+    api = create_client(hostname=ctx.hostname, token=ctx.token)
+    targets = ((repo, ref) for repo in names for ref in refs)
+    for run in export_check_runs(
+        client=api, org=ctx.org, targets=targets, filter=filter, max_workers=workers
+    ):
+        output.write(json.dumps(run, cls=FastcoreJsonEncoder))
+        output.write("\n")
+        output.flush()
+
+
+WAIT_EXIT_CODES = {
+    WaitOutcome.SUCCEEDED: 0,
+    WaitOutcome.FAILED: 1,
+    WaitOutcome.TIMED_OUT: 2,
+}
+
+
+@check.command("wait", no_args_is_help=True)
+@click.option("--repo", "-r", required=True, help="The repository containing the checks")
+@click.option("--ref", required=True, help="The branch name or SHA")
+@click.option(
+    "--timeout",
+    type=click.FloatRange(min=0),
+    default=3600,
+    help="The maximum number of seconds to wait (default: 3600)",
+)
+@click.option(
+    "--min-interval",
+    type=click.FloatRange(min=1),
+    default=5,
+    help="The minimum number of seconds between polls (default: 5)",
+)
+@click.option(
+    "--max-interval",
+    type=click.FloatRange(min=1),
+    default=60,
+    help="The maximum number of seconds between polls (default: 60)",
+)
+@click.option(
+    "--fail-fast",
+    is_flag=True,
+    default=False,
+    help="Stops waiting as soon as any check run fails",
+)
+@target_options
+@pass_targetstate
+def wait_runs(
+    ctx: TargetState,
+    repo: str,
+    ref: str,
+    timeout: float,
+    min_interval: float,
+    max_interval: float,
+    fail_fast: bool,
+):
+    """Waits for the check runs on a ref to complete. Exits with 0 if every run
+    succeeded, 1 if any run failed, or 2 if the timeout elapsed. Polling uses
+    conditional requests, so unchanged results do not consume the rate limit."""
+    cache = ConditionalCache()
+    outcome, runs = wait_for_check_runs(
+        lambda: poll_check_runs_for_commit(
+            cache, ctx.hostname, ctx.token, ctx.org, repo, ref
+        ),
+        timeout=timeout,
+        min_interval=min_interval,
+        max_interval=max(min_interval, max_interval),
+        fail_fast=fail_fast,
+    )
+    counts = ", ".join(
+        f"{count} {name}" for name, count in sorted(summarize_check_runs(runs).items())
+    )
+    click.echo(
+        f"{outcome}: {len(runs)} check run(s)" + (f" ({counts})" if counts else "")
+    )
+    sys.exit(WAIT_EXIT_CODES[outcome])
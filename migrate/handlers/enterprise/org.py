@@ -13,6 +13,7 @@ from ...common.options import (
 )
 from ...common.api import is_ghec
 from ...common.orgs import get_organizations_in_enterprise, Organization
+from ...common.trace import span
 from yaml import dump
 
 
@@ -113,7 +114,8 @@ def list_enterprise_orgs(
         click.echo(organizations)
     else:
         results = list(map(lambda r: r.to_dict(), organizations))
-        if is_json:
-            json.dump(results, output, indent=2 if sys.stdout.isatty() else None)
-        else:
-            dump(results, output)
+        with span("dump", "output", format="json" if is_json else "yaml"):
+            if is_json:
+                json.dump(results, output, indent=2 if sys.stdout.isatty() else None)
+            else:
+                dump(results, output)
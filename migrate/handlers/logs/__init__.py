@@ -0,0 +1 @@
+from .logs import logs
@@ -0,0 +1,178 @@
+"""Provides commands for workflow run logs"""
+
+import json
+import re
+import sys
+from datetime import timezone
+from itertools import islice
+
+import click
+from ...common.api import create_client
+from ...common.logs import search_workflow_run_logs
+from ...common.options import (
+    CONTEXT_SETTINGS,
+    TargetState,
+    pass_targetstate,
+    target_options,
+)
+from ...common.repos import iter_workflow_runs
+
+
+@click.group(context_settings=CONTEXT_SETTINGS)
+def logs():
+    """Provides commands for searching workflow run logs"""
+
+
+def _as_utc(value):
+    return value.replace(tzinfo=timezone.utc) if value else None
+
+
+def _format_match(match, use_color: bool):
+    location = f"{match.run_id}:{match.job}" + (f"/{match.step}" if match.step else "")
+    lines = [
+        f"{location}-{match.line_number - len(match.before) + n}-{line}"
+        for n, line in enumerate(match.before)
+    ]
+    line = click.style(match.line, bold=True) if use_color else match.line
+    lines.append(f"{location}:{match.line_number}:{line}")
+    lines.extend(
+        f"{location}-{match.line_number + n}-{line}"
+        for n, line in enumerate(match.after, start=1)
+    )
+    return "\n".join(lines)
+
+
+@logs.command("search", no_args_is_help=True)
+@click.argument("pattern")
+@click.option("--repo", "-r", required=True, help="The repository containing the runs")
+@click.option(
+    "--run",
+    "run_ids",
+    type=int,
+    multiple=True,
+    help="The id of a workflow run to search. Can be provided multiple times. "
+    "If not provided, the runs are selected using the filters.",
+)
+@click.option(
+    "--since",
+    type=click.DateTime(),
+    default=None,
+    help="The earliest creation time (UTC) of the runs to search",
+)
+@click.option(
+    "--until",
+    type=click.DateTime(),
+    default=None,
+    help="The latest creation time (UTC) of the runs to search",
+)
+@click.option(
+    "--status", default=None, help="Filters runs to the specified status or conclusion"
+)
+@click.option("--branch", default=None, help="Filters runs to the specified branch")
+@click.option(
+    "--limit",
+    type=click.IntRange(min=1),
+    default=None,
+    help="The maximum number of runs to search",
+)
+@click.option(
+    "--ignore-case", "-i", is_flag=True, default=False, help="Ignores case when matching"
+)
+@click.option(
+    "--context",
+    "-C",
+    type=click.IntRange(min=0),
+    default=0,
+    help="The number of lines to show before and after each match (default: 0)",
+)
+@click.option(
+    "--workers",
+    "-w",
+    type=click.IntRange(min=1),
+    default=8,
+    help="The number of log archives to download concurrently (default: 8)",
+)
+@click.option(
+    "--processes",
+    "-p",
+    type=click.IntRange(min=1),
+    default=None,
+    help="The number of processes scanning log archives (default: CPU count)",
+)
+@click.option(
+    "--output",
+    "-f",
+    type=click.File("w"),
+    default=sys.stdout,
+    help="Output file. If not provided, stdout is used.",
+)
+@click.option(
+    "--json",
+    "is_json",
+    is_flag=True,
+    default=False,
+    help="Writes each match as a line of JSON (NDJSON)",
+)
+@target_options
+@pass_targetstate
+def search_logs(
+    ctx: TargetState,
+    pattern: str,
+    repo: str,
+    run_ids: tuple[int],
+    since,
+    until,
+    status: str,
+    branch: str,
+    limit: int,
+    ignore_case: bool,
+    context: int,
+    workers: int,
+    processes: int,
+    output: click.File,
+    is_json: bool,
+):
+    """Searches the logs of workflow runs for a regular expression, reporting the
+    run, job, step and line of each match.
+
+    PATTERN: The regular expression to search for
+    """
+    try:
+        re.compile(pattern)
+    except re.error as ex:
+        raise click.BadParameter(str(ex), param_hint="PATTERN")
+    api = create_client(hostname=ctx.hostname, token=ctx.token)
+    if run_ids:
+        runs = iter(run_ids)
+    else:
+        filters = {
+            name: value
+            for name, value in (("status", status), ("branch", branch))
+            if value is not None
+        }
+        runs = (
+            run["id"]
+            for run in iter_workflow_runs(
+                api, ctx.org, repo, since=_as_utc(since), until=_as_utc(until), **filters
+            )
+        )
+    matches = search_workflow_run_logs(
+        api,
+        ctx.token,
+        ctx.org,
+        repo,
+        islice(runs, limit),
+        pattern,
+        flags=re.IGNORECASE if ignore_case else 0,
+        context=context,
+        download_workers=workers,
+        scan_workers=processes,
+    )
+    use_color = output.isatty()
+    for match in matches:
+        if is_json:
+            output.write(json.dumps(match.to_dict()))
+        else:
+            output.write(_format_match(match, use_color))
+        output.write("\n")
+        output.flush()
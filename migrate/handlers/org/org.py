@@ -12,6 +12,7 @@ from ...common.options import (
     pass_targetstate,
 )
 from ...common.api import create_client
+from ...common.trace import span
 from ...common.orgs import (
     get_org_settings,
     get_org_actions_permissions,
@@ -98,10 +99,11 @@ def list_repositories(
         click.echo(repositories)
     else:
         results = list(map(lambda r: r.to_dict(), repositories))
-        if is_json:
-            json.dump(results, output, indent=2 if sys.stdout.isatty() else None)
-        else:
-            dump(results, output)
+        with span("dump", "output", format="json" if is_json else "yaml"):
+            if is_json:
+                json.dump(results, output, indent=2 if sys.stdout.isatty() else None)
+            else:
+                dump(results, output)
 
 
 org.add_command(org_secrets)
@@ -5,7 +5,7 @@ Org secrets command implementation
 import sys
 
 import click
-from ...common.api import create_client
+from ...common.api import ApiError, create_client
 from ...common.options import (
     CONTEXT_SETTINGS,
     TargetState,
@@ -13,6 +13,7 @@ from ...common.options import (
     target_options,
 )
 from ...common.orgs import OrgSecretVisibility, list_org_secrets, set_org_secret
+from ...common.progress import track
 from yaml import dump, load
 
 try:
@@ -61,7 +62,14 @@ def load_secrets(ctx: TargetState, file: click.File):
     """
     config = load(file.read(), Loader=Loader)
     api = create_client(hostname=ctx.hostname, token=ctx.token)
-    for name, value in config.items():
-        click.echo(
-            set_org_secret(api, ctx.org, name.upper(), value, OrgSecretVisibility.ALL)
-        )
+    failures = 0
+    for name, value in track(config.items(), "secrets"):
+        try:
+            click.echo(
+                set_org_secret(api, ctx.org, name.upper(), value, OrgSecretVisibility.ALL)
+            )
+        except ApiError as ex:  # Raised while errors are being collected
+            failures += 1
+            click.echo(f"{name.upper()}: {ex}", err=True)
+    if failures:
+        sys.exit(1)
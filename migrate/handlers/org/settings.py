@@ -13,9 +13,12 @@ from ...common.options import (
     migration_options,
     pass_migrationstate,
     pass_targetstate,
+    pipeline_options,
     target_options,
 )
-from ...common.orgs import get_org_settings, set_org_settings
+from ...common.orgs import copy_org_settings_bulk, get_org_settings, set_org_settings
+from ...common.trace import span
+from ..repo.bulk import echo_copy_results, read_copy_mapping
 from yaml import dump, load
 
 try:
@@ -55,7 +58,8 @@ def list_settings(ctx: TargetState, output: click.File, compact: bool):
     if sys.stdout.isatty() and compact:
         click.echo(settings)
     else:
-        dump(settings.to_dict(), output)
+        with span("dump", "output", format="yaml"):
+            dump(settings.to_dict(), output)
 
 
 @org_settings.command("copy", no_args_is_help=True)
@@ -68,14 +72,47 @@ def list_settings(ctx: TargetState, output: click.File, compact: bool):
     flag_value=True,
     required=False,
 )
+@click.option(
+    "--mapping",
+    type=click.File("r"),
+    default=None,
+    help="YAML file mapping source organization names to destination names. "
+    "If provided, the settings are copied for each organization in the file.",
+)
+@pipeline_options
 @migration_options
 @pass_migrationstate
-def copy_settings(ctx: MigrationState):
+def copy_settings(
+    ctx: MigrationState,
+    include_ghas: bool,
+    mapping,
+    readers: int,
+    writers: int,
+    read_interval: float,
+    write_interval: float,
+    retry_manifest,
+):
     """Copies the settings from one organization to another"""
     src_client = create_client(hostname=ctx.src_hostname, token=ctx.src_token)
     dest_client = create_client(hostname=ctx.dest_hostname, token=ctx.dest_token)
-    src_settings = get_org_settings(src_client, ctx.src_org)
-    set_org_settings(dest_client, ctx.dest_org, src_settings)
+    if mapping is None:
+        src_settings = get_org_settings(src_client, ctx.src_org)
+        set_org_settings(dest_client, ctx.dest_org, src_settings, include_ghas)
+        return
+
+    pairs = read_copy_mapping(mapping)
+    results = copy_org_settings_bulk(
+        src_client,
+        dest_client,
+        pairs,
+        readers=readers,
+        writers=writers,
+        read_interval=read_interval,
+        write_interval=write_interval,
+        include_ghas=include_ghas,
+    )
+    if echo_copy_results(results, retry_manifest, total=len(pairs)):
+        sys.exit(1)
 
 
 @org_settings.command("load", no_args_is_help=True)
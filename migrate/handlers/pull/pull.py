@@ -10,10 +10,17 @@ from ...common.options import (
     TargetState,
 )
 from ...common.api import create_client
+from ...common.trace import span
 from ...common.pulls import (
+    export_pull_requests,
+    iter_pull_requests_graphql,
     list_pull_requests,
     get_pull_request,
     list_commits_on_pull_request,
+    load_watermarks,
+    save_watermarks,
+    store_pull_request,
+    sync_pull_requests,
 )
 
 
@@ -76,15 +83,148 @@ def list_pulls(
     """Lists the pull requests in a repository"""
     api = create_client(hostname=ctx.hostname, token=ctx.token)
     response = list_pull_requests(
-        client=api, org=ctx.org, repo=repo, sort=sort, state=type, direction=direction
+        client=api, org=ctx.org, repo=repo, sort=sort, state=state, direction=direction
     )
 
-    if is_json:
-        json.dump(
-            response,
-            output,
-            cls=FastcoreJsonEncoder,
-            indent=2 if sys.stdout.isatty() else None,
+    with span("dump", "output", format="json" if is_json else "yaml"):
+        if is_json:
+            json.dump(
+                response,
+                output,
+                cls=FastcoreJsonEncoder,
+                indent=2 if sys.stdout.isatty() else None,
+            )
+        else:
+            dump(response, output)
+
+
+@pull.command("export", no_args_is_help=True)
+@click.option("--repo", "-r", required=True, help="The repository containing the PRs")
+@click.option(
+    "--state",
+    "-t",
+    type=click.Choice(["open", "closed", "all"]),
+    default="all",
+    help="The state of the pull requests to return (default: all)",
+)
+@click.option(
+    "--workers",
+    "-w",
+    type=click.IntRange(min=1),
+    default=8,
+    help="The number of pull requests to retrieve details for concurrently (default: 8)",
+)
+@click.option(
+    "--output",
+    "-f",
+    type=click.File("w"),
+    default=sys.stdout,
+    help="Output file. If not provided, stdout is used.",
+)
+@click.option(
+    "--graphql/--rest",
+    "use_graphql",
+    default=False,
+    help="Retrieves pages of pull requests with their labels, commits and reviews "
+    "using GraphQL. Review comments are not included. (default: rest)",
+)
+@target_options
+@pass_targetstate
+def export_pulls(
+    ctx: TargetState,
+    repo: str,
+    state: str,
+    workers: int,
+    output: click.File,
+    use_graphql: bool,
+):
+    """Exports the pull requests in a repository with their commits, reviews and
+    review comments. Each pull request is written as a line of JSON (NDJSON) as
+    soon as it has been retrieved."""
+    if use_graphql:
+        pulls = iter_pull_requests_graphql(
+            endpoint=ctx.hostname, token=ctx.token, org=ctx.org, repo=repo, state=state
         )
     else:
-        dump(response, output)
+        api = create_client(hostname=ctx.hostname, token=ctx.token)
+        pulls = export_pull_requests(
+            client=api, org=ctx.org, repo=repo, state=state, max_workers=workers
+        )
+    for details in pulls:
+        output.write(json.dumps(details, cls=FastcoreJsonEncoder))
+        output.write("\n")
+        output.flush()
+
+
+@pull.command("sync", no_args_is_help=True)
+@click.option("--repo", "-r", required=True, help="The repository containing the PRs")
+@click.option(
+    "--watermarks",
+    "-m",
+    type=click.Path(dir_okay=False),
+    required=True,
+    help="JSON file recording the last synchronized update time for each repository",
+)
+@click.option(
+    "--store",
+    "-s",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Directory to merge the changed pull requests into, as one JSON file "
+    "per pull request. If not provided, the changes are written as NDJSON.",
+)
+@click.option(
+    "--state",
+    "-t",
+    type=click.Choice(["open", "closed", "all"]),
+    default="all",
+    help="The state of the pull requests to return (default: all)",
+)
+@click.option(
+    "--workers",
+    "-w",
+    type=click.IntRange(min=1),
+    default=8,
+    help="The number of pull requests to retrieve details for concurrently (default: 8)",
+)
+@click.option(
+    "--output",
+    "-f",
+    type=click.File("w"),
+    default=sys.stdout,
+    help="Output file. If not provided, stdout is used.",
+)
+@target_options
+@pass_targetstate
+def sync_pulls(
+    ctx: TargetState,
+    repo: str,
+    watermarks: str,
+    store: str,
+    state: str,
+    workers: int,
+    output: click.File,
+):
+    """Exports the pull requests which changed since the previous sync, with their
+    commits, reviews and review comments. Only the pages containing changes are
+    requested. The watermark is saved once the sync completes."""
+    api = create_client(hostname=ctx.hostname, token=ctx.token)
+    marks = load_watermarks(watermarks)
+    count = 0
+    for details in sync_pull_requests(
+        client=api,
+        org=ctx.org,
+        repo=repo,
+        watermarks=marks,
+        state=state,
+        max_workers=workers,
+    ):
+        count += 1
+        if store:
+            store_pull_request(store, ctx.org, repo, details)
+        else:
+            output.write(json.dumps(details, cls=FastcoreJsonEncoder))
+            output.write("\n")
+            output.flush()
+    save_watermarks(watermarks, marks)
+    print(f"Synchronized {count} changed pull request(s)", file=sys.stderr)
@@ -0,0 +1,84 @@
+"""
+Options and helpers shared by the commands for copying many repositories or organizations
+"""
+
+import click
+from ...common.options import pipeline_options
+from ...common.orgs import list_organization_repositories
+from ...common.progress import track
+from ...common.tasks import TaskStatus
+
+
+def bulk_copy_options(fxn):
+    """Decorator to configure the options for copying every repository (--all)
+    or the repositories in a mapping file (--mapping)"""
+    fxn = pipeline_options(fxn)
+    fxn = click.option(
+        "--mapping",
+        type=click.File("r"),
+        default=None,
+        help="YAML file mapping source repository names to destination names",
+    )(fxn)
+    fxn = click.option(
+        "--all",
+        "copy_all",
+        is_flag=True,
+        default=False,
+        help="Copies every repository in the source organization to the "
+        "repository with the same name in the destination organization",
+    )(fxn)
+    return fxn
+
+
+def select_repo_pairs(src_client, src_org: str, src: str, dest: str, copy_all, mapping):
+    """Determines the (source, destination) repositories to copy
+
+    Returns:
+    list[tuple[str, str]]: the repositories to copy, or None when a single
+    repository is copied using --src and --dest
+    """
+    single = bool(src or dest)
+    if single + copy_all + (mapping is not None) != 1 or (single and not (src and dest)):
+        raise click.UsageError("Provide either --src and --dest, --all, or --mapping")
+    if single:
+        return None
+    if mapping is not None:
+        return read_copy_mapping(mapping)
+    return [
+        (repo.name, repo.name)
+        for repo in list_organization_repositories(src_client, src_org)
+    ]
+
+
+def read_copy_mapping(mapping, param_hint: str = "--mapping"):
+    """Reads a YAML mapping of source names to destination names"""
+    from yaml import safe_load
+
+    pairs = safe_load(mapping.read()) or {}
+    if not isinstance(pairs, dict):
+        raise click.BadParameter(
+            "The mapping must map source names to destination names",
+            param_hint=param_hint,
+        )
+    return [(str(src), str(dest)) for src, dest in pairs.items()]
+
+
+def echo_copy_results(results, retry_manifest=None, total: int = None) -> int:
+    """Writes a table of copy results as they complete, returning the number of
+    failures. The failed copies are written to the retry manifest as a mapping."""
+    failed = {}
+    row = "{:<40} {:<40} {:<10} {}"
+    click.echo(row.format("SOURCE", "DESTINATION", "STATUS", "ERROR"))
+    for result in track(results, "copied", total):
+        if result.status == TaskStatus.FAILED:
+            failed[result.source] = result.destination
+        click.echo(
+            row.format(
+                result.source, result.destination, str(result.status), result.error or ""
+            ).rstrip()
+        )
+    if retry_manifest is not None:
+        from yaml import safe_dump
+
+        safe_dump(failed, retry_manifest, sort_keys=False)
+    return len(failed)
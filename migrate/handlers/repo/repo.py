@@ -14,6 +14,8 @@ from ...common.options import (
 )
 from ...common.api import create_client
 from ...common.orgs import list_organization_repositories, OrgRepoSort, OrgRepoType
+from ...common.trace import span
+from .runs import repo_runs
 from .secrets import repo_secrets
 from .settings import repo_settings
 from .visibility import repo_visibility
@@ -82,12 +84,14 @@ def list_repositories(
         click.echo(repositories)
     else:
         results = list(map(lambda r: r.to_dict(), repositories))
-        if is_json:
-            json.dump(results, output, indent=2 if sys.stdout.isatty() else None)
-        else:
-            dump(results, output)
+        with span("dump", "output", format="json" if is_json else "yaml"):
+            if is_json:
+                json.dump(results, output, indent=2 if sys.stdout.isatty() else None)
+            else:
+                dump(results, output)
 
 
+repo.add_command(repo_runs)
 repo.add_command(repo_secrets)
 repo.add_command(repo_settings)
 repo.add_command(repo_visibility)
@@ -0,0 +1,183 @@
+"""
+Repo workflow runs command implementation
+"""
+
+import json
+import sys
+from collections import Counter
+from datetime import timezone
+
+import click
+from ...common.api import DownloadStatus, create_client
+from ...common.options import (
+    CONTEXT_SETTINGS,
+    TargetState,
+    pass_targetstate,
+    target_options,
+)
+from ...common.repos import download_workflow_run_files, iter_workflow_runs
+from ...common.types import FastcoreJsonEncoder
+
+
+@click.group("runs", context_settings=CONTEXT_SETTINGS)
+def repo_runs():
+    """Repository workflow runs"""
+
+
+def _as_utc(value):
+    return value.replace(tzinfo=timezone.utc) if value else None
+
+
+def run_selection_options(func):
+    """Adds the options which select the workflow runs in a repository"""
+    options = [
+        click.argument("repo"),
+        click.option(
+            "--since",
+            type=click.DateTime(),
+            default=None,
+            help="The earliest creation time (UTC). "
+            "Defaults to the creation of the repository.",
+        ),
+        click.option(
+            "--until",
+            type=click.DateTime(),
+            default=None,
+            help="The latest creation time (UTC). Defaults to the current time.",
+        ),
+        click.option(
+            "--status",
+            default=None,
+            help="Filters results to the specified status or conclusion",
+        ),
+        click.option(
+            "--branch", default=None, help="Filters results to the specified branch"
+        ),
+        click.option(
+            "--slices",
+            type=click.IntRange(min=1),
+            default=8,
+            help="The number of date windows the range is initially split into "
+            "(default: 8)",
+        ),
+        click.option(
+            "--workers",
+            "-w",
+            type=click.IntRange(min=1),
+            default=8,
+            help="The number of concurrent requests (default: 8)",
+        ),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
+def _select_runs(
+    api, ctx: TargetState, repo, since, until, status, branch, slices, workers
+):
+    filters = {
+        name: value
+        for name, value in (("status", status), ("branch", branch))
+        if value is not None
+    }
+    return iter_workflow_runs(
+        api,
+        ctx.org,
+        repo,
+        since=_as_utc(since),
+        until=_as_utc(until),
+        slices=slices,
+        max_workers=workers,
+        **filters,
+    )
+
+
+@repo_runs.command("list", no_args_is_help=True)
+@run_selection_options
+@click.option(
+    "--output",
+    "-f",
+    type=click.File("w"),
+    default=sys.stdout,
+    help="Output file. If not provided, stdout is used.",
+)
+@target_options
+@pass_targetstate
+def list_runs(
+    ctx: TargetState,
+    repo: str,
+    since,
+    until,
+    status: str,
+    branch: str,
+    slices: int,
+    workers: int,
+    output: click.File,
+):
+    """Lists every workflow run in a repository, including repositories with more
+    runs than a single listing can return. Each run is written as a line of JSON
+    (NDJSON) as soon as it is retrieved, so the results are not in date order.
+
+    REPO: The name of the repository
+    """
+    api = create_client(hostname=ctx.hostname, token=ctx.token)
+    runs = _select_runs(api, ctx, repo, since, until, status, branch, slices, workers)
+    for run in runs:
+        output.write(json.dumps(run, cls=FastcoreJsonEncoder))
+        output.write("\n")
+    output.flush()
+
+
+@repo_runs.command("download", no_args_is_help=True)
+@run_selection_options
+@click.option(
+    "--dest",
+    "-d",
+    type=click.Path(file_okay=False),
+    required=True,
+    help="The directory to write the logs and artifacts to",
+)
+@click.option(
+    "--logs/--no-logs",
+    default=True,
+    help="Downloads the log archive for each run (default: logs)",
+)
+@click.option(
+    "--artifacts/--no-artifacts",
+    default=True,
+    help="Downloads the artifacts for each run (default: artifacts)",
+)
+@target_options
+@pass_targetstate
+def download_runs(
+    ctx: TargetState,
+    repo: str,
+    since,
+    until,
+    status: str,
+    branch: str,
+    slices: int,
+    workers: int,
+    dest: str,
+    logs: bool,
+    artifacts: bool,
+):
+    """Downloads the log archives and artifacts for the workflow runs in a
+    repository. Files already present with the expected size and digest are
+    skipped, and interrupted downloads are resumed.
+
+    REPO: The name of the repository
+    """
+    api = create_client(hostname=ctx.hostname, token=ctx.token)
+    runs = _select_runs(api, ctx, repo, since, until, status, branch, slices, workers)
+    counts = Counter()
+    for result in download_workflow_run_files(
+        api, ctx.token, ctx.org, repo, runs, dest, logs, artifacts, max_workers=workers
+    ):
+        counts[str(result.status)] += 1
+        if result.status == DownloadStatus.FAILED:
+            click.echo(f"Failed to download {result.path}", err=True)
+    click.echo(", ".join(f"{count} {name}" for name, count in sorted(counts.items())))
+    if counts[str(DownloadStatus.FAILED)]:
+        sys.exit(1)
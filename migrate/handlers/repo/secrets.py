@@ -5,7 +5,7 @@ Secrets command implementation
 import sys
 
 import click
-from ...common.api import create_client
+from ...common.api import ApiError, create_client
 from ...common.options import (
     CONTEXT_SETTINGS,
     TargetState,
@@ -13,6 +13,7 @@ from ...common.options import (
     target_options,
 )
 from ...common.repos import set_repo_secret
+from ...common.progress import track
 from yaml import dump, load
 
 try:
@@ -44,7 +45,16 @@ def load_secrets(ctx: TargetState, repo: str, settings: click.File):
     """
     config = load(settings.read(), Loader=Loader)
     api = create_client(hostname=ctx.hostname, token=ctx.token)
-    for name, value in config.items():
-        click.echo(
-            set_repo_secret(client=api, org=ctx.org, repo=repo, name=name, value=value)
-        )
+    failures = 0
+    for name, value in track(config.items(), "secrets"):
+        try:
+            click.echo(
+                set_repo_secret(
+                    client=api, org=ctx.org, repo=repo, name=name, value=value
+                )
+            )
+        except ApiError as ex:  # Raised while errors are being collected
+            failures += 1
+            click.echo(f"{name}: {ex}", err=True)
+    if failures:
+        sys.exit(1)
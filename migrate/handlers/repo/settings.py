@@ -15,7 +15,10 @@ from ...common.options import (
     pass_targetstate,
     target_options,
 )
-from ...common.repos import get_repo_settings, set_repo_settings
+from ...common.orgs import index_organization_repositories
+from ...common.repos import copy_repo_settings_bulk, get_repo_settings, set_repo_settings
+from ...common.trace import span
+from .bulk import bulk_copy_options, echo_copy_results, select_repo_pairs
 from yaml import dump, load
 
 try:
@@ -56,20 +59,53 @@ def list_settings(ctx: TargetState, repo: str, output: click.File, compact: bool
     if sys.stdout.isatty() and compact:
         click.echo(settings)
     else:
-        dump(settings.to_dict(), output)
+        with span("dump", "output", format="yaml"):
+            dump(settings.to_dict(), output)
 
 
 @repo_settings.command("copy", no_args_is_help=True)
 @click.option("-sr", "--src", help="The source repository")
 @click.option("-dr", "--dest", help="The destination repository")
+@bulk_copy_options
 @migration_options
 @pass_migrationstate
-def copy_settings(ctx: MigrationState, src, dest):
-    """Copies the settings from one repository to another"""
+def copy_settings(
+    ctx: MigrationState,
+    src,
+    dest,
+    copy_all,
+    mapping,
+    readers,
+    writers,
+    read_interval,
+    write_interval,
+    retry_manifest,
+):
+    """Copies the settings from one repository to another, or for every
+    repository in the organization (--all) or in a mapping file (--mapping).
+    Repositories with matching settings are not updated."""
     src_client = create_client(hostname=ctx.src_hostname, token=ctx.src_token)
     dest_client = create_client(hostname=ctx.dest_hostname, token=ctx.dest_token)
-    src_settings = get_repo_settings(src_client, ctx.src_org, src)
-    set_repo_settings(dest_client, ctx.dest_org, dest, src_settings)
+    pairs = select_repo_pairs(src_client, ctx.src_org, src, dest, copy_all, mapping)
+    if pairs is None:
+        src_settings = get_repo_settings(src_client, ctx.src_org, src)
+        set_repo_settings(dest_client, ctx.dest_org, dest, src_settings)
+        return
+
+    results = copy_repo_settings_bulk(
+        src_client,
+        ctx.src_org,
+        dest_client,
+        ctx.dest_org,
+        pairs,
+        readers=readers,
+        writers=writers,
+        read_interval=read_interval,
+        write_interval=write_interval,
+        dest_index=index_organization_repositories(dest_client, ctx.dest_org),
+    )
+    if echo_copy_results(results, retry_manifest, total=len(pairs)):
+        sys.exit(1)
 
 
 @repo_settings.command("load", no_args_is_help=True)
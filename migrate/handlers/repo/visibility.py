@@ -15,7 +15,22 @@ from ...common.options import (
     pass_targetstate,
     target_options,
 )
-from ...common.repos import get_repo_visibility, set_repo_visibility, RepoVisibility
+from ...common.orgs import (
+    OrgRepoType,
+    index_organization_repositories,
+    list_organization_repositories,
+)
+from ...common.repos import (
+    copy_repo_visibility_bulk,
+    get_repo_visibility,
+    select_repositories,
+    set_repo_visibility,
+    set_repo_visibility_bulk,
+    RepoVisibility,
+)
+from ...common.progress import track
+from ...common.tasks import TaskStatus
+from .bulk import bulk_copy_options, echo_copy_results, select_repo_pairs
 from yaml import dump, load
 
 try:
@@ -45,14 +60,46 @@ def get_visibility(
 @repo_visibility.command("copy", no_args_is_help=True)
 @click.option("-sr", "--src", help="The source repository")
 @click.option("-dr", "--dest", help="The destination repository")
+@bulk_copy_options
 @migration_options
 @pass_migrationstate
-def copy_visibility(ctx: MigrationState, src: str, dest: str):
-    """Copies the visibility from one repository to another"""
+def copy_visibility(
+    ctx: MigrationState,
+    src: str,
+    dest: str,
+    copy_all: bool,
+    mapping,
+    readers: int,
+    writers: int,
+    read_interval: float,
+    write_interval: float,
+    retry_manifest,
+):
+    """Copies the visibility from one repository to another, or for every
+    repository in the organization (--all) or in a mapping file (--mapping).
+    Repositories with matching visibility are not updated."""
     src_client = create_client(hostname=ctx.src_hostname, token=ctx.src_token)
     dest_client = create_client(hostname=ctx.dest_hostname, token=ctx.dest_token)
-    visibility = get_repo_visibility(src_client, ctx.src_org, src)
-    set_repo_visibility(dest_client, ctx.dest_org, dest, visibility)
+    pairs = select_repo_pairs(src_client, ctx.src_org, src, dest, copy_all, mapping)
+    if pairs is None:
+        visibility = get_repo_visibility(src_client, ctx.src_org, src)
+        set_repo_visibility(dest_client, ctx.dest_org, dest, visibility)
+        return
+
+    results = copy_repo_visibility_bulk(
+        src_client,
+        ctx.src_org,
+        dest_client,
+        ctx.dest_org,
+        pairs,
+        readers=readers,
+        writers=writers,
+        read_interval=read_interval,
+        write_interval=write_interval,
+        dest_index=index_organization_repositories(dest_client, ctx.dest_org),
+    )
+    if echo_copy_results(results, retry_manifest, total=len(pairs)):
+        sys.exit(1)
 
 
 @repo_visibility.command("set", no_args_is_help=True)
@@ -69,3 +116,90 @@ def loads_settings(ctx: TargetState, repo: str, visibility: RepoVisibility):
     """
     api = create_client(hostname=ctx.hostname, token=ctx.token)
     set_repo_visibility(api, ctx.org, repo, visibility)
+
+
+SERVER_SIDE_TYPES = {"public": OrgRepoType.PUBLIC, "private": OrgRepoType.PRIVATE}
+"""Visibilities which can be filtered by the repository listing"""
+
+
+@repo_visibility.command("bulk", no_args_is_help=True)
+@click.argument("visibility", type=click.Choice(["public", "private", "internal"]))
+@click.option(
+    "--match",
+    "-m",
+    "patterns",
+    multiple=True,
+    help="Selects repositories with names matching a shell-style pattern. "
+    "Can be provided multiple times.",
+)
+@click.option(
+    "--from",
+    "current",
+    type=click.Choice(["public", "private", "internal"]),
+    default=None,
+    help="Selects repositories with the specified visibility",
+)
+@click.option(
+    "--topic",
+    "topics",
+    multiple=True,
+    help="Selects repositories with the topic. Can be provided multiple times.",
+)
+@click.option(
+    "--writers",
+    type=click.IntRange(min=1),
+    default=2,
+    help="The number of concurrent updates (default: 2)",
+)
+@click.option(
+    "--write-interval",
+    type=click.FloatRange(min=0),
+    default=1.0,
+    help="The minimum number of seconds between the start of updates (default: 1)",
+)
+@target_options
+@pass_targetstate
+def bulk_visibility(
+    ctx: TargetState,
+    visibility: str,
+    patterns: tuple[str],
+    current: str,
+    topics: tuple[str],
+    writers: int,
+    write_interval: float,
+):
+    """Updates the visibility of the repositories in the organization selected by
+    name, current visibility and topics. Repositories are selected from a single
+    listing, and repositories already at the target visibility are skipped.
+
+    VISIBILITY: The visibility to apply (public, private, internal)
+    """
+    api = create_client(hostname=ctx.hostname, token=ctx.token)
+    repos = list_organization_repositories(
+        api, ctx.org, type=SERVER_SIDE_TYPES.get(current, OrgRepoType.ALL)
+    )
+    selected = select_repositories(repos, patterns, current, topics)
+    row = "{:<50} {:<10} {:<10} {:<10} {}"
+    click.echo(row.format("REPOSITORY", "BEFORE", "AFTER", "STATUS", "ERROR"))
+    failures = 0
+    changes = set_repo_visibility_bulk(
+        api,
+        ctx.org,
+        selected,
+        RepoVisibility.from_str(visibility),
+        max_workers=writers,
+        write_interval=write_interval,
+    )
+    for change in track(changes, "updated", len(selected)):
+        failures += change.status == TaskStatus.FAILED
+        click.echo(
+            row.format(
+                change.repo,
+                change.before,
+                change.after,
+                str(change.status),
+                change.error or "",
+            ).rstrip()
+        )
+    if failures:
+        sys.exit(1)
@@ -0,0 +1,183 @@
+"""
+Migration plan command implementation
+"""
+
+import json
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+import click
+from yaml import dump, load
+from ...common.api import ApiError, create_client
+from ...common.options import (
+    CONTEXT_SETTINGS,
+    MigrationState,
+    migration_options,
+    pass_migrationstate,
+)
+from ...common.repos import (
+    get_repo_settings,
+    get_repo_visibility,
+    set_repo_ghas_settings,
+    set_repo_secret,
+    set_repo_settings,
+    set_repo_visibility,
+)
+from ...common.tasks import Task, TaskStatus, run_task_graph
+from ...common.trace import span
+
+try:
+    from yaml import CLoader as Loader
+except ImportError:
+    from yaml import Loader
+
+
+def _copy_settings(ctx: MigrationState, src_client, dest_client, repo: dict):
+    """Copies the repository settings, excluding GHAS"""
+    settings = get_repo_settings(src_client, ctx.src_org, repo["src"])
+    set_repo_settings(
+        dest_client, ctx.dest_org, repo["dest"], replace(settings, ghas=None)
+    )
+
+
+def _copy_ghas(ctx: MigrationState, src_client, dest_client, repo: dict):
+    """Copies the repository GitHub Advanced Security settings"""
+    settings = get_repo_settings(src_client, ctx.src_org, repo["src"])
+    if settings.ghas is not None:
+        set_repo_ghas_settings(dest_client, ctx.dest_org, repo["dest"], settings.ghas)
+
+
+def _copy_visibility(ctx: MigrationState, src_client, dest_client, repo: dict):
+    """Copies the repository visibility"""
+    visibility = get_repo_visibility(src_client, ctx.src_org, repo["src"])
+    set_repo_visibility(dest_client, ctx.dest_org, repo["dest"], visibility)
+
+
+def _load_secrets(ctx: MigrationState, src_client, dest_client, repo: dict):
+    """Loads the repository secrets from the YAML file referenced by the plan"""
+    with open(repo["secrets"], "r", encoding="utf-8") as file:
+        secrets = load(file.read(), Loader=Loader) or {}
+    failed = []
+    for name, value in secrets.items():
+        try:
+            set_repo_secret(dest_client, ctx.dest_org, repo["dest"], name, value)
+        except ApiError:  # Raised while errors are being collected
+            failed.append(name)
+    if failed:
+        raise RuntimeError(f"Failed to load secrets: {', '.join(failed)}")
+
+
+PLAN_STEPS = {
+    "settings": (_copy_settings, ()),
+    "ghas": (_copy_ghas, ("settings",)),
+    "visibility": (_copy_visibility, ("settings",)),
+    "secrets": (_load_secrets, ("visibility",)),
+}
+"""The steps supported in a plan, with the steps each one must follow"""
+
+
+def _resolve_dependencies(step: str, steps: list[str]):
+    """Finds the nearest selected steps that must run before the specified step"""
+    dependencies = []
+    pending = list(PLAN_STEPS[step][1])
+    while pending:
+        dependency = pending.pop()
+        if dependency in steps:
+            dependencies.append(dependency)
+        else:
+            pending.extend(PLAN_STEPS[dependency][1])
+    return dependencies
+
+
+def _read_plan_repos(plan: dict, base_path: Path):
+    """Normalizes the repository entries in a plan"""
+    for entry in plan.get("repos") or []:
+        repo = {"src": entry} if isinstance(entry, str) else dict(entry)
+        repo.setdefault("dest", repo["src"])
+        if repo.get("secrets"):
+            repo["secrets"] = str(base_path / repo["secrets"])
+        yield repo
+
+
+def expand_plan(
+    ctx: MigrationState, plan: dict, src_client, dest_client, base_path: Path = Path(".")
+):
+    """Expands a migration plan into a graph of per-repository tasks"""
+    steps = plan.get("steps") or list(PLAN_STEPS)
+    unknown = [step for step in steps if step not in PLAN_STEPS]
+    if unknown:
+        raise click.UsageError(f"Unknown plan steps: {', '.join(unknown)}")
+
+    tasks = []
+    for repo in _read_plan_repos(plan, base_path):
+        for step in steps:
+            if step == "secrets" and not repo.get("secrets"):
+                continue
+            func = PLAN_STEPS[step][0]
+            tasks.append(
+                Task(
+                    name=f"{repo['dest']}:{step}",
+                    group=repo["dest"],
+                    func=lambda func=func, repo=repo: func(
+                        ctx, src_client, dest_client, repo
+                    ),
+                    depends_on=[
+                        f"{repo['dest']}:{dependency}"
+                        for dependency in _resolve_dependencies(step, steps)
+                    ],
+                )
+            )
+    return tasks
+
+
+@click.command("run", context_settings=CONTEXT_SETTINGS, no_args_is_help=True)
+@click.argument("plan", type=click.File("r"))
+@click.option(
+    "--workers",
+    "-w",
+    type=click.IntRange(min=1),
+    default=None,
+    help="The maximum number of tasks to run concurrently (default: plan or 4)",
+)
+@click.option(
+    "--output",
+    "-f",
+    type=click.File("w"),
+    default=sys.stdout,
+    help="Output file. If not provided, stdout is used.",
+)
+@click.option(
+    "--json/--yaml",
+    "-j/-y",
+    "is_json",
+    help="Determines the output format (default: yaml)",
+    is_flag=True,
+    flag_value=True,
+    default=False,
+    required=False,
+)
+@migration_options
+@pass_migrationstate
+def run(ctx: MigrationState, plan: click.File, workers: int, output: click.File, is_json):
+    """Runs a migration plan, migrating independent repositories in parallel
+
+    PLAN: YAML file listing the repositories and the steps to apply to each
+    """
+    config = load(plan.read(), Loader=Loader) or {}
+    src_client = create_client(hostname=ctx.src_hostname, token=ctx.src_token)
+    dest_client = create_client(hostname=ctx.dest_hostname, token=ctx.dest_token)
+    tasks = expand_plan(
+        ctx, config, src_client, dest_client, base_path=Path(plan.name).parent
+    )
+    results = run_task_graph(tasks, max_workers=workers or config.get("workers", 4))
+
+    report = [result.to_dict() for result in results]
+    with span("dump", "output", format="json" if is_json else "yaml"):
+        if is_json:
+            json.dump(report, output, indent=2 if sys.stdout.isatty() else None)
+        else:
+            dump(report, output)
+
+    if any(result.status == TaskStatus.FAILED for result in results):
+        sys.exit(1)
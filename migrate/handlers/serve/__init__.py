@@ -0,0 +1 @@
+from .serve import serve
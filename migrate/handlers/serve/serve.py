@@ -0,0 +1,36 @@
+"""
+Server command implementation
+"""
+
+import click
+from ...common.daemon import (
+    SERVER_ENVVAR,
+    default_socket_path,
+    is_supported,
+    serve_commands,
+)
+from ...common.options import CONTEXT_SETTINGS
+
+
+@click.command("serve", context_settings=CONTEXT_SETTINGS)
+@click.option(
+    "--socket",
+    "-s",
+    "socket_path",
+    default=None,
+    help="The Unix socket to listen on (default: migrate-<uid>.sock in the runtime directory)",
+)
+@click.pass_context
+def serve(ctx: click.Context, socket_path: str):
+    """Runs a server which executes forwarded commands in a single process
+
+    Commands are forwarded to the server when MIGRATE_SERVER contains the socket path.
+    """
+    if not is_supported():
+        raise click.UsageError("The server requires support for Unix domain sockets")
+    socket_path = socket_path or default_socket_path()
+    click.echo(
+        f"Listening on {socket_path}. Set {SERVER_ENVVAR}={socket_path} to forward commands.",
+        err=True,
+    )
+    serve_commands(ctx.find_root().command, socket_path)
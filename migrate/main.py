@@ -1,6 +1,7 @@
 """
 Main entrypoint
 """
+
 import sys
 from pathlib import Path
 import click
@@ -11,21 +12,161 @@ if __package__ is None:
     sys.path.insert(0, str(DIR.parent))
     __package__ = DIR.name
 
-from .common.options import CONTEXT_SETTINGS
-from .handlers import repo, org, enterprise, pull, check
+from .common.options import CONTEXT_SETTINGS, LazyGroup
+from .common.daemon import forward_if_serving
+
+COMMANDS = {
+    "org": (
+        "migrate.handlers.org:org",
+        "Provides commands for migrating organization resources",
+    ),
+    "repo": (
+        "migrate.handlers.repo:repo",
+        "Provides commands for migrating repository resources",
+    ),
+    "enterprise": (
+        "migrate.handlers.enterprise:enterprise",
+        "Provides commands for migrating enterprise resources",
+    ),
+    "pull": (
+        "migrate.handlers.pull:pull",
+        "Provides commands for extracting pull request resources",
+    ),
+    "check": (
+        "migrate.handlers.check:check",
+        "Provides commands for extracting check resources",
+    ),
+    "logs": (
+        "migrate.handlers.logs:logs",
+        "Provides commands for searching workflow run logs",
+    ),
+    "run": (
+        "migrate.handlers.run:run",
+        "Runs a migration plan, migrating independent repositories in parallel",
+    ),
+    "serve": (
+        "migrate.handlers.serve:serve",
+        "Runs a server which executes forwarded commands in a single process",
+    ),
+    "batch": (
+        "migrate.handlers.batch:batch",
+        "Runs the commands listed in a manifest within a single process",
+    ),
+}
+"""The subcommands of the root group. The handlers are imported when first used."""
+
+
+class RootGroup(LazyGroup):
+    """The root group. An API error recorded by `--keep-going` which the command
+    does not handle ends the command with exit code 1 rather than a traceback."""
+
+    def invoke(self, ctx):
+        from .common.api import ApiError
 
+        try:
+            return super().invoke(ctx)
+        except ApiError as ex:
+            print(f"Stopped by API error: {ex}", file=sys.stderr)
+            sys.exit(1)
 
-@click.group(context_settings=CONTEXT_SETTINGS)
+
+@click.group(cls=RootGroup, lazy_subcommands=COMMANDS, context_settings=CONTEXT_SETTINGS)
 @click.version_option()
-def cli():
+@click.option(
+    "--keep-going",
+    is_flag=True,
+    default=False,
+    help="Records API errors and continues with the remaining operations "
+    "instead of exiting on the first error",
+)
+@click.option(
+    "--error-report",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Writes the recorded API errors to a JSON file (implies --keep-going)",
+)
+@click.option(
+    "--progress",
+    "show_progress",
+    is_flag=True,
+    default=False,
+    help="Reports progress, request rates and rate-limit headroom on stderr",
+)
+@click.option(
+    "--metrics",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Writes per-endpoint API request metrics to a file when the command ends",
+)
+@click.option(
+    "--metrics-format",
+    type=click.Choice(["json", "prometheus"]),
+    default="json",
+    help="The format of the metrics file (default: json)",
+)
+@click.option(
+    "--trace",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Writes a timeline of the command to a file as Chrome trace events",
+)
+@click.pass_context
+def cli(
+    ctx: click.Context,
+    keep_going: bool,
+    error_report: str,
+    show_progress: bool,
+    metrics: str,
+    metrics_format: str,
+    trace: str,
+):
     """Provides support for migrating GitHub resources programmatically"""
+    if trace:
+        from .common.trace import start_trace, stop_trace
 
+        if start_trace():
+            ctx.call_on_close(lambda: stop_trace(trace))
+    if metrics:
+        from .common.metrics import ApiMetrics
 
-cli.add_command(org)
-cli.add_command(repo)
-cli.add_command(enterprise)
-cli.add_command(pull)
-cli.add_command(check)
+        api_metrics = ApiMetrics().start()
 
-if __name__ == "__main__":
+        def write_metrics():
+            api_metrics.stop()
+            api_metrics.write(metrics, metrics_format)
+
+        ctx.call_on_close(write_metrics)
+    if show_progress:
+        from .common.progress import start_progress, stop_progress
+
+        if start_progress():
+            ctx.call_on_close(stop_progress)
+    if keep_going or error_report:
+        from .common.api import ErrorCollector, collect_errors
+
+        collector = ctx.with_resource(collect_errors(ErrorCollector()))
+        ctx.call_on_close(lambda: _write_error_report(collector, error_report))
+
+
+def _write_error_report(collector, path: str):
+    """Writes the recorded errors to a file, or summarizes them on stderr"""
+    import json
+
+    report = collector.report()
+    if path:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    elif report["count"]:
+        print(json.dumps(report, indent=2), file=sys.stderr)
+
+
+def main():
+    """Entrypoint which forwards the command to a running server, if one is configured"""
+    exit_code = forward_if_serving(sys.argv[1:])
+    if exit_code is not None:
+        sys.exit(exit_code)
     cli()
+
+
+if __name__ == "__main__":
+    main()
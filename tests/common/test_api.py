@@ -1,9 +1,29 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from io import BytesIO
 import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
 from click.testing import CliRunner
 from migrate.common.api import (
+    ApiError,
+    ConditionalCache,
+    ErrorCollector,
+    call_with_exception_handler,
+    collect_errors,
+    DownloadStatus,
+    SingleFlight,
+    download_to_path,
+    stream_download,
     resolve_rest_endpoint,
     resolve_graphql_endpoint,
     create_client,
+    SlimGhApi,
+    add_request_listener,
+    remove_request_listener,
 )
 from migrate.common.repos import get_repo_settings
 
@@ -150,3 +170,347 @@ def test_repos_get_settings(mock_url_repo_settings, ghapi_client):
     assert settings.allow_auto_merge
     assert not settings.allow_squash_merge
     assert settings.ghas is not None
+
+
+def test_create_client_reuses_clients():
+    client = create_client(token="reuse-token", hostname="api.github.com")
+    assert create_client(token="reuse-token", hostname="github.com") is client
+    assert create_client(token="other-token") is not client
+
+
+def test_slim_client_resolves_operations_on_demand():
+    client = SlimGhApi(token="test-token")
+    assert "repos" not in vars(client)
+    operation = client.repos.get
+    assert "repos" in vars(client)
+    assert client.repos.get is operation
+    assert operation.path == "/repos/{owner}/{repo}"
+    assert client["/repos/{owner}/{repo}", "patch"] is client.repos.update
+
+
+def test_slim_client_unknown_operation():
+    client = SlimGhApi(token="test-token")
+    with pytest.raises(AttributeError):
+        client.not_a_group
+    with pytest.raises(AttributeError):
+        client.repos.not_an_operation
+
+
+def test_slim_client_calls_endpoint(monkeypatch):
+    requests = []
+
+    def mock_urlread(request, *args, **kwargs):
+        requests.append(request)
+        return (
+            repo_response(),
+            {"X-RateLimit-Remaining": "10", "X-RateLimit-Limit": "20"},
+        )
+
+    monkeypatch.setattr("fastcore.net.urlread", mock_urlread)
+    client = SlimGhApi(token="test-token", gh_host="https://server.test/api/v3")
+    result = client.repos.get(owner="test-org", repo="test-repo")
+    assert result.name == "test-repo"
+    assert requests[0].full_url == "https://server.test/api/v3/repos/test-org/test-repo"
+    assert requests[0].headers["Authorization"] == "token test-token"
+    assert client.limit_rem == "10"
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None, etag=None, text="", reason=""):
+        self.status_code = status_code
+        self.content = (json.dumps(data) if data is not None else text).encode()
+        self.reason = reason
+        self.headers = {"ETag": etag} if etag else {}
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def test_conditional_cache_revalidates_with_etag():
+    responses = [FakeResponse(200, {"value": 1}, etag='"abc"'), FakeResponse(304)]
+    calls = []
+
+    def get(url, headers, params):
+        calls.append(headers)
+        return responses.pop(0)
+
+    cache = ConditionalCache()
+    with patch("migrate.common.api.get_session", return_value=SimpleNamespace(get=get)):
+        assert cache.get("https://api/x", "token") == ({"value": 1}, True)
+        assert cache.get("https://api/x", "token") == ({"value": 1}, False)
+    assert "If-None-Match" not in calls[0]
+    assert calls[1]["If-None-Match"] == '"abc"'
+
+
+def test_conditional_cache_reports_non_json_errors():
+    responses = [
+        FakeResponse(502, text="<html>Bad Gateway</html>", reason="Bad Gateway"),
+        FakeResponse(404, {"message": "Not Found"}),
+        FakeResponse(200),
+    ]
+
+    def get(url, headers, params):
+        return responses.pop(0)
+
+    cache = ConditionalCache()
+    with patch("migrate.common.api.get_session", return_value=SimpleNamespace(get=get)):
+        with pytest.raises(SystemExit) as error:
+            cache.get("https://api/x", "token")
+        assert error.value.code == {"status": 502, "message": "Bad Gateway"}
+        with pytest.raises(SystemExit) as error:
+            cache.get("https://api/x", "token")
+        assert error.value.code == {"status": 404, "message": "Not Found"}
+        assert cache.get("https://api/x", "token") == (None, True)
+
+
+class FakeStream:
+    def __init__(self, status_code, content=b""):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {"Content-Length": str(len(content))}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start : start + chunk_size]
+
+
+def fake_download_session(content, calls):
+    def get(url, headers, stream):
+        calls.append(headers)
+        if "Range" in headers:
+            offset = int(headers["Range"][6:-1])
+            return FakeStream(206, content[offset:])
+        return FakeStream(200, content)
+
+    return SimpleNamespace(get=get)
+
+
+def test_download_to_path_resumes_and_skips(tmp_path):
+    content = b"0123456789" * 100
+    digest = "sha256:" + hashlib.sha256(content).hexdigest()
+    path = str(tmp_path / "run" / "logs.zip")
+    os.makedirs(os.path.dirname(path))
+    with open(f"{path}.part", "wb") as file:
+        file.write(content[:300])
+
+    calls = []
+    with patch(
+        "migrate.common.api.get_session",
+        return_value=fake_download_session(content, calls),
+    ):
+        assert download_to_path("https://x", "t", path, digest=digest) == (
+            DownloadStatus.DOWNLOADED
+        )
+        assert calls[0]["Range"] == "bytes=300-"
+        assert open(path, "rb").read() == content
+        # The recorded size and digest are used when the expected values are unknown
+        assert download_to_path("https://x", "t", path) == DownloadStatus.SKIPPED
+        assert len(calls) == 1
+
+
+def test_download_to_path_rejects_digest_mismatch(tmp_path):
+    path = str(tmp_path / "artifact.zip")
+    with patch(
+        "migrate.common.api.get_session",
+        return_value=fake_download_session(b"content", []),
+    ):
+        status = download_to_path("https://x", "t", path, digest="sha256:00")
+    assert status == DownloadStatus.FAILED
+    assert not os.path.exists(path) and not os.path.exists(f"{path}.part")
+
+
+def test_stream_download_writes_to_sink_and_reports_progress():
+    content = bytes(range(256)) * 64
+    sink = BytesIO()
+    reports = []
+    with patch(
+        "migrate.common.api.get_session",
+        return_value=fake_download_session(content, []),
+    ):
+        result = stream_download(
+            "https://x",
+            "t",
+            sink,
+            chunk_size=1024,
+            on_progress=reports.append,
+            progress_interval=0,
+        )
+    assert sink.getvalue() == content
+    assert result.matches(size=len(content))
+    assert result.digest == "sha256:" + hashlib.sha256(content).hexdigest()
+    assert len(reports) == 17
+    assert reports[-1].received == reports[-1].total == len(content)
+
+
+def test_stream_download_rewrites_sink_when_range_is_ignored():
+    content = b"0123456789" * 100
+    sink = BytesIO()
+    sink.write(content[:300])
+    session = SimpleNamespace(get=lambda url, headers, stream: FakeStream(200, content))
+    with patch("migrate.common.api.get_session", return_value=session):
+        result = stream_download(
+            "https://x", "t", sink, offset=300, hasher=hashlib.sha256(content[:300])
+        )
+    assert sink.getvalue() == content
+    assert not result.resumed
+    assert result.matches(size=len(content))
+
+
+def test_single_flight_shares_concurrent_calls():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", fetch)))
+    leader.start()
+    started.wait(5)
+    followers = [
+        threading.Thread(target=lambda: results.append(flight.do("key", fetch)))
+        for _ in range(3)
+    ]
+    for thread in followers:
+        thread.start()
+    time.sleep(0.2)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert results == ["value"] * 4
+    assert len(calls) == 1
+    assert flight.do("key", lambda: "next") == "next"
+
+
+def test_single_flight_shares_exceptions():
+    flight = SingleFlight()
+
+    def fail():
+        raise SystemExit(1)
+
+    with pytest.raises(SystemExit):
+        flight.do("key", fail)
+    assert flight.do("key", lambda: 1) == 1
+
+
+def test_slim_client_coalesces_concurrent_gets(monkeypatch):
+    requests = []
+    release = threading.Event()
+
+    def mock_urlread(request, *args, **kwargs):
+        requests.append(request.get_method())
+        if request.get_method() == "GET":
+            release.wait(5)
+        return (repo_response(), {})
+
+    monkeypatch.setattr("fastcore.net.urlread", mock_urlread)
+    client = SlimGhApi(token="test-token", gh_host="https://server.test/api/v3")
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(
+                client.repos.get(owner="test-org", repo="test-repo")
+            )
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    client.repos.update(owner="test-org", repo="test-repo", has_wiki=False)
+    client.repos.update(owner="test-org", repo="test-repo", has_wiki=False)
+
+    assert [result.name for result in results] == ["test-repo"] * 4
+    assert requests == ["GET", "PATCH", "PATCH"]
+
+
+def client_error(code):
+    from fastcore.net import HTTP4xxClientError
+
+    def fail():
+        body = '{"message": "Repository was archived"}'
+        raise HTTP4xxClientError(
+            "https://api.test/repos/org/repo",
+            code,
+            f"HTTP Error\n====Error Body====\n{body}",
+            {},
+            None,
+        )
+
+    return fail
+
+
+def test_call_with_exception_handler_exits_on_client_error(capsys):
+    with pytest.raises(SystemExit):
+        call_with_exception_handler("org/repo", client_error(403))
+    assert '"status": "Forbidden"' in capsys.readouterr().err
+
+
+def test_call_with_exception_handler_collects_errors():
+    collector = ErrorCollector()
+    with collect_errors(collector):
+        for code in (403, 422):
+            with pytest.raises(ApiError):
+                call_with_exception_handler("org/repo", client_error(code))
+        with collect_errors(ErrorCollector()) as active:
+            assert active is collector
+
+    report = collector.report()
+    assert report["count"] == 2
+    assert report["errors"][1] == {
+        "code": 422,
+        "status": "Unprocessable Entity",
+        "context": "org/repo",
+        "details": {"message": "Repository was archived"},
+    }
+    with pytest.raises(SystemExit):
+        call_with_exception_handler("org/repo", client_error(403))
+
+
+def test_slim_client_reports_the_headers_of_each_request(monkeypatch):
+    def mock_urlread(request, *args, **kwargs):
+        remaining = request.full_url.rsplit("/", 1)[-1].removeprefix("repo-")
+        return (
+            repo_response(),
+            {"X-RateLimit-Remaining": remaining, "X-RateLimit-Limit": "30"},
+        )
+
+    # Both requests store their headers before either request is reported
+    both_received = threading.Barrier(2, timeout=5)
+    monkeypatch.setattr("fastcore.net.urlread", mock_urlread)
+    client = SlimGhApi(token="test-token", gh_host="https://server.test/api/v3")
+    client.limit_cb = lambda *args: both_received.wait()
+    events = []
+    listener = events.append
+    add_request_listener(listener)
+    try:
+        threads = [
+            threading.Thread(
+                target=client.repos.get, kwargs={"owner": "org", "repo": f"repo-{count}"}
+            )
+            for count in (10, 20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+    finally:
+        remove_request_listener(listener)
+
+    assert sorted(
+        (event.url, event.headers["X-RateLimit-Remaining"]) for event in events
+    ) == [("/repos/org/repo-10", "10"), ("/repos/org/repo-20", "20")]
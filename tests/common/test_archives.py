@@ -0,0 +1,69 @@
+import gzip
+import io
+import pytest
+import zipfile
+from migrate.common.api import gunzip_text_file, unzip_file
+from migrate.common.archives import (
+    ZipArchive,
+    iter_gzip_lines,
+    spooled_file,
+)
+
+
+def create_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+LOGS = {
+    "build/1_Setup.txt": "setup\r\ncomplete\n",
+    "build/2_Test.txt": "".join(f"line {n}\n" for n in range(10000)),
+}
+
+
+def test_zip_archive_lists_and_streams_members_from_path(tmp_path):
+    path = tmp_path / "logs.zip"
+    path.write_bytes(create_zip(LOGS))
+    with ZipArchive(str(path)) as archive:
+        members = archive.members()
+        assert [m.name for m in members] == list(LOGS)
+        assert members[1].compressed_size < members[1].size
+        lines = archive.iter_lines("build/2_Test.txt")
+        assert next(lines) == "line 0"
+        assert list(archive.iter_lines("build/1_Setup.txt")) == ["setup", "complete"]
+        assert b"".join(archive.iter_bytes("build/2_Test.txt", 100)) == (
+            LOGS["build/2_Test.txt"].encode()
+        )
+
+
+def test_zip_archive_reads_spooled_file():
+    with spooled_file(max_size=1024) as file:
+        file.write(create_zip(LOGS))
+        with ZipArchive(file) as archive:
+            assert archive.read_text("build/1_Setup.txt") == LOGS["build/1_Setup.txt"]
+
+
+def test_zip_archive_reads_mutable_buffers_without_copying():
+    buffer = bytearray(create_zip(LOGS))
+    with ZipArchive(buffer) as archive:
+        assert list(archive.iter_lines("build/1_Setup.txt")) == ["setup", "complete"]
+        # The archive reads from a view of the buffer, so it cannot be resized
+        with pytest.raises(BufferError):
+            buffer.append(0)
+    buffer.append(0)
+    with memoryview(buffer) as view, ZipArchive(view[:-1]) as archive:
+        assert [member.name for member in archive.members()] == list(LOGS)
+
+
+def test_gzip_helpers():
+    content = gzip.compress(b"first\nsecond\n")
+    assert list(iter_gzip_lines(content)) == ["first", "second"]
+    assert gunzip_text_file(content) == "first\nsecond\n"
+
+
+def test_unzip_file_yields_members():
+    files = list(unzip_file(create_zip(LOGS)))
+    assert [(f.name, f.content) for f in files] == list(LOGS.items())
@@ -0,0 +1,81 @@
+import sys
+import threading
+import click
+from migrate.common.batch import (
+    format_retry_manifest,
+    parse_manifest,
+    parse_text_manifest,
+    parse_yaml_manifest,
+    run_batch,
+)
+
+
+def test_parse_text_manifest_skips_comments_and_blank_lines():
+    commands = parse_text_manifest(
+        "# copy settings\nrepo settings copy --src 'a b' --dest c\n\nrepo list  # all\n"
+    )
+    assert [c.line for c in commands] == [2, 4]
+    assert commands[0].argv == ["repo", "settings", "copy", "--src", "a b", "--dest", "c"]
+    assert commands[1].argv == ["repo", "list"]
+
+
+def test_parse_yaml_manifest_accepts_strings_and_lists():
+    commands = parse_yaml_manifest(
+        "- repo list -o org\n- [repo, settings, list, 'a b']\n"
+    )
+    assert commands[0].argv == ["repo", "list", "-o", "org"]
+    assert commands[1].argv == ["repo", "settings", "list", "a b"]
+
+
+def test_parse_manifest_uses_extension():
+    assert parse_manifest("cmds.YML", "- repo list")[0].argv == ["repo", "list"]
+    assert parse_manifest("cmds.txt", "repo list")[0].argv == ["repo", "list"]
+
+
+calls = []
+lock = threading.Lock()
+
+
+@click.group()
+def root():
+    pass
+
+
+@root.command()
+@click.argument("code", type=int)
+def work(code):
+    with lock:
+        calls.append(code)
+    sys.exit(code)
+
+
+@root.command()
+def fail():
+    raise KeyError("missing")
+
+
+def test_run_batch_continues_after_an_unhandled_exception(capsys):
+    commands = parse_text_manifest("fail\nwork 0\n")
+    results = run_batch(root, commands, max_workers=2)
+    assert [r.exit_code for r in results] == [1, 0]
+    assert "KeyError: 'missing'" in capsys.readouterr().err
+
+
+def test_run_batch_reports_exit_codes():
+    calls.clear()
+    commands = parse_text_manifest("work 0\nwork 3\nserve\nwork 0\n")
+    results = run_batch(root, commands, max_workers=2)
+    assert [r.exit_code for r in results] == [0, 3, 2, 0]
+    assert [r.command for r in results] == ["work 0", "work 3", "serve", "work 0"]
+    assert sorted(calls) == [0, 0, 3]
+
+
+def test_retry_manifest_runs_failed_commands_again():
+    commands = parse_text_manifest("work 0\nwork 3\nwork 'a b'\n")
+    results = run_batch(root, commands)
+    failed = [result for result in results if result.exit_code != 0]
+
+    retry = parse_text_manifest(format_retry_manifest(failed))
+
+    assert [command.argv for command in retry] == [["work", "3"], ["work", "a b"]]
+    assert format_retry_manifest([]) == ""
@@ -0,0 +1,123 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from migrate.common.checks import (
+    WaitOutcome,
+    export_check_runs,
+    next_poll_interval,
+    wait_for_check_runs,
+)
+
+
+def fake_client(calls):
+    def list_suites_for_ref(owner, repo, ref, per_page, page):
+        calls.append(("suites", repo, ref))
+        suites = [{"id": f"{repo}-{ref}-suite"}] if page == 1 else []
+        return {"total_count": 1, "check_suites": suites}
+
+    def list_for_suite(owner, repo, check_suite_id, filter, per_page, page):
+        runs = [
+            {"id": f"{check_suite_id}-run{n}", "output": {"annotations_count": n}}
+            for n in range(2)
+        ]
+        return {"total_count": 2, "check_runs": runs if page == 1 else []}
+
+    def list_annotations(owner, repo, check_run_id, per_page, page):
+        calls.append(("annotations", repo, check_run_id))
+        return [{"message": f"{check_run_id} failed"}] if page == 1 else []
+
+    return SimpleNamespace(
+        checks=SimpleNamespace(
+            list_suites_for_ref=list_suites_for_ref,
+            list_for_suite=list_for_suite,
+            list_annotations=list_annotations,
+        )
+    )
+
+
+def test_export_check_runs_walks_suites_runs_and_annotations():
+    calls = []
+    targets = [(repo, "main") for repo in ("a", "b", "c")]
+    runs = list(export_check_runs(fake_client(calls), "org", targets, max_workers=2))
+
+    assert [run["id"] for run in runs] == [
+        f"{repo}-main-suite-run{n}" for repo in ("a", "b", "c") for n in range(2)
+    ]
+    assert runs[0]["repository"] == "org/a"
+    assert runs[0]["check_suite"] == {"id": "a-main-suite"}
+    assert runs[0]["annotations"] == []
+    assert runs[1]["annotations"] == [{"message": "a-main-suite-run1 failed"}]
+    # Annotations are only requested for runs which report having annotations
+    assert sum(1 for call in calls if call[0] == "annotations") == 3
+
+
+def run(status, conclusion=None, started="2024-01-01T00:00:00Z", completed=None):
+    return {
+        "status": status,
+        "conclusion": conclusion,
+        "started_at": started,
+        "completed_at": completed,
+    }
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def wait(polls, clock, **kwargs):
+    responses = iter(polls)
+    return wait_for_check_runs(
+        lambda: next(responses), clock=clock, sleep=clock.sleep, **kwargs
+    )
+
+
+def test_wait_for_check_runs_succeeds_when_all_complete():
+    clock = FakeClock()
+    pending = [run("in_progress"), run("completed", "success")]
+    done = [run("completed", "success"), run("completed", "skipped")]
+    outcome, runs = wait(
+        [([], True), (pending, True), (pending, False), (done, True)],
+        clock,
+        timeout=600,
+        min_interval=5,
+    )
+    assert outcome == WaitOutcome.SUCCEEDED
+    assert runs == done
+    # Unchanged results back off the polling interval
+    assert clock.sleeps[2] > clock.sleeps[1]
+
+
+def test_wait_for_check_runs_fails_fast():
+    clock = FakeClock()
+    runs = [run("in_progress"), run("completed", "failure")]
+    outcome, _ = wait([(runs, True)], clock, timeout=600, fail_fast=True)
+    assert outcome == WaitOutcome.FAILED
+    assert clock.sleeps == []
+
+
+def test_wait_for_check_runs_times_out():
+    clock = FakeClock()
+    runs = [run("queued", started=None)]
+    outcome, _ = wait([(runs, True)] * 100, clock, timeout=30, min_interval=10)
+    assert outcome == WaitOutcome.TIMED_OUT
+    assert clock.now == 30
+
+
+def test_next_poll_interval_uses_observed_durations():
+    now = datetime(2024, 1, 1, 0, 2, tzinfo=timezone.utc)
+    runs = [
+        run("completed", "success", completed="2024-01-01T00:10:00Z"),
+        run("in_progress", started="2024-01-01T00:00:00Z"),
+    ]
+    # Typical duration is 10 minutes and the pending run started 2 minutes ago
+    assert next_poll_interval(runs, 0, 5, 600, now=now) == 240
+    assert next_poll_interval(runs, 0, 5, 60, now=now) == 60
+    assert next_poll_interval([], 2, 5, 60, now=now) == 11.25
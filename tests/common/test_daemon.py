@@ -0,0 +1,46 @@
+import os
+import sys
+import threading
+import click
+import pytest
+from migrate.common.daemon import CommandServer, forward, forward_if_serving, is_supported
+
+pytestmark = pytest.mark.skipif(not is_supported(), reason="Requires Unix sockets")
+
+
+@click.command()
+@click.argument("code", type=int)
+def echo_state(code):
+    click.echo(f"{os.getcwd()}|{os.getenv('MIGRATE_TEST_VALUE')}")
+    sys.exit(code)
+
+
+@pytest.fixture
+def server(tmp_path):
+    socket_path = str(tmp_path / "migrate.sock")
+    instance = CommandServer(echo_state, socket_path)
+    thread = threading.Thread(target=instance.serve_forever, daemon=True)
+    thread.start()
+    yield socket_path
+    instance.shutdown()
+    instance.server_close()
+    thread.join()
+
+
+def test_forward_uses_client_state(server, tmp_path, monkeypatch, capfd):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("MIGRATE_TEST_VALUE", "forwarded")
+    assert forward(server, ["3"]) == 3
+    assert capfd.readouterr().out == f"{tmp_path}|forwarded\n"
+    assert os.getenv("MIGRATE_TEST_VALUE") == "forwarded"
+
+
+def test_forward_if_serving_without_server(tmp_path, monkeypatch):
+    monkeypatch.setenv("MIGRATE_SERVER", str(tmp_path / "missing.sock"))
+    assert forward_if_serving(["repo"]) is None
+
+
+def test_forward_if_serving_ignores_serve(server, monkeypatch):
+    monkeypatch.setenv("MIGRATE_SERVER", server)
+    assert forward_if_serving(["serve"]) is None
+    assert forward_if_serving(["0"]) == 0
@@ -0,0 +1,53 @@
+import zipfile
+from types import SimpleNamespace
+from unittest.mock import patch
+from migrate.common.logs import scan_log_archive, search_workflow_run_logs
+
+
+def create_log_archive(path, members):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, lines in members.items():
+            archive.writestr(name, "".join(f"{line}\n" for line in lines))
+
+
+STEPS = {
+    "0_build.txt": ["complete job log", "error: duplicate"],
+    "build/1_Set up job.txt": ["starting"],
+    "build/2_Run tests.txt": ["one", "two", "error: failed", "three", "four"],
+}
+
+
+def test_scan_log_archive_reports_step_and_context(tmp_path):
+    path = str(tmp_path / "logs.zip")
+    create_log_archive(path, STEPS)
+    matches = scan_log_archive(42, path, "^error", context=1)
+    assert len(matches) == 1
+    match = matches[0]
+    assert (match.run_id, match.job, match.step) == (42, "build", "Run tests")
+    assert (match.line_number, match.line) == (3, "error: failed")
+    assert (match.before, match.after) == (["two"], ["three"])
+
+
+def test_scan_log_archive_uses_job_logs_without_steps(tmp_path):
+    path = str(tmp_path / "logs.zip")
+    create_log_archive(path, {"0_build.txt": ["ERROR: failed"]})
+    matches = scan_log_archive(1, path, "error", flags=2)
+    assert [(m.job, m.step, m.line_number) for m in matches] == [("build", None, 1)]
+
+
+def test_search_workflow_run_logs_scans_in_run_order():
+    def fake_download(url, token, path):
+        run_id = int(url.split("/")[-2])
+        if run_id == 2:
+            return None
+        create_log_archive(path, {"job/1_step.txt": [f"run {run_id} error"]})
+        return SimpleNamespace(size=1)
+
+    client = SimpleNamespace(gh_host="https://api.github.com")
+    with patch("migrate.common.logs.stream_download", fake_download):
+        matches = list(
+            search_workflow_run_logs(
+                client, "token", "org", "repo", [1, 2, 3], "error", scan_workers=1
+            )
+        )
+    assert [match.line for match in matches] == ["run 1 error", "run 3 error"]
@@ -0,0 +1,139 @@
+import json
+from migrate.common.api import RequestEvent, SlimGhApi, _notify_request
+from migrate.common.metrics import ApiMetrics, endpoint_template
+
+
+def event(template, status=200, duration=0.1, size=None, headers=None, url=None):
+    return RequestEvent(
+        "GET", template, status, 0.0, duration, size, headers or {}, 1, url
+    )
+
+
+def test_endpoint_template_normalizes_urls():
+    assert endpoint_template("/repos/{owner}/{repo}") == "/repos/{owner}/{repo}"
+    assert (
+        endpoint_template("https://api.github.com/repos/org/repo/actions/runs/123/logs")
+        == "/repos/org/repo/actions/runs/{id}/logs"
+    )
+    assert endpoint_template("https://ghes.example.com/api/v3/user") == "/user"
+    assert endpoint_template("https://ghes.example.com/api/graphql") == "/graphql"
+
+
+def test_metrics_aggregate_requests_by_endpoint():
+    metrics = ApiMetrics()
+    metrics(event("/repos/{owner}/{repo}", duration=0.01, size=100))
+    metrics(event("/repos/{owner}/{repo}", duration=3.0, size=50))
+    metrics(event("/user", status=404))
+
+    endpoints = metrics.to_dict()["endpoints"]
+
+    assert [entry["endpoint"] for entry in endpoints] == [
+        "/repos/{owner}/{repo}",
+        "/user",
+    ]
+    repo = endpoints[0]
+    assert repo["count"] == 2
+    assert repo["bytes"] == 150
+    assert repo["duration"]["max"] == 3.0
+    assert repo["latency_buckets"]["0.05"] == 1
+    assert repo["latency_buckets"]["5.0"] == 1
+    assert endpoints[1]["statuses"] == {"404": 1}
+
+
+def test_metrics_count_retries_of_failed_requests():
+    metrics = ApiMetrics()
+    metrics(event("/repos/{owner}/{repo}", status=502, url="/repos/org/a"))
+    metrics(event("/repos/{owner}/{repo}", status=200, url="/repos/org/a"))
+    metrics(event("/repos/{owner}/{repo}", status=200, url="/repos/org/a"))
+
+    assert metrics.to_dict()["endpoints"][0]["retries"] == 1
+
+
+def rate_limited(used, resource="core", reset=1000):
+    headers = {
+        "X-RateLimit-Used": str(used),
+        "X-RateLimit-Resource": resource,
+        "X-RateLimit-Reset": str(reset),
+    }
+    return event("/graphql" if resource == "graphql" else "/user", headers=headers)
+
+
+def test_metrics_derive_cost_from_rate_limit_usage():
+    metrics = ApiMetrics()
+    metrics(rate_limited(10))
+    metrics(rate_limited(11))
+    metrics(rate_limited(50, "graphql"))
+    metrics(rate_limited(3, reset=4600))
+
+    costs = {
+        entry["endpoint"]: entry["rate_limit_cost"]
+        for entry in metrics.to_dict()["endpoints"]
+    }
+
+    # The first request of each resource counts as 1, and usage restarts in a new window
+    assert costs == {"/user": 1 + 1 + 3, "/graphql": 1}
+
+
+def test_metrics_cost_tolerates_requests_reported_out_of_order():
+    metrics = ApiMetrics()
+    for used in (100, 102, 101):
+        metrics(rate_limited(used))
+    # A request from the previous window reported after the reset is not charged
+    metrics(rate_limited(2, reset=4600))
+    metrics(rate_limited(103, reset=1000))
+
+    assert metrics.to_dict()["endpoints"][0]["rate_limit_cost"] == 1 + 2 + 2
+
+
+def test_metrics_are_written_as_prometheus_text():
+    metrics = ApiMetrics()
+    metrics(event("/user", duration=0.2))
+    metrics(event("/user", duration=0.3))
+
+    text = metrics.to_prometheus()
+
+    assert (
+        'migrate_api_requests_total{method="GET",endpoint="/user",status="200"} 2' in text
+    )
+    assert (
+        'migrate_api_request_duration_seconds_bucket{method="GET",endpoint="/user",le="0.25"} 1'
+        in text
+    )
+    assert (
+        'migrate_api_request_duration_seconds_bucket{method="GET",endpoint="/user",le="+Inf"} 2'
+        in text
+    )
+    assert "# TYPE migrate_api_request_duration_seconds histogram" in text
+
+
+def test_metrics_collect_request_events_while_started(tmp_path):
+    metrics = ApiMetrics().start()
+    try:
+        _notify_request("get", "/orgs/{org}", 0.0, 200, {"Content-Length": "12"})
+    finally:
+        metrics.stop()
+    _notify_request("get", "/orgs/{org}", 0.0, 200, {})
+
+    path = tmp_path / "metrics.json"
+    metrics.write(str(path))
+
+    [entry] = json.loads(path.read_text())["endpoints"]
+    assert entry["endpoint"] == "/orgs/{org}"
+    assert entry["count"] == 1
+    assert entry["bytes"] == 12
+
+
+def test_metrics_report_successful_rest_requests_as_2xx(monkeypatch):
+    monkeypatch.setattr(
+        "fastcore.net.urlread", lambda request, *args, **kwargs: ({"id": 1}, {})
+    )
+    client = SlimGhApi(token="token", gh_host="https://server.test/api/v3")
+    metrics = ApiMetrics().start()
+    try:
+        client.actions.create_or_update_org_secret(org="org", secret_name="name")
+    finally:
+        metrics.stop()
+
+    [entry] = metrics.to_dict()["endpoints"]
+    assert entry["statuses"] == {"2xx": 1}
+    assert entry["retries"] == 0
@@ -0,0 +1,58 @@
+import io
+import time
+from migrate.common import progress as progress_module
+from migrate.common.api import RequestEvent, _notify_request, paginated_items
+from migrate.common.progress import (
+    ProgressReporter,
+    Progress,
+    start_progress,
+    stop_progress,
+    track,
+)
+
+
+def test_progress_describes_remaining_work():
+    counter = Progress("copied", total=4)
+    counter.started -= 10
+    counter.advance(2)
+    assert counter.describe(time.monotonic()) == "copied: 2/4 (50%), ETA 10s"
+    assert Progress("listed").describe(time.monotonic()) == "listed: 0"
+
+
+def test_reporter_summarizes_requests_and_rate_limit():
+    reporter = ProgressReporter(stream=io.StringIO(), interval=60)
+    reporter.add(Progress("copied", total=10))
+    for remaining in ("4999", "4998"):
+        headers = {"X-RateLimit-Remaining": remaining, "X-RateLimit-Limit": "5000"}
+        reporter.stats(RequestEvent("GET", "/user", 200, 0.0, 0.1, None, headers, 1))
+
+    line = reporter.describe(time.monotonic() + 1, overall=True)
+
+    assert line.startswith("copied: 0/10 (0%) | ")
+    assert "2 requests" in line
+    assert "rate limit 4998/5000" in line
+
+
+def test_progress_is_logged_when_not_a_terminal():
+    stream = io.StringIO()
+    assert start_progress(stream=stream, interval=0.05)
+    assert not start_progress(stream=stream)
+    try:
+        items = list(track(range(3), "secrets"))
+        pages = [[{"id": n} for n in range(100)], [{"id": 100}]]
+        listed = list(
+            paginated_items(
+                lambda per_page, page: {"total_count": 101, "runs": pages[page - 1]},
+                key="runs",
+            )
+        )
+        _notify_request("GET", "/repos/{owner}/{repo}", time.perf_counter(), 200, {})
+        time.sleep(0.15)
+    finally:
+        stop_progress()
+
+    assert items == [0, 1, 2] and len(listed) == 101
+    lines = stream.getvalue().splitlines()
+    assert len(lines) >= 2
+    assert "1 requests" in lines[-1]
+    assert progress_module._reporter is None
@@ -0,0 +1,209 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+from migrate.common.api import paginated_items
+from migrate.common.pulls import (
+    AdaptivePageSize,
+    export_pull_requests,
+    iter_pull_requests_graphql,
+    iter_updated_pull_requests,
+    list_pull_requests,
+    load_watermarks,
+    save_watermarks,
+    store_pull_request,
+    sync_pull_requests,
+)
+
+
+def paged_operation(items, calls=None):
+    def operation(per_page, page, **kwargs):
+        if calls is not None:
+            calls.append(dict(kwargs, per_page=per_page, page=page))
+        start = (page - 1) * per_page
+        return items[start : start + per_page]
+
+    return operation
+
+
+def test_paginated_items_reads_until_partial_page():
+    calls = []
+    items = list(paginated_items(paged_operation(list(range(5)), calls), per_page=2))
+    assert items == [0, 1, 2, 3, 4]
+    assert [c["page"] for c in calls] == [1, 2, 3]
+
+
+def test_paginated_items_with_key():
+    def operation(per_page, page):
+        return {"total_count": 3, "runs": [[1, 2], [3]][page - 1]}
+
+    assert list(paginated_items(operation, key="runs", per_page=2)) == [1, 2, 3]
+
+
+def fake_client(pull_count):
+    pulls = [{"number": n, "title": f"PR {n}"} for n in range(1, pull_count + 1)]
+
+    def per_pull(kind):
+        def operation(owner, repo, pull_number, per_page, page):
+            return [f"{kind}-{pull_number}"] if page == 1 else []
+
+        return operation
+
+    return SimpleNamespace(
+        pulls=SimpleNamespace(
+            list=paged_operation(pulls),
+            list_commits=per_pull("commit"),
+            list_reviews=per_pull("review"),
+            list_review_comments=per_pull("comment"),
+        )
+    )
+
+
+def test_list_pull_requests_reads_all_pages():
+    pulls = list_pull_requests(fake_client(250), "org", "repo", state="all")
+    assert len(pulls) == 250
+
+
+def test_export_pull_requests_includes_details_in_order():
+    results = list(export_pull_requests(fake_client(205), "org", "repo", max_workers=4))
+    assert [r["number"] for r in results] == list(range(1, 206))
+    assert results[0]["commits"] == ["commit-1"]
+    assert results[204]["reviews"] == ["review-205"]
+    assert results[204]["review_comments"] == ["comment-205"]
+
+
+def connection(nodes, has_next_page=False, cursor=None):
+    return {
+        "totalCount": len(nodes),
+        "pageInfo": {"hasNextPage": has_next_page, "endCursor": cursor},
+        "nodes": nodes,
+    }
+
+
+def graphql_pull(number):
+    return {
+        "id": f"PR_{number}",
+        "number": number,
+        "labels": connection([{"name": "bug"}]),
+        "commits": connection([{"commit": {"oid": f"{number}a"}}], number == 2, "c1"),
+        "reviews": connection([]),
+    }
+
+
+class FakeGraphQL:
+    def __init__(self, pull_count, failures=()):
+        self.pulls = [graphql_pull(n) for n in range(1, pull_count + 1)]
+        self.failures = list(failures)
+        self.page_sizes = []
+
+    def __call__(self, uri, json, headers):
+        variables = json["variables"]
+        if "id" in variables:
+            commits = connection([{"commit": {"oid": "2b"}}])
+            return Response(
+                200, {"data": {"rateLimit": {"cost": 1}, "node": {"commits": commits}}}
+            )
+        self.page_sizes.append(variables["pageSize"])
+        if self.failures:
+            return self.failures.pop(0)
+        start = int(variables["cursor"] or 0)
+        end = start + variables["pageSize"]
+        pulls = connection(self.pulls[start:end], end < len(self.pulls), str(end))
+        return Response(
+            200,
+            {
+                "data": {
+                    "rateLimit": {"cost": 1},
+                    "repository": {"pullRequests": pulls},
+                }
+            },
+        )
+
+
+class Response:
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+def test_iter_pull_requests_graphql_pages_nested_connections():
+    fake = FakeGraphQL(5)
+    with patch("requests.post", fake):
+        pulls = list(
+            iter_pull_requests_graphql(
+                "github.com", "token", "org", "repo", page_size=AdaptivePageSize(2)
+            )
+        )
+    assert [p["number"] for p in pulls] == [1, 2, 3, 4, 5]
+    assert pulls[0]["labels"] == [{"name": "bug"}]
+    assert [c["commit"]["oid"] for c in pulls[1]["commits"]] == ["2a", "2b"]
+    assert fake.page_sizes == [2, 4]
+
+
+def test_iter_pull_requests_graphql_shrinks_page_on_timeout():
+    fake = FakeGraphQL(3, failures=[Response(502, {"message": "timeout"})])
+    with patch("requests.post", fake):
+        pulls = list(
+            iter_pull_requests_graphql(
+                "github.com", "token", "org", "repo", page_size=AdaptivePageSize(8)
+            )
+        )
+    assert len(pulls) == 3
+    assert fake.page_sizes[:2] == [8, 4]
+
+
+def test_adaptive_page_size():
+    size = AdaptivePageSize(10, maximum=16, target_cost=4, target_seconds=1.0)
+    size.record(cost=8, seconds=0.1)
+    assert size.size == 5
+    size.record(cost=1, seconds=0.1)
+    assert size.size == 10
+    size.record(cost=1, seconds=0.1)
+    assert size.size == 16
+    size.record(cost=1, seconds=2.0)
+    assert size.size == 8
+    assert AdaptivePageSize(1).shrink() is False
+
+
+def updated_client(updated, calls=None):
+    pulls = [
+        {
+            "number": n,
+            "updated_at": f"2024-01-01T00:{minute // 60:02d}:{minute % 60:02d}Z",
+        }
+        for n, minute in enumerate(updated, start=1)
+    ]
+    client = fake_client(0)
+    client.pulls.list = paged_operation(pulls, calls)
+    return client
+
+
+def test_iter_updated_pull_requests_stops_at_watermark():
+    calls = []
+    client = updated_client(range(300, 0, -1), calls)
+    pulls = list(
+        iter_updated_pull_requests(client, "org", "repo", "2024-01-01T00:04:10Z")
+    )
+    assert len(pulls) == 51
+    assert calls[0]["sort"] == "updated" and calls[0]["direction"] == "desc"
+    assert len(calls) == 1
+
+
+def test_sync_pull_requests_advances_watermark(tmp_path):
+    client = updated_client([5, 3, 1])
+    filename = str(tmp_path / "marks.json")
+    marks = load_watermarks(filename)
+    assert marks == {}
+    pulls = list(sync_pull_requests(client, "org", "repo", marks))
+    assert [p["number"] for p in pulls] == [1, 2, 3]
+    assert marks == {"org/repo": "2024-01-01T00:00:05Z"}
+    save_watermarks(filename, marks)
+
+    store_pull_request(str(tmp_path / "store"), "org", "repo", pulls[0])
+    assert (tmp_path / "store" / "org" / "repo" / "1.json").exists()
+
+    marks = load_watermarks(filename)
+    pulls = list(sync_pull_requests(client, "org", "repo", marks))
+    assert [p["number"] for p in pulls] == [1]
+    assert marks == {"org/repo": "2024-01-01T00:00:05Z"}
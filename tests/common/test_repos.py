@@ -0,0 +1,294 @@
+import sys
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from fastcore.basics import AttrDict
+from migrate.common.orgs import list_organization_repositories
+from migrate.common.repos import (
+    WORKFLOW_RUN_RESULT_CAP,
+    Repo,
+    RepoSettings,
+    RepoVisibility,
+    CopyAction,
+    RepoIndex,
+    clear_repo_snapshots,
+    copy_repo_settings_bulk,
+    copy_repo_visibility_bulk,
+    get_repo_settings,
+    get_repo_visibility,
+    get_repository_id,
+    iter_workflow_runs,
+    partition_copy_pairs,
+    select_repositories,
+    set_repo_visibility,
+    set_repo_visibility_bulk,
+)
+from migrate.common.tasks import TaskStatus
+
+
+def parse(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def fake_client(created, calls):
+    runs = [{"id": n, "created": seconds} for n, seconds in enumerate(created)]
+
+    def list_workflow_runs_for_repo(owner, repo, created, per_page, page):
+        first, last = map(parse, created.split(".."))
+        calls.append((first, last, page))
+        matches = [run for run in runs if first <= run["created"] <= last]
+        capped = matches[:WORKFLOW_RUN_RESULT_CAP]
+        start = (page - 1) * per_page
+        return {
+            "total_count": len(matches),
+            "workflow_runs": capped[start : start + per_page],
+        }
+
+    return SimpleNamespace(
+        actions=SimpleNamespace(list_workflow_runs_for_repo=list_workflow_runs_for_repo)
+    )
+
+
+def test_iter_workflow_runs_subdivides_capped_windows():
+    # 2,500 runs in the first 100 seconds and a few later runs
+    created = [n % 100 for n in range(2500)] + [5000, 9000, 9999]
+    calls = []
+    runs = list(
+        iter_workflow_runs(
+            fake_client(created, calls),
+            "org",
+            "repo",
+            since=datetime.fromtimestamp(0, timezone.utc),
+            until=datetime.fromtimestamp(9999, timezone.utc),
+            slices=4,
+            max_workers=4,
+        )
+    )
+    assert sorted(run["id"] for run in runs) == list(range(len(created)))
+    windows = {(first, last) for first, last, _ in calls}
+    assert all(last - first < 2500 for first, last in windows if first == 0)
+
+
+def test_iter_workflow_runs_warns_when_a_second_exceeds_the_cap(capsys):
+    created = [7] * 1200
+    runs = list(
+        iter_workflow_runs(
+            fake_client(created, []),
+            "org",
+            "repo",
+            since=datetime.fromtimestamp(0, timezone.utc),
+            until=datetime.fromtimestamp(99, timezone.utc),
+        )
+    )
+    assert len(runs) == 1000
+    assert (
+        "org/repo has 1200 workflow runs created at 1970-01-01T00:00:07Z"
+        in capsys.readouterr().err
+    )
+
+
+def test_copy_repo_settings_bulk_skips_unchanged(monkeypatch):
+    settings = {
+        ("src", "a"): RepoSettings(has_wiki=True),
+        ("dest", "a"): RepoSettings(has_wiki=False),
+        ("src", "b"): RepoSettings(),
+        ("dest", "b"): RepoSettings(),
+    }
+    updated = []
+
+    def get_settings(client, org, repo):
+        if repo == "missing":
+            sys.exit(1)
+        return settings[(org, repo)]
+
+    monkeypatch.setattr("migrate.common.repos.get_repo_settings", get_settings)
+    monkeypatch.setattr(
+        "migrate.common.repos.set_repo_settings",
+        lambda client, org, repo, value: updated.append((org, repo, value)),
+    )
+    results = sorted(
+        copy_repo_settings_bulk(
+            None, "src", None, "dest", [("a", "a"), ("b", "b"), ("missing", "c")]
+        ),
+        key=lambda result: result.source,
+    )
+    assert [r.status for r in results] == [
+        TaskStatus.SUCCEEDED,
+        TaskStatus.SKIPPED,
+        TaskStatus.FAILED,
+    ]
+    assert results[2].error == "Exited with code 1"
+    assert updated == [("dest", "a", RepoSettings(has_wiki=True))]
+
+
+def test_list_organization_repositories_reads_all_pages():
+    repos = [
+        AttrDict(
+            name=f"repo{n}",
+            owner=AttrDict(login="org"),
+            full_name=f"org/repo{n}",
+            id=n,
+            node_id=str(n),
+            url="",
+            private=True,
+            default_branch="main",
+            visibility="private",
+        )
+        for n in range(150)
+    ]
+
+    def list_for_org(org, sort, type, per_page, page):
+        return repos[(page - 1) * per_page : page * per_page]
+
+    client = SimpleNamespace(repos=SimpleNamespace(list_for_org=list_for_org))
+    assert len(list_organization_repositories(client, "org")) == 150
+
+
+def make_repo(name, visibility, topics=()):
+    return Repo(
+        name=name,
+        id=1,
+        node_id="N",
+        owner="org",
+        full_name=f"org/{name}",
+        url="",
+        is_private=visibility != "public",
+        default_branch="main",
+        visibility=visibility,
+        topics=list(topics),
+    )
+
+
+def test_select_repositories_filters_by_name_visibility_and_topics():
+    repos = [
+        make_repo("svc-api", "public", ["team-a", "go"]),
+        make_repo("svc-web", "private", ["team-a"]),
+        make_repo("tool", "public", ["team-a"]),
+        make_repo("svc-old", "public", ["go"]),
+    ]
+
+    selected = select_repositories(repos, ["svc-*"], RepoVisibility.PUBLIC, ["team-a"])
+
+    assert [repo.name for repo in selected] == ["svc-api"]
+    assert len(select_repositories(repos)) == 4
+
+
+def test_set_repo_visibility_bulk_skips_repos_at_target(monkeypatch):
+    updated = []
+
+    def update_repo_visibility(client, org, repo, visibility):
+        if repo == "broken":
+            sys.exit(1)
+        updated.append((repo, visibility))
+
+    monkeypatch.setattr(
+        "migrate.common.repos._update_repo_visibility", update_repo_visibility
+    )
+    repos = [
+        make_repo("a", "public"),
+        make_repo("b", "private"),
+        make_repo("broken", "public"),
+    ]
+
+    changes = list(
+        set_repo_visibility_bulk(
+            None, "org", repos, RepoVisibility.PRIVATE, write_interval=0
+        )
+    )
+
+    assert updated == [("a", "private")]
+    assert [(c.repo, c.before, c.after, c.status) for c in changes] == [
+        ("a", "public", "private", TaskStatus.SUCCEEDED),
+        ("b", "private", "private", TaskStatus.SKIPPED),
+        ("broken", "public", "public", TaskStatus.FAILED),
+    ]
+    assert changes[2].error == "Exited with code 1"
+
+
+def snapshot_client(calls):
+    def get(owner, repo):
+        calls.append(("get", repo))
+        return AttrDict(
+            id=42,
+            full_name=f"{owner}/{repo}",
+            default_branch="main",
+            visibility="private" if len(calls) == 1 else "public",
+            created_at="2023-01-01T00:00:00Z",
+            allow_merge_commit=False,
+        )
+
+    def update(owner, repo, visibility):
+        calls.append(("update", repo))
+
+    return SimpleNamespace(
+        gh_host="https://snapshot.test",
+        repos=SimpleNamespace(get=get, update=update),
+    )
+
+
+def test_repo_snapshot_serves_reads_from_one_request():
+    clear_repo_snapshots()
+    calls = []
+    client = snapshot_client(calls)
+
+    assert get_repository_id(client, "org", "repo") == 42
+    assert get_repo_visibility(client, "org", "repo") == RepoVisibility.PRIVATE
+    assert not get_repo_settings(client, "org", "repo").allow_merge_commit
+    assert calls == [("get", "repo")]
+
+
+def test_repo_snapshot_is_invalidated_by_writes():
+    clear_repo_snapshots()
+    calls = []
+    client = snapshot_client(calls)
+
+    assert get_repo_visibility(client, "org", "repo") == RepoVisibility.PRIVATE
+    set_repo_visibility(client, "org", "repo", RepoVisibility.PUBLIC)
+    assert get_repo_visibility(client, "org", "repo") == RepoVisibility.PUBLIC
+    assert calls == [("get", "repo"), ("update", "repo"), ("get", "repo")]
+
+
+def test_repo_index_partitions_copies_by_destination():
+    index = RepoIndex([make_repo("Exists", "public"), make_repo("same", "private")])
+
+    plan = partition_copy_pairs([("a", "exists"), ("b", "same"), ("c", "new")], index)
+
+    assert "EXISTS" in index and "new" not in index and 1 in index
+    assert plan == {
+        CopyAction.CREATE: [("c", "new")],
+        CopyAction.UPDATE: [("a", "exists"), ("b", "same")],
+    }
+
+
+def test_copy_repo_visibility_bulk_reads_destination_from_index(monkeypatch):
+    reads, updated = [], []
+
+    def get_visibility(client, org, repo):
+        reads.append((org, repo))
+        return RepoVisibility.PRIVATE
+
+    monkeypatch.setattr("migrate.common.repos.get_repo_visibility", get_visibility)
+    monkeypatch.setattr(
+        "migrate.common.repos.set_repo_visibility",
+        lambda client, org, repo, value: updated.append((repo, value)),
+    )
+    index = RepoIndex([make_repo("a", "public"), make_repo("b", "private")])
+
+    results = list(
+        copy_repo_visibility_bulk(
+            None,
+            "src",
+            None,
+            "dest",
+            [("a", "a"), ("b", "b"), ("c", "c")],
+            dest_index=index,
+        )
+    )
+
+    statuses = {result.source: result.status for result in results}
+    assert statuses == {
+        "a": TaskStatus.SUCCEEDED,
+        "b": TaskStatus.SKIPPED,
+        "c": TaskStatus.FAILED,
+    }
+    assert sorted(reads) == [("src", "a"), ("src", "b")]
+    assert updated == [("a", RepoVisibility.PRIVATE)]
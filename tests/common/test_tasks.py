@@ -0,0 +1,132 @@
+import sys
+import threading
+import time
+import pytest
+from migrate.common.tasks import (
+    RateGovernor,
+    Task,
+    TaskGraphError,
+    TaskStatus,
+    bounded_map,
+    run_copy_pipeline,
+    run_task_graph,
+)
+
+
+def test_run_task_graph_respects_dependencies():
+    order = []
+    lock = threading.Lock()
+
+    def record(name):
+        def func():
+            with lock:
+                order.append(name)
+
+        return func
+
+    tasks = [
+        Task("b", record("b"), depends_on=["a"]),
+        Task("a", record("a")),
+        Task("c", record("c"), depends_on=["b"]),
+    ]
+    results = run_task_graph(tasks, max_workers=4)
+    assert order == ["a", "b", "c"]
+    assert [r.name for r in results] == ["b", "a", "c"]
+    assert all(r.status == TaskStatus.SUCCEEDED for r in results)
+
+
+def test_run_task_graph_runs_independent_tasks_in_parallel():
+    barrier = threading.Barrier(2, timeout=5)
+    tasks = [Task("a", barrier.wait), Task("b", barrier.wait)]
+    results = run_task_graph(tasks, max_workers=2)
+    assert all(r.status == TaskStatus.SUCCEEDED for r in results)
+
+
+def test_run_task_graph_skips_dependents_of_failures():
+    def fail():
+        sys.exit(1)
+
+    tasks = [
+        Task("a", fail, group="repo"),
+        Task("b", lambda: None, depends_on=["a"], group="repo"),
+        Task("c", lambda: None, depends_on=["b"], group="repo"),
+        Task("d", lambda: None, group="other"),
+    ]
+    results = {r.name: r for r in run_task_graph(tasks)}
+    assert results["a"].status == TaskStatus.FAILED
+    assert results["a"].error == "Exited with code 1"
+    assert results["b"].status == TaskStatus.SKIPPED
+    assert results["c"].status == TaskStatus.SKIPPED
+    assert results["d"].status == TaskStatus.SUCCEEDED
+
+
+def test_run_task_graph_rejects_cycles():
+    tasks = [
+        Task("a", lambda: None, depends_on=["b"]),
+        Task("b", lambda: None, depends_on=["a"]),
+    ]
+    with pytest.raises(TaskGraphError):
+        run_task_graph(tasks)
+
+
+def test_run_task_graph_rejects_unknown_dependencies():
+    with pytest.raises(TaskGraphError):
+        run_task_graph([Task("a", lambda: None, depends_on=["missing"])])
+
+
+def test_bounded_map_preserves_order_and_limits_read_ahead():
+    consumed = []
+
+    def items():
+        for i in range(20):
+            consumed.append(i)
+            yield i
+
+    results = bounded_map(lambda x: x * 2, items(), max_workers=2)
+    assert next(results) == 0
+    assert len(consumed) <= 5
+    assert list(results) == [x * 2 for x in range(1, 20)]
+
+
+def test_run_copy_pipeline_overlaps_reads_and_writes():
+    events = []
+    lock = threading.Lock()
+
+    def record(event):
+        with lock:
+            events.append(event)
+
+    def read(src, dest):
+        record(("read", src))
+        time.sleep(0.05)
+        return None if src == "same" else src.upper()
+
+    def write(src, dest, value):
+        record(("write", src))
+        time.sleep(0.05)
+        if src == "bad":
+            raise ValueError("rejected")
+
+    pairs = [(name, name) for name in ["a", "b", "same", "bad", "c", "d"]]
+    started = time.monotonic()
+    results = {
+        result.source: result
+        for result in run_copy_pipeline(pairs, read, write, readers=2, writers=1)
+    }
+    elapsed = time.monotonic() - started
+
+    assert results["same"].status == TaskStatus.SKIPPED
+    assert results["bad"].status == TaskStatus.FAILED
+    assert results["bad"].error == "ValueError: rejected"
+    assert all(results[name].status == TaskStatus.SUCCEEDED for name in "abcd")
+    assert ("write", "same") not in events
+    # Sequential reads and writes would take 6 * 0.05 + 5 * 0.05 = 0.55s
+    assert elapsed < 0.45
+
+
+def test_rate_governor_spaces_calls():
+    governor = RateGovernor(0.05)
+    started = time.monotonic()
+    for _ in range(4):
+        governor.wait()
+    assert time.monotonic() - started >= 0.15
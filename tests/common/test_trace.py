@@ -0,0 +1,83 @@
+import json
+import threading
+from migrate.common import trace as trace_module
+from migrate.common.api import _notify_request, paginated_items
+from migrate.common.tasks import run_copy_pipeline
+from migrate.common.trace import span, start_trace, stop_trace
+
+
+def spans(path):
+    return [
+        event
+        for event in json.loads(path.read_text())["traceEvents"]
+        if event["ph"] == "X"
+    ]
+
+
+def test_span_is_a_no_op_while_tracing_is_disabled():
+    assert trace_module._tracer is None
+    with span("dump", "output") as value:
+        assert value is None
+
+
+def test_trace_records_spans_and_requests(tmp_path):
+    path = tmp_path / "trace.json"
+    assert start_trace()
+    assert not start_trace()
+    try:
+        with span("load config", "config", file="settings.yml"):
+            pass
+        _notify_request("get", "/repos/{owner}/{repo}", 0.0, 200, {}, url="/repos/org/a")
+    finally:
+        stop_trace(str(path))
+
+    config, request = spans(path)
+    assert config["name"] == "load config"
+    assert config["args"] == {"file": "settings.yml"}
+    assert request["name"] == "GET /repos/{owner}/{repo}"
+    assert request["cat"] == "http"
+    assert request["args"] == {"url": "/repos/org/a", "status": 200}
+    assert request["tid"] == threading.get_ident()
+    assert trace_module._tracer is None
+
+
+def test_trace_records_pagination_pages(tmp_path):
+    path = tmp_path / "trace.json"
+
+    def list_items(per_page, page):
+        return list(range(per_page)) if page < 3 else []
+
+    start_trace()
+    try:
+        assert len(list(paginated_items(list_items, per_page=2))) == 4
+    finally:
+        stop_trace(str(path))
+
+    pages = [event for event in spans(path) if event["cat"] == "pagination"]
+    assert [event["args"]["page"] for event in pages] == [1, 2, 3]
+    assert {event["name"] for event in pages} == {"list_items"}
+
+
+def test_trace_shows_concurrent_copies_as_thread_lanes(tmp_path):
+    path = tmp_path / "trace.json"
+    pairs = [(f"source{index}", f"dest{index}") for index in range(4)]
+    start_trace()
+    try:
+        results = list(
+            run_copy_pipeline(pairs, lambda *pair: "value", lambda *args: None, readers=2)
+        )
+    finally:
+        stop_trace(str(path))
+
+    assert len(results) == 4
+    events = json.loads(path.read_text())["traceEvents"]
+    reads = [event for event in events if event["ph"] == "X" and event["name"] == "read"]
+    assert sorted(event["args"]["source"] for event in reads) == [
+        pair[0] for pair in pairs
+    ]
+    lanes = {
+        event["tid"]
+        for event in events
+        if event["ph"] == "M" and event["name"] == "thread_name"
+    }
+    assert {event["tid"] for event in reads} <= lanes
@@ -180,3 +180,30 @@ def test_org_show_settings(
     data = load(file_path.read_text(), Loader=Loader)
 
     assert data == org_settings
+
+
+@pytest.mark.parametrize("include_ghas", [False, True])
+def test_org_copy_settings_applies_ghas_only_when_included(
+    monkeypatch, org_settings_response, include_ghas, runner
+):
+    updates = []
+
+    def mock_urlread(request, *args, **kwargs):
+        if request.get_method() == "PATCH":
+            updates.append(json.loads(request.data))
+        return (org_settings_response, dict())
+
+    monkeypatch.setattr("fastcore.net.urlread", mock_urlread)
+    arguments = ["org", "settings", "copy", "--src_org", "src", "--dest_org", "dest"]
+    arguments += ["--src_token", "token", "--dest_token", "token"]
+    result = runner.invoke(
+        cli,
+        arguments + (["--include-ghas"] if include_ghas else []),
+        catch_exceptions=False,
+    )
+
+    assert result.exit_code == 0
+    assert (
+        "advanced_security_enabled_for_new_repositories" in updates[0]
+    ) == include_ghas
+    assert updates[0]["description"] == "A test environment"
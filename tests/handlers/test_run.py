@@ -0,0 +1,33 @@
+from pathlib import Path
+from migrate.common.options import MigrationState
+from migrate.handlers.run.run import expand_plan
+
+
+def tasks_by_name(plan):
+    tasks = expand_plan(MigrationState(), plan, None, None, base_path=Path("plans"))
+    return {task.name: task for task in tasks}
+
+
+def test_expand_plan_orders_steps_per_repo():
+    tasks = tasks_by_name(
+        {
+            "repos": [{"src": "a", "dest": "x", "secrets": "a.yml"}, "b"],
+        }
+    )
+    assert tasks["x:settings"].depends_on == []
+    assert tasks["x:ghas"].depends_on == ["x:settings"]
+    assert tasks["x:visibility"].depends_on == ["x:settings"]
+    assert tasks["x:secrets"].depends_on == ["x:visibility"]
+    assert "b:secrets" not in tasks
+    assert tasks["b:visibility"].group == "b"
+
+
+def test_expand_plan_links_through_omitted_steps():
+    tasks = tasks_by_name(
+        {
+            "steps": ["settings", "secrets"],
+            "repos": [{"src": "a", "secrets": "a.yml"}],
+        }
+    )
+    assert list(tasks) == ["a:settings", "a:secrets"]
+    assert tasks["a:secrets"].depends_on == ["a:settings"]
@@ -21,3 +21,178 @@ def test_orgs_command(runner):
 def test_repos_comment(runner):
     result = runner.invoke(cli, ["repo"], catch_exceptions=False)
     assert result.exit_code == 0
+
+
+def test_lazy_command_help_matches_commands(runner):
+    from migrate.main import COMMANDS
+
+    ctx = cli.make_context("migrate", ["--help"], resilient_parsing=True)
+    for name, (_, help_text) in COMMANDS.items():
+        command = cli.get_command(ctx, name)
+        assert command.name == name
+        assert command.get_short_help_str(limit=200) == help_text
+
+
+def test_keep_going_writes_error_report(runner, tmp_path, monkeypatch):
+    import json
+    from fastcore.net import HTTP4xxClientError
+
+    def mock_urlread(request, *args, **kwargs):
+        raise HTTP4xxClientError(
+            request.full_url,
+            404,
+            'Not Found\n====Error Body====\n{"message": "x"}',
+            {},
+            None,
+        )
+
+    monkeypatch.setattr("fastcore.net.urlread", mock_urlread)
+    secrets = tmp_path / "secrets.yml"
+    secrets.write_text("first: 1\nsecond: 2\n")
+    report = tmp_path / "errors.json"
+
+    result = runner.invoke(
+        cli,
+        ["--error-report", str(report), "org", "secrets", "load", str(secrets)]
+        + ["-o", "org", "-t", "token", "-h", "github.com"],
+    )
+
+    assert result.exit_code == 1
+    errors = json.loads(report.read_text())
+    assert errors["count"] == 2
+    assert {error["code"] for error in errors["errors"]} == {404}
+
+
+def test_keep_going_batch_continues_after_api_errors(runner, tmp_path, monkeypatch):
+    import json
+    from fastcore.net import HTTP4xxClientError
+
+    def mock_urlread(request, *args, **kwargs):
+        raise HTTP4xxClientError(
+            request.full_url,
+            404,
+            'Not Found\n====Error Body====\n{"message": "x"}',
+            {},
+            None,
+        )
+
+    monkeypatch.setattr("fastcore.net.urlread", mock_urlread)
+    target = "-o org -t token -h github.com"
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text(
+        f"repo settings list first {target}\nrepo settings list second {target}\n"
+    )
+    report = tmp_path / "report.json"
+    retry = tmp_path / "retry.txt"
+    errors = tmp_path / "errors.json"
+
+    result = runner.invoke(
+        cli,
+        ["--error-report", str(errors), "batch", str(manifest), "--json"]
+        + ["--report", str(report), "--retry-manifest", str(retry)],
+    )
+
+    assert result.exit_code == 1
+    assert [entry["exit_code"] for entry in json.loads(report.read_text())] == [1, 1]
+    assert retry.read_text().count("repo settings list") == 2
+    assert json.loads(errors.read_text())["count"] == 2
+    assert "Traceback" not in result.output
+
+    result = runner.invoke(
+        cli, ["--keep-going", "repo", "settings", "list", "first", *target.split()]
+    )
+
+    assert result.exit_code == 1
+    assert isinstance(result.exception, SystemExit)
+
+
+def test_parallel_keep_going_commands_collect_their_own_errors(tmp_path, monkeypatch):
+    import json
+    import os
+    import threading
+    import time
+    from fastcore.net import HTTP4xxClientError
+    from migrate.common.batch import parse_text_manifest, run_batch
+
+    first_started = threading.Event()
+    first_report = tmp_path / "first.json"
+    second_requests = []
+
+    def mock_urlread(request, *args, **kwargs):
+        if "/orgs/first/" in request.full_url:
+            first_started.set()
+        else:
+            second_requests.append(request.full_url)
+            if len(second_requests) == 1:
+                first_started.wait(5)
+            else:
+                # Fails after the first command has finished and written its report
+                deadline = time.monotonic() + 5
+                while not os.path.exists(first_report) and time.monotonic() < deadline:
+                    time.sleep(0.01)
+        raise HTTP4xxClientError(
+            request.full_url,
+            404,
+            'Not Found\n====Error Body====\n{"message": "x"}',
+            {},
+            None,
+        )
+
+    monkeypatch.setattr("fastcore.net.urlread", mock_urlread)
+    (tmp_path / "one.yml").write_text("first: 1\n")
+    (tmp_path / "two.yml").write_text("first: 1\nsecond: 2\n")
+    target = "-t token -h github.com"
+    commands = parse_text_manifest(
+        f"--error-report {first_report} org secrets load {tmp_path / 'one.yml'} "
+        f"-o first {target}\n"
+        f"--error-report {tmp_path / 'second.json'} org secrets load "
+        f"{tmp_path / 'two.yml'} -o second {target}\n"
+    )
+
+    results = run_batch(cli, commands, max_workers=2)
+
+    assert [result.exit_code for result in results] == [1, 1]
+    first = json.loads(first_report.read_text())
+    second = json.loads((tmp_path / "second.json").read_text())
+    assert [error["context"].split("/")[4] for error in first["errors"]] == ["first"]
+    assert [error["context"].split("/")[4] for error in second["errors"]] == [
+        "second",
+        "second",
+    ]
+
+
+def test_metrics_are_written_when_the_command_ends(runner, tmp_path, monkeypatch):
+    from fastcore.net import HTTP4xxClientError
+
+    def mock_urlread(request, *args, **kwargs):
+        raise HTTP4xxClientError(
+            request.full_url,
+            404,
+            'Not Found\n====Error Body====\n{"message": "x"}',
+            {},
+            None,
+        )
+
+    monkeypatch.setattr("fastcore.net.urlread", mock_urlread)
+    secrets = tmp_path / "secrets.yml"
+    secrets.write_text("first: 1\n")
+    metrics = tmp_path / "metrics.prom"
+
+    runner.invoke(
+        cli,
+        ["--metrics", str(metrics), "--metrics-format", "prometheus", "--keep-going"]
+        + ["org", "secrets", "load", str(secrets)]
+        + ["-o", "org", "-t", "token", "-h", "github.com"],
+    )
+
+    assert "# TYPE migrate_api_requests_total counter" in metrics.read_text()
+
+
+def test_trace_is_written_when_the_command_ends(runner, tmp_path):
+    import json
+
+    trace = tmp_path / "trace.json"
+
+    runner.invoke(cli, ["--trace", str(trace), "org", "--help"])
+
+    assert "traceEvents" in json.loads(trace.read_text())
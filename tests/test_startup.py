@@ -0,0 +1,62 @@
+"""Import-time regression benchmarks for the command line"""
+
+import json
+import subprocess
+import sys
+
+HEAVY_MODULES = ("ghapi", "fastcore.net", "nacl", "requests", "yaml")
+IMPORT_BUDGET_MS = 150
+
+
+def run_python(code: str, *options: str):
+    return subprocess.run(
+        [sys.executable, *options, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_help_does_not_import_heavy_dependencies():
+    result = run_python(
+        "import json, sys\n"
+        "from migrate.main import cli\n"
+        "try:\n"
+        "    cli(['--help'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print(json.dumps(sorted(sys.modules)), file=sys.stderr)\n"
+    )
+    modules = json.loads(result.stderr)
+    loaded = [
+        m for m in modules if m.split(".")[0] in HEAVY_MODULES or m in HEAVY_MODULES
+    ]
+    assert loaded == []
+
+
+def test_command_imports_only_its_handler():
+    result = run_python(
+        "import json, sys\n"
+        "from migrate.main import cli\n"
+        "try:\n"
+        "    cli(['check', '--help'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print(json.dumps(sorted(sys.modules)), file=sys.stderr)\n"
+    )
+    modules = json.loads(result.stderr)
+    assert "migrate.handlers.check" in modules
+    assert "migrate.handlers.repo" not in modules
+    assert "ghapi" not in modules and "nacl" not in modules
+
+
+def test_main_import_time_budget():
+    # -X importtime reports the cumulative import time in microseconds
+    timings = []
+    for _ in range(3):
+        result = run_python("import migrate.main", "-X", "importtime")
+        line = next(
+            line for line in result.stderr.splitlines() if line.endswith("| migrate.main")
+        )
+        timings.append(int(line.split("|")[1]) / 1000)
+    assert min(timings) < IMPORT_BUDGET_MS